@@ -0,0 +1,233 @@
+"""Sparse matrices assembled from blocks, one per equation and variable
+
+The matrix of a system of coupled equations consists of a block for each
+pair of equation and solution variable.  With an
+:func:`~fipy.matrices.offsetSparseMatrix.OffsetSparseMatrix`, every term
+builds a matrix the size of the whole system, with its entries shifted into
+place, and these are summed.  A :func:`BlockSparseMatrix` instead fills a
+separate single-variable matrix for each block and only stacks them into
+the system matrix once it is needed.
+"""
+from __future__ import unicode_literals
+from builtins import range
+__docformat__ = 'restructuredtext'
+
+from fipy.tools import numerix
+
+__all__ = ["BlockSparseMatrix"]
+from future.utils import text_to_native_str
+__all__ = [text_to_native_str(n) for n in __all__]
+
+def BlockSparseMatrix(SparseMatrix, numberOfVariables, numberOfEquations):
+    """Obtain a version of `SparseMatrix` that is assembled by blocks
+
+    Used in coupled binary terms, in place of
+    :func:`~fipy.matrices.offsetSparseMatrix.OffsetSparseMatrix`.
+    `equationIndex` and `varIndex` need to be set statically before
+    insertion.  `SparseMatrix` must hold its values in a SciPy sparse
+    `matrix`.
+
+    >>> from fipy import Grid1D
+    >>> from fipy.matrices.scipyMatrix import _ScipyMeshMatrix
+    >>> mesh = Grid1D(nx=3)
+    >>> BlockMatrix = BlockSparseMatrix(_ScipyMeshMatrix,
+    ...                                 numberOfVariables=2,
+    ...                                 numberOfEquations=2)
+    >>> L = BlockMatrix(mesh=mesh)
+    >>> BlockMatrix.equationIndex, BlockMatrix.varIndex = 0, 1
+    >>> L.addAtDiagonal(numerix.array([1., 2., 3.]))
+    >>> BlockMatrix.equationIndex, BlockMatrix.varIndex = 1, 0
+    >>> other = BlockMatrix(mesh=mesh)
+    >>> other.addAt([4., 5.], [0, 1], [1, 2])
+    >>> L += other
+    >>> sorted(L._blocks.keys())
+    [(0, 1), (1, 0)]
+    >>> print(numerix.allequal(L.numpyArray, [[0, 0, 0, 1, 0, 0],
+    ...                                       [0, 0, 0, 0, 2, 0],
+    ...                                       [0, 0, 0, 0, 0, 3],
+    ...                                       [0, 4, 0, 0, 0, 0],
+    ...                                       [0, 0, 5, 0, 0, 0],
+    ...                                       [0, 0, 0, 0, 0, 0]]))
+    True
+
+    Structured grid stencils are also inserted block by block
+
+    >>> BlockMatrix.equationIndex, BlockMatrix.varIndex = 0, 0
+    >>> stencil = BlockMatrix(mesh=mesh)
+    >>> stencil.addAtStencil((3,), (1.,))
+    >>> sorted(stencil._blocks.keys())
+    [(0, 0)]
+    >>> print(numerix.allequal(stencil.numpyArray[:3, :3], [[ 1, -1,  0],
+    ...                                                     [-1,  2, -1],
+    ...                                                     [ 0, -1,  1]]))
+    True
+
+    Once assembled, insertions are made directly into the system matrix
+
+    >>> BlockMatrix.equationIndex, BlockMatrix.varIndex = 1, 1
+    >>> L.addAt([6.], [2], [2])
+    >>> print(numerix.allequal(L.numpyArray[-1], [0, 0, 0, 0, 0, 6]))
+    True
+
+    Diagonal blocks are available for block preconditioning
+
+    >>> print(numerix.allequal(L._diagonalBlock(1).toarray(),
+    ...                        [[0, 0, 0],
+    ...                         [0, 0, 0],
+    ...                         [0, 0, 6]]))
+    True
+    """
+
+    import scipy.sparse as sp
+
+    class BlockSparseMatrixClass(SparseMatrix):
+        equationIndex = 0
+        varIndex = 0
+
+        def __init__(self, mesh, nonZerosPerRow=1, exactNonZeros=False,
+                     numberOfVariables=numberOfVariables,
+                     numberOfEquations=numberOfEquations):
+            # the system matrix is only allocated when the blocks are stacked
+            SparseMatrix.__init__(self,
+                                  mesh=mesh,
+                                  numberOfVariables=numberOfVariables,
+                                  numberOfEquations=numberOfEquations,
+                                  matrix=sp.csr_matrix((0, 0)))
+            self._assembled = None
+            self._blocks = {}
+
+        def _getMatrix(self):
+            if self._blocks is not None:
+                self._assembled = self._stack()
+                # subsequent insertions go straight into the system matrix
+                self._blocks = None
+            if self._assembled is None:
+                raise AttributeError("matrix")
+            return self._assembled
+
+        def _setMatrix(self, matrix):
+            self._assembled = matrix
+            self._blocks = None
+
+        def _delMatrix(self):
+            self._assembled = None
+            self._blocks = None
+
+        matrix = property(_getMatrix, _setMatrix, _delMatrix)
+
+        def _stack(self):
+            N = self.mesh.numberOfCells
+            empty = sp.csr_matrix((N, N))
+            blocks = [[None] * self.numberOfVariables
+                      for i in range(self.numberOfEquations)]
+            # give every block row and column its extent
+            for i in range(self.numberOfEquations):
+                blocks[i][min(i, self.numberOfVariables - 1)] = empty
+            for j in range(self.numberOfVariables):
+                blocks[min(j, self.numberOfEquations - 1)][j] = empty
+            for (i, j), block in self._blocks.items():
+                blocks[i][j] = block.matrix
+            return sp.bmat(blocks, format="csr")
+
+        def _diagonalBlock(self, index):
+            """The block coupling equation `index` to variable `index`"""
+            N = self.mesh.numberOfCells
+            if self._blocks is not None:
+                if (index, index) in self._blocks:
+                    return self._blocks[index, index].matrix
+                else:
+                    return sp.csr_matrix((N, N))
+            else:
+                return self._assembled[index * N:(index + 1) * N,
+                                       index * N:(index + 1) * N]
+
+        @property
+        def _currentBlock(self):
+            key = (self.equationIndex, self.varIndex)
+            if key not in self._blocks:
+                self._blocks[key] = SparseMatrix(mesh=self.mesh)
+            return self._blocks[key]
+
+        def _offsets(self):
+            N = self.mesh.numberOfCells
+            return N * self.equationIndex, N * self.varIndex
+
+        def put(self, vector, id1, id2):
+            if self._blocks is not None:
+                self._currentBlock.put(vector, id1, id2)
+            else:
+                rowOffset, colOffset = self._offsets()
+                id1 = numerix.asarray(id1) + rowOffset
+                id2 = numerix.asarray(id2) + colOffset
+                SparseMatrix.put(self, vector=vector, id1=id1, id2=id2)
+
+        def addAt(self, vector, id1, id2):
+            if self._blocks is not None:
+                self._currentBlock.addAt(vector, id1, id2)
+            else:
+                rowOffset, colOffset = self._offsets()
+                id1 = numerix.asarray(id1) + rowOffset
+                id2 = numerix.asarray(id2) + colOffset
+                SparseMatrix.addAt(self, vector=vector, id1=id1, id2=id2)
+
+        def addAtFaces(self, vector, rows1, rows2, cols1, cols2):
+            if self._blocks is not None:
+                self._currentBlock.addAtFaces(vector, rows1, rows2, cols1, cols2)
+            else:
+                SparseMatrix.addAtFaces(self, vector, rows1, rows2, cols1, cols2)
+
+        def addAtStencil(self, shape, couplings):
+            if self._blocks is not None:
+                self._currentBlock.addAtStencil(shape, couplings)
+            else:
+                SparseMatrix.addAtStencil(self, shape, couplings)
+
+        def addAtDiagonal(self, vector):
+            if type(vector) in [type(1), type(1.)]:
+                tmp = numerix.zeros((self.mesh.numberOfCells,), 'd')
+                tmp[:] = vector
+                vector = tmp
+            if self._blocks is not None:
+                self._currentBlock.addAtDiagonal(vector)
+            else:
+                ids = numerix.arange(len(vector))
+                self.addAt(vector, ids, ids)
+
+        def _iaddBlocks(self, other, sign):
+            """Sum the blocks of `other` into this matrix, if possible"""
+            if (getattr(other, "_blocks", None) is None
+                or self._blocks is None):
+                return False
+
+            for key, block in other._blocks.items():
+                if key not in self._blocks:
+                    # don't share the block, in case `other` is cached
+                    self._blocks[key] = SparseMatrix(mesh=self.mesh)
+                if sign == 1:
+                    self._blocks[key] += block
+                else:
+                    self._blocks[key] -= block
+            return True
+
+        def __iadd__(self, other):
+            if self._iaddBlocks(other, sign=1):
+                return self
+            else:
+                return SparseMatrix.__iadd__(self, other)
+
+        def __isub__(self, other):
+            if self._iaddBlocks(other, sign=-1):
+                return self
+            else:
+                return SparseMatrix.__isub__(self, other)
+
+    BlockSparseMatrixClass.__name__ = str("Block" + SparseMatrix.__name__)
+
+    return BlockSparseMatrixClass
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
@@ -0,0 +1,261 @@
+"""Sparse matrices that defer assembly of their entries
+
+When :envvar:`FIPY_DEFERRED_ASSEMBLY` is set, the matrices built by
+:class:`~fipy.terms.term.Term` objects accumulate the `(id1, id2, vector)`
+triplets passed to `addAt()` and `addAtDiagonal()` in buffers.
+Nothing is committed to the solver suite's matrix until its contents are
+actually needed, e.g., when the solver reads it or when it is `flush()`-ed.
+Adding deferred matrices together just concatenates their buffers, so an
+equation composed of many terms is assembled with a single vectorized
+insertion (and a single summation of duplicate entries).
+"""
+from __future__ import unicode_literals
+from builtins import object
+from builtins import zip
+__docformat__ = 'restructuredtext'
+
+import os
+
+from fipy.tools import numerix
+
+__all__ = ["DeferredSparseMatrix"]
+from future.utils import text_to_native_str
+__all__ = [text_to_native_str(n) for n in __all__]
+
+deferredAssembly = 'FIPY_DEFERRED_ASSEMBLY' in os.environ
+
+class _TripletBuffer(object):
+    """Growable storage for `(id1, id2, vector)` matrix insertions
+
+    Insertions are held as a list of chunks, which are only concatenated
+    when the triplets are needed.  Chunks are never modified once
+    appended, so they can be shared between buffers.
+
+    >>> buf = _TripletBuffer()
+    >>> buf.append([1., 2.], [0, 1], [1, 0])
+    >>> buf.append([3., 4., 5.], [2, 2, 0], [2, 2, 0])
+    >>> len(buf)
+    5
+    >>> vector, id1, id2 = buf.triplets
+    >>> print(vector)
+    [ 1.  2.  3.  4.  5.]
+    >>> print(id1)
+    [0 1 2 2 0]
+    >>> print(id2)
+    [1 0 2 2 0]
+    >>> buf.extend(buf, factor=-1)
+    >>> print(buf.triplets[0])
+    [ 1.  2.  3.  4.  5. -1. -2. -3. -4. -5.]
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, vector, id1, id2):
+        """Add insertions to the end of the buffer
+
+        Parameters
+        ----------
+        vector : array_like
+            The values to insert.
+        id1 : array_like
+            The row indices.
+        id2 : array_like
+            The column indices.
+        """
+        # copies protect against the caller modifying its arrays
+        chunk = (numerix.array(vector, dtype=float).ravel(),
+                 numerix.array(id1, dtype=numerix.INT_DTYPE).ravel(),
+                 numerix.array(id2, dtype=numerix.INT_DTYPE).ravel())
+        self._chunks.append(chunk)
+        self._size += len(chunk[1])
+
+    def extend(self, other, factor=1):
+        """Add the insertions of another `_TripletBuffer`
+
+        Parameters
+        ----------
+        other : ~fipy.matrices.deferredSparseMatrix._TripletBuffer
+            The buffer to take insertions from.
+        factor : float
+            Multiplier of the values of `other`, e.g., -1 to subtract them.
+        """
+        if factor == 1:
+            self._chunks.extend(other._chunks)
+        else:
+            self._chunks.extend([(factor * vector, id1, id2)
+                                 for vector, id1, id2 in other._chunks])
+        self._size += other._size
+
+    @property
+    def triplets(self):
+        """The `(vector, id1, id2)` insertions held by the buffer"""
+        if len(self._chunks) == 1:
+            return self._chunks[0]
+        elif len(self._chunks) == 0:
+            return (numerix.zeros((0,), dtype=float),
+                    numerix.zeros((0,), dtype=numerix.INT_DTYPE),
+                    numerix.zeros((0,), dtype=numerix.INT_DTYPE))
+        else:
+            triplets = tuple(numerix.concatenate(arrays)
+                             for arrays in zip(*self._chunks))
+            # the next request can reuse the concatenation
+            self._chunks = [triplets]
+            return triplets
+
+_deferredClasses = {}
+
+def DeferredSparseMatrix(SparseMatrix):
+    """Obtain a version of `SparseMatrix` that defers insertion of values
+
+    Works with the matrices of any solver suite.  Values inserted with
+    `addAt()` or `addAtDiagonal()` are buffered.  Any other access to the
+    underlying `matrix` first commits the buffered values with a single
+    `addAt()` of `SparseMatrix`.  Values inserted with a different
+    `overlapping` argument are kept in separate buffers.
+
+    >>> from fipy import Grid1D
+    >>> from fipy.solvers import _MeshMatrix
+    >>> mesh = Grid1D(nx=3)
+    >>> DeferredMatrix = DeferredSparseMatrix(_MeshMatrix)
+    >>> DeferredMatrix is DeferredSparseMatrix(DeferredMatrix)
+    True
+    >>> L = DeferredMatrix(mesh=mesh)
+    >>> L.addAt([1., 2.], [0, 1], [1, 0])
+    >>> L.addAtDiagonal(numerix.array([3., 4., 5.]))
+    >>> L.pending
+    5
+    >>> other = DeferredMatrix(mesh=mesh)
+    >>> other.addAt([10., 20.], [0, 0], [2, 0])
+    >>> L += other
+    >>> L.pending
+    7
+    >>> L -= other
+    >>> print(numerix.allequal(L.numpyArray, [[3, 1, 0],
+    ...                                       [2, 4, 0],
+    ...                                       [0, 0, 5]]))
+    True
+    >>> L.pending
+    0
+
+    Insertion that relies on prior values commits the buffer first
+
+    >>> L.addAt([1., 1.], [0, 2], [0, 2])
+    >>> L.put([7.], [1], [1])
+    >>> print(numerix.allequal(L.numpyArray, [[4, 1, 0],
+    ...                                       [2, 7, 0],
+    ...                                       [0, 0, 6]]))
+    True
+    """
+    if getattr(SparseMatrix, "_deferred", False):
+        return SparseMatrix
+
+    if SparseMatrix in _deferredClasses:
+        return _deferredClasses[SparseMatrix]
+
+    baseMatrix = getattr(SparseMatrix, "matrix", None)
+    if isinstance(baseMatrix, property):
+        # the solver suite already manages storage of its matrix
+        _getMatrix = baseMatrix.fget
+        _setMatrix = baseMatrix.fset
+        _delMatrix = baseMatrix.fdel
+    else:
+        def _getMatrix(self):
+            try:
+                return self.__dict__["_deferredMatrix"]
+            except KeyError:
+                raise AttributeError("matrix")
+
+        def _setMatrix(self, matrix):
+            self.__dict__["_deferredMatrix"] = matrix
+
+        def _delMatrix(self):
+            del self.__dict__["_deferredMatrix"]
+
+    class DeferredSparseMatrixClass(SparseMatrix):
+        _deferred = True
+
+        def __init__(self, *args, **kwargs):
+            self._buffers = {}
+            self._touched = False
+            SparseMatrix.__init__(self, *args, **kwargs)
+
+        def _buffer(self, **kwargs):
+            key = tuple(sorted(kwargs.items()))
+            if key not in self._buffers:
+                self._buffers[key] = _TripletBuffer()
+            return self._buffers[key]
+
+        @property
+        def pending(self):
+            """Number of insertions not yet committed to the matrix"""
+            return sum(len(buf) for buf in self._buffers.values())
+
+        def _commit(self):
+            buffers, self._buffers = self._buffers, {}
+            for key, buf in buffers.items():
+                if len(buf) > 0:
+                    SparseMatrix.addAt(self, *buf.triplets, **dict(key))
+
+        def _getDeferredMatrix(self):
+            if getattr(self, "_buffers", None):
+                self._commit()
+            # the matrix may be modified by whoever asked for it
+            self._touched = True
+            return _getMatrix(self)
+
+        matrix = property(_getDeferredMatrix, _setMatrix, _delMatrix)
+
+        def addAt(self, vector, id1, id2, **kwargs):
+            self._buffer(**kwargs).append(vector, id1, id2)
+
+        def _absorb(self, other, sign):
+            """Take on the buffered insertions of `other`, if possible"""
+            if getattr(other, "_deferred", False) and not other._touched:
+                for key, buf in other._buffers.items():
+                    self._buffer(**dict(key)).extend(buf, factor=sign)
+                return True
+            else:
+                return False
+
+        def __iadd__(self, other):
+            if self._absorb(other, sign=1):
+                return self
+            else:
+                return SparseMatrix.__iadd__(self, other)
+
+        def __isub__(self, other):
+            if self._absorb(other, sign=-1):
+                return self
+            else:
+                return SparseMatrix.__isub__(self, other)
+
+        def flush(self, *args, **kwargs):
+            """Commit any buffered insertions and flush the matrix"""
+            self._commit()
+            flush = getattr(SparseMatrix, "flush", None)
+            if flush is not None:
+                flush(self, *args, **kwargs)
+
+        def __del__(self):
+            # buffered values are of no interest to a matrix being destroyed
+            self._buffers = {}
+            delete = getattr(SparseMatrix, "__del__", None)
+            if delete is not None:
+                delete(self)
+
+    DeferredSparseMatrixClass.__name__ = str("Deferred" + SparseMatrix.__name__)
+    _deferredClasses[SparseMatrix] = DeferredSparseMatrixClass
+
+    return DeferredSparseMatrixClass
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
@@ -0,0 +1,504 @@
+"""Mesh matrices that are applied without being assembled
+
+A :class:`_ScipyMatrixFreeMeshMatrix` keeps the diagonal of the discrete
+operator as a dense vector, the face couplings inserted with `addAtFaces()`
+(e.g., by :class:`~fipy.terms.diffusionTerm.DiffusionTerm`) as one
+coefficient per face, the constant couplings of a structured grid inserted
+with `addAtStencil()` as one coefficient per axis, and any other
+off-diagonal insertions as unassembled triplets.  Its `matrix` is a
+:class:`scipy.sparse.linalg.LinearOperator` whose `matvec` applies the
+face contributions directly, so the CSR matrix is never formed and
+storage is proportional to the number of faces.
+"""
+from __future__ import unicode_literals
+from builtins import range
+__docformat__ = 'restructuredtext'
+
+__all__ = []
+
+from fipy.matrices.deferredSparseMatrix import _TripletBuffer
+from fipy.matrices.sparseMatrix import _SparseMatrix, _stencilFaces
+from fipy.tools import numerix
+
+class _ScipyMatrixFreeMeshMatrix(_SparseMatrix):
+    """Discrete operator associated with a `Mesh`, applied matrix-free
+
+    >>> from fipy import Grid1D
+    >>> mesh = Grid1D(nx=3)
+    >>> L = _ScipyMatrixFreeMeshMatrix(mesh=mesh)
+    >>> L.addAt([1.73, 2.2, 8.4, 3.9, 1.23], [1, 2, 0, 0, 1], [2, 2, 0, 0, 2])
+    >>> L.addAtDiagonal(1.)
+    >>> print(numerix.allclose(L.numpyArray, [[13.3, 0.,   0.  ],
+    ...                                       [0.,   1.,   2.96],
+    ...                                       [0.,   0.,   3.2 ]]))
+    True
+    >>> print(L * numerix.array([1., 2., 3.]))
+    [ 13.3   10.88   9.6 ]
+    >>> print(numerix.array([1., 2., 3.]) * L)
+    [ 13.3    2.    15.52]
+
+    Only the diagonal is stored densely
+
+    >>> print(L.takeDiagonal())
+    [ 13.3   1.    3.2]
+    >>> print(len(L._offDiagonal))
+    2
+
+    Face couplings are stored with a single coefficient per face
+
+    >>> L.addAtFaces(numerix.array([1., 2.]), rows1=[0, 1], rows2=[1, 2],
+    ...              cols1=[0, 1], cols2=[1, 2])
+    >>> print(numerix.allclose(L.numpyArray, [[14.3, -1.,   0.  ],
+    ...                                       [-1.,   4.,   0.96],
+    ...                                       [0.,   -2.,   5.2 ]]))
+    True
+    >>> print(L.takeDiagonal())
+    [ 14.3   4.    5.2]
+    >>> print(numerix.allclose(L * numerix.array([1., 2., 3.]),
+    ...                        L.numpyArray.dot([1., 2., 3.])))
+    True
+    >>> print(numerix.allclose(numerix.array([1., 2., 3.]) * L,
+    ...                        L.numpyArray.T.dot([1., 2., 3.])))
+    True
+
+    The `matrix` is suitable for the SciPy Krylov solvers
+
+    >>> from scipy.sparse.linalg import gmres
+    >>> b = L * numerix.array([1., 2., 3.])
+    >>> x, info = gmres(L.matrix, b, rtol=1e-12, atol=0.)
+    >>> print(numerix.allclose(x, [1., 2., 3.]))
+    True
+
+    Matrices are added by concatenating their contributions
+
+    >>> M = L - 2 * L
+    >>> print(numerix.allclose(M.numpyArray, -L.numpyArray))
+    True
+    >>> M.put([5., 7., 1.], [0, 2, 1], [0, 1, 2])
+    >>> print(numerix.allclose(M.numpyArray, [[5.,   1.,   0.  ],
+    ...                                       [1.,  -4.,   1.  ],
+    ...                                       [0.,   7.,  -5.2 ]]))
+    True
+
+    The couplings of a structured grid are applied by shifting the values
+    along each axis
+
+    >>> from fipy import Grid2D
+    >>> from fipy.matrices.scipyMatrix import _ScipyMatrixFromShape
+    >>> grid = Grid2D(nx=4, ny=3)
+    >>> S = _ScipyMatrixFreeMeshMatrix(mesh=grid)
+    >>> S.addAtStencil((4, 3), (2., 0.5))
+    >>> S.addAtDiagonal(1.)
+    >>> A = _ScipyMatrixFromShape(rows=12, cols=12)
+    >>> A.addAtStencil((4, 3), (2., 0.5))
+    >>> A.addAtDiagonal(1.)
+    >>> print(numerix.allclose(S.numpyArray, A.numpyArray))
+    True
+    >>> x = numerix.arange(12.)**2
+    >>> print(numerix.allclose(S * x, A * x), numerix.allclose(x * (-S), -(x * A)))
+    True True
+    >>> print(numerix.allclose(S.takeDiagonal(), A.takeDiagonal()))
+    True
+    >>> print(M[1, 2], M[2, 1])
+    1.0 7.0
+    >>> M.putDiagonal(1.)
+    >>> print(M.takeDiagonal())
+    [ 1.  1.  1.]
+    """
+
+    _deferred = True
+
+    def __init__(self, mesh, numberOfVariables=1, numberOfEquations=1,
+                 nonZerosPerRow=0, exactNonZeros=False, matrix=None, storeZeros=True):
+        """Creates a matrix-free operator associated with equations and variables.
+
+        Parameters
+        ----------
+        mesh : ~fipy.meshes.mesh.Mesh
+            The `Mesh` to assemble the matrix for.
+        numberOfVariables : int
+            The columns of the matrix are determined by
+            `numberOfVariables * mesh.numberOfCells`.
+        numberOfEquations : int
+            The rows of the matrix are determined by
+            `numberOfEquations * mesh.numberOfCells`.
+        nonZerosPerRow : int or array_like of int
+            *ignored*
+        exactNonZeros : bool
+            *ignored*
+        matrix : None
+            *ignored*
+        storeZeros : bool
+            *ignored*
+        """
+        self.mesh = mesh
+        self.numberOfVariables = numberOfVariables
+        self.numberOfEquations = numberOfEquations
+
+        self._shape_ = (numberOfEquations * mesh.numberOfCells,
+                        numberOfVariables * mesh.numberOfCells)
+        self._diagonal = numerix.zeros((min(self._shape_),), 'd')
+        self._offDiagonal = _TripletBuffer()
+        self._faceStencils = []
+        self._gridStencils = []
+
+        super(_ScipyMatrixFreeMeshMatrix, self).__init__()
+
+    @property
+    def matrix(self):
+        from scipy.sparse.linalg import LinearOperator
+
+        return LinearOperator(shape=self._shape, dtype=float,
+                              matvec=self._matvec, rmatvec=self._rmatvec)
+
+    @property
+    def _shape(self):
+        return self._shape_
+
+    @property
+    def _range(self):
+        return list(range(self._shape[1])), list(range(self._shape[0]))
+
+    def _getGhostedValues(self, var):
+        """Obtain current ghost values from across processes
+
+        Nothing to do for serial matrix.
+
+        Returns
+        -------
+        ndarray
+            Ghosted values
+        """
+        return var.value
+
+    def copy(self):
+        other = self.__class__.__new__(self.__class__)
+        other.__dict__.update(self.__dict__)
+        other._diagonal = self._diagonal.copy()
+        other._offDiagonal = _TripletBuffer()
+        other._offDiagonal.extend(self._offDiagonal)
+        other._faceStencils = list(self._faceStencils)
+        other._gridStencils = list(self._gridStencils)
+        return other
+
+    def _scaled(self, factor):
+        other = self.copy()
+        other._diagonal *= factor
+        other._offDiagonal = _TripletBuffer()
+        other._offDiagonal.extend(self._offDiagonal, factor=factor)
+        other._faceStencils = [(factor * vector, rows1, rows2, cols1, cols2)
+                               for (vector, rows1, rows2,
+                                    cols1, cols2) in self._faceStencils]
+        other._gridStencils = [(shape, tuple(factor * coupling for coupling in couplings))
+                               for shape, couplings in self._gridStencils]
+        return other
+
+    def _matvec(self, x):
+        x = numerix.asarray(x).ravel()
+        N = len(self._diagonal)
+        y = numerix.zeros((self._shape[0],), 'd')
+        y[:N] = self._diagonal * x[:N]
+        if len(self._offDiagonal) > 0:
+            vector, id1, id2 = self._offDiagonal.triplets
+            y += numerix.bincount(id1, weights=vector * x[id2],
+                                  minlength=self._shape[0])
+        for vector, rows1, rows2, cols1, cols2 in self._faceStencils:
+            flux = vector * (x[cols1] - x[cols2])
+            y += numerix.bincount(rows1, weights=flux, minlength=self._shape[0])
+            y -= numerix.bincount(rows2, weights=flux, minlength=self._shape[0])
+        self._applyGridStencils(x, y)
+        return y
+
+    def _rmatvec(self, x):
+        x = numerix.asarray(x).ravel()
+        N = len(self._diagonal)
+        y = numerix.zeros((self._shape[1],), 'd')
+        y[:N] = self._diagonal * x[:N]
+        if len(self._offDiagonal) > 0:
+            vector, id1, id2 = self._offDiagonal.triplets
+            y += numerix.bincount(id2, weights=vector * x[id1],
+                                  minlength=self._shape[1])
+        for vector, rows1, rows2, cols1, cols2 in self._faceStencils:
+            flux = vector * (x[rows1] - x[rows2])
+            y += numerix.bincount(cols1, weights=flux, minlength=self._shape[1])
+            y -= numerix.bincount(cols2, weights=flux, minlength=self._shape[1])
+        # grid stencils are symmetric
+        self._applyGridStencils(x, y)
+        return y
+
+    def _applyGridStencils(self, x, y):
+        for shape, couplings in self._gridStencils:
+            X = x.reshape(shape[::-1])
+            Y = y.reshape(shape[::-1])
+            for axis, coupling in enumerate(couplings):
+                along = len(shape) - 1 - axis
+                lower = [slice(None)] * len(shape)
+                upper = [slice(None)] * len(shape)
+                lower[along] = slice(None, -1)
+                upper[along] = slice(1, None)
+                lower, upper = tuple(lower), tuple(upper)
+                flux = coupling * (X[lower] - X[upper])
+                Y[lower] += flux
+                Y[upper] -= flux
+
+    @property
+    def _allFaceStencils(self):
+        """The face couplings, including those of grid stencils"""
+        stencils = list(self._faceStencils)
+        for shape, couplings in self._gridStencils:
+            vector, rows1, rows2 = _stencilFaces(shape, couplings)
+            stencils.append((vector, rows1, rows2, rows1, rows2))
+        return stencils
+
+    def _stencilTriplets(self):
+        """All off-diagonal `(vector, id1, id2)` insertions, including face couplings"""
+        triplets = [self._offDiagonal.triplets]
+        for vector, rows1, rows2, cols1, cols2 in self._allFaceStencils:
+            triplets += [(vector, rows1, cols1), (-vector, rows1, cols2),
+                         (-vector, rows2, cols1), (vector, rows2, cols2)]
+        return tuple(numerix.concatenate(arrays) for arrays in zip(*triplets))
+
+    def matvec(self, x):
+        """This method is required for scipy solvers.
+        """
+        return self._matvec(x)
+
+    def __getitem__(self, index):
+        id1, id2 = index
+        return self.take([id1], [id2])[0]
+
+    def __iadd__(self, other):
+        return self._iadd(other)
+
+    def __isub__(self, other):
+        return self._iadd(other, factor=-1)
+
+    def _iadd(self, other, factor=1):
+        if isinstance(other, _ScipyMatrixFreeMeshMatrix):
+            self._diagonal += factor * other._diagonal
+            self._offDiagonal.extend(other._offDiagonal, factor=factor)
+            if factor == 1:
+                self._faceStencils += other._faceStencils
+                self._gridStencils += other._gridStencils
+            else:
+                scaled = other._scaled(factor)
+                self._faceStencils += scaled._faceStencils
+                self._gridStencils += scaled._gridStencils
+        elif not (isinstance(other, (float, int)) and other == 0):
+            raise TypeError("can only add matrix-free matrices together")
+
+        return self
+
+    def __add__(self, other):
+        if isinstance(other, (float, int)) and other == 0:
+            return self
+        else:
+            return self.copy()._iadd(other)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, (float, int)) and other == 0:
+            return self
+        else:
+            return self.copy()._iadd(other, factor=-1)
+
+    def __rsub__(self, other):
+        return -self + other
+
+    def __mul__(self, other):
+        if isinstance(other, _SparseMatrix):
+            raise NotImplementedError("products of matrix-free matrices are not supported")
+
+        shape = numerix.shape(other)
+        if shape == ():
+            return self._scaled(other)
+        elif shape == (self._shape[1],):
+            return self._matvec(other)
+        else:
+            raise TypeError
+
+    def __rmul__(self, other):
+        shape = numerix.shape(other)
+        if shape == ():
+            return self._scaled(other)
+        elif shape == (self._shape[0],):
+            return self._rmatvec(other)
+        else:
+            raise TypeError
+
+    def take(self, id1, id2):
+        id1 = numerix.asarray(id1, dtype=numerix.INT_DTYPE).ravel()
+        id2 = numerix.asarray(id2, dtype=numerix.INT_DTYPE).ravel()
+
+        N = len(self._diagonal)
+        onDiagonal = (id1 == id2) & (id1 < N)
+        values = numerix.where(onDiagonal,
+                               self._diagonal[numerix.where(onDiagonal, id1, 0)],
+                               0.)
+
+        vector, rows, cols = self._stencilTriplets()
+        if len(vector) > 0:
+            keys = id1 * self._shape[1] + id2
+            order = numerix.argsort(keys)
+            sortedKeys = keys[order]
+            contributed = rows * self._shape[1] + cols
+            positions = numerix.searchsorted(sortedKeys, contributed)
+            positions = numerix.minimum(positions, len(sortedKeys) - 1)
+            match = sortedKeys[positions] == contributed
+            sums = numerix.bincount(positions[match], weights=vector[match],
+                                    minlength=len(sortedKeys))
+            # duplicate requests all receive the sum of their first occurrence
+            first = numerix.searchsorted(sortedKeys, sortedKeys)
+            values[order] += sums[first]
+
+        return values
+
+    def takeDiagonal(self):
+        return self._diagonal + self._stencilDiagonal()
+
+    def _stencilDiagonal(self):
+        N = len(self._diagonal)
+        diagonal = numerix.zeros((N,), 'd')
+        for vector, rows1, rows2, cols1, cols2 in self._allFaceStencils:
+            for rows, cols, sign in ((rows1, cols1, 1), (rows1, cols2, -1),
+                                     (rows2, cols1, -1), (rows2, cols2, 1)):
+                onDiagonal = (rows == cols)
+                if onDiagonal.any():
+                    diagonal += sign * numerix.bincount(rows[onDiagonal],
+                                                        weights=vector[onDiagonal],
+                                                        minlength=N)
+        return diagonal
+
+    def put(self, vector, id1, id2):
+        """Put elements of `vector` at positions of the matrix corresponding to (`id1`, `id2`)
+
+        Parameters
+        ----------
+        vector : array_like
+            The values to insert.
+        id1 : array_like
+            The row indices.
+        id2 : array_like
+            The column indices.
+        """
+        vector = numerix.asarray(vector, dtype=float).ravel()
+        _ScipyMatrixFreeMeshMatrix.addAt(self, vector - self.take(id1, id2), id1, id2)
+
+    def putDiagonal(self, vector):
+        if isinstance(vector, (int, float)):
+            vector = numerix.repeat(vector, len(self._diagonal))
+
+        self._diagonal[:len(vector)] = vector - self._stencilDiagonal()[:len(vector)]
+
+    def addAt(self, vector, id1, id2):
+        """Add elements of `vector` to the positions in the matrix corresponding to (`id1`,`id2`)
+
+        Diagonal contributions are summed immediately.  The remainder are
+        retained, unassembled, to be gathered by `matvec`.
+
+        Parameters
+        ----------
+        vector : array_like
+            The values to insert.
+        id1 : array_like
+            The row indices.
+        id2 : array_like
+            The column indices.
+        """
+        assert len(id1) == len(id2) == len(vector)
+
+        vector = numerix.asarray(vector, dtype=float).ravel()
+        id1 = numerix.asarray(id1, dtype=numerix.INT_DTYPE).ravel()
+        id2 = numerix.asarray(id2, dtype=numerix.INT_DTYPE).ravel()
+
+        onDiagonal = (id1 == id2)
+        if onDiagonal.all():
+            self._diagonal += numerix.bincount(id1, weights=vector,
+                                               minlength=len(self._diagonal))
+        elif onDiagonal.any():
+            self._diagonal += numerix.bincount(id1[onDiagonal],
+                                               weights=vector[onDiagonal],
+                                               minlength=len(self._diagonal))
+            offDiagonal = ~onDiagonal
+            self._offDiagonal.append(vector[offDiagonal],
+                                     id1[offDiagonal],
+                                     id2[offDiagonal])
+        else:
+            self._offDiagonal.append(vector, id1, id2)
+
+    def addAtFaces(self, vector, rows1, rows2, cols1, cols2):
+        """Add elements of `vector` as couplings between pairs of cells
+
+        Only `vector` and the indices are retained, to be applied by
+        `matvec`.
+
+        Parameters
+        ----------
+        vector : array_like
+            The values to insert, e.g., one per face.
+        rows1, rows2 : array_like
+            The row indices of the cells on either side.
+        cols1, cols2 : array_like
+            The column indices of the cells on either side.
+        """
+        vector = numerix.array(vector, dtype=float).ravel()
+        rows1, rows2, cols1, cols2 = [numerix.asarray(ids, dtype=numerix.INT_DTYPE).ravel()
+                                      for ids in (rows1, rows2, cols1, cols2)]
+        # scalar equations couple each cell to itself, so share the storage
+        if numerix.array_equal(rows1, cols1):
+            cols1 = rows1
+        if numerix.array_equal(rows2, cols2):
+            cols2 = rows2
+        self._faceStencils.append((vector, rows1, rows2, cols1, cols2))
+
+    def addAtStencil(self, shape, couplings):
+        """Add a constant coupling between neighboring cells of a structured grid
+
+        Only the coupling along each axis is retained, to be applied by
+        `matvec`.
+
+        Parameters
+        ----------
+        shape : tuple of int
+            The number of cells along each axis, the first varying fastest.
+        couplings : tuple of float
+            The value inserted for each pair of neighbors along each axis.
+        """
+        N = int(numerix.prod(shape))
+        if self._shape != (N, N):
+            _SparseMatrix.addAtStencil(self, shape, couplings)
+        else:
+            self._gridStencils.append((tuple(shape),
+                                       tuple(float(coupling) for coupling in couplings)))
+
+    def addAtDiagonal(self, vector):
+        if isinstance(vector, (int, float)):
+            vector = numerix.repeat(vector, len(self._diagonal))
+
+        ids = numerix.arange(len(vector))
+        self.addAt(vector, ids, ids)
+
+    @property
+    def numpyArray(self):
+        array = numerix.zeros(self._shape, 'd')
+        N = len(self._diagonal)
+        array[numerix.arange(N), numerix.arange(N)] = self._diagonal
+        vector, id1, id2 = self._stencilTriplets()
+        numerix.add.at(array, (id1, id2), vector)
+        return array
+
+    def flush(self):
+        """Releases the contributions, unless the matrix is cached.
+        """
+        if not getattr(self, 'cache', False):
+            self._offDiagonal = _TripletBuffer()
+            self._faceStencils = []
+            self._gridStencils = []
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
@@ -1,4 +1,5 @@
 from __future__ import unicode_literals
+from fipy.matrices.sparseMatrix import _SparseMatrix
 from fipy.tools import numerix
 
 __all__ = ["OffsetSparseMatrix"]
@@ -50,6 +51,24 @@ def OffsetSparseMatrix(SparseMatrix, numberOfVariables, numberOfEquations):
                                id1=id1 + N * self.equationIndex,
                                id2=id2 + N * self.varIndex)
 
+        def addAtFaces(self, vector, rows1, rows2, cols1, cols2):
+            if SparseMatrix.addAtFaces is _SparseMatrix.addAtFaces:
+                # the generic insertion calls `addAt()`, which offsets
+                SparseMatrix.addAtFaces(self, vector, rows1, rows2, cols1, cols2)
+                return
+
+            N = self.mesh.numberOfCells
+            SparseMatrix.addAtFaces(self,
+                                    vector=vector,
+                                    rows1=rows1 + N * self.equationIndex,
+                                    rows2=rows2 + N * self.equationIndex,
+                                    cols1=cols1 + N * self.varIndex,
+                                    cols2=cols2 + N * self.varIndex)
+
+        def addAtStencil(self, shape, couplings):
+            # the face by face insertion goes through `addAtFaces()`, which offsets
+            _SparseMatrix.addAtStencil(self, shape, couplings)
+
         def addAtDiagonal(self, vector):
             if type(vector) in [type(1), type(1.)]:
                 tmp = numerix.zeros((self.mesh.numberOfCells,), 'd')
@@ -4,6 +4,8 @@ __docformat__ = 'restructuredtext'
 
 __all__ = []
 
+import weakref
+
 import scipy.sparse as sp
 from fipy.tools import numerix
 
@@ -260,6 +262,81 @@ class _ScipyMatrix(_SparseMatrix):
         ids = numerix.arange(len(vector))
         self.addAt(vector, ids, ids)
 
+    def addAtStencil(self, shape, couplings):
+        """Add a constant coupling between neighboring cells of a structured grid
+
+        The matrix is built directly in compressed row form from the
+        offsets of the neighbors along each axis, without gathering the
+        cells on either side of each face.
+
+            >>> L = _ScipyMatrixFromShape(rows=6, cols=6)
+            >>> L.addAtStencil((3, 2), (1., 10.))
+            >>> print(L.numpyArray)
+            [[ 11.  -1.   0. -10.   0.   0.]
+             [ -1.  12.  -1.   0. -10.   0.]
+             [  0.  -1.  11.   0.   0. -10.]
+             [-10.   0.   0.  11.  -1.   0.]
+             [  0. -10.   0.  -1.  12.  -1.]
+             [  0.   0. -10.   0.  -1.  11.]]
+
+        which is what the face by face insertion gives
+
+            >>> from fipy.matrices.sparseMatrix import _SparseMatrix
+            >>> M = _ScipyMatrixFromShape(rows=6, cols=6)
+            >>> _SparseMatrix.addAtStencil(M, (3, 2), (1., 10.))
+            >>> print(numerix.allclose(L.numpyArray, M.numpyArray))
+            True
+
+        Parameters
+        ----------
+        shape : tuple of int
+            The number of cells along each axis, the first varying fastest.
+        couplings : tuple of float
+            The value inserted for each pair of neighbors along each axis.
+        """
+        N = int(numerix.prod(shape))
+        if self.matrix.shape != (N, N):
+            _SparseMatrix.addAtStencil(self, shape, couplings)
+            return
+
+        # one column per diagonal, in increasing order of offset, so that
+        # the nonzeros of each row come out sorted
+        offsets = [0]
+        strides = []
+        stride = 1
+        for n in shape:
+            strides.append(stride)
+            offsets = [-stride] + offsets + [stride]
+            stride *= n
+        ids = numerix.arange(N)
+        data = numerix.zeros((N, len(offsets)), 'd')
+        present = numerix.zeros((N, len(offsets)), bool)
+        present[:, len(shape)] = True
+        count = numerix.ones((N,), numerix.INT_DTYPE)
+        for axis, (n, coupling) in enumerate(zip(shape, couplings)):
+            position = (ids // strides[axis]) % n
+            below = len(shape) - 1 - axis
+            above = len(shape) + 1 + axis
+            present[:, below] = position > 0
+            present[:, above] = position < n - 1
+            count += present[:, below]
+            count += present[:, above]
+            data[:, below] = -float(coupling)
+            data[:, above] = -float(coupling)
+            data[:, len(shape)] += numerix.where(present[:, below], float(coupling), 0.)
+            data[:, len(shape)] += numerix.where(present[:, above], float(coupling), 0.)
+        columns = ids[:, numerix.newaxis] + numerix.array(offsets)
+
+        indptr = numerix.zeros((N + 1,), numerix.INT_DTYPE)
+        numerix.cumsum(count, out=indptr[1:])
+        temp = sp.csr_matrix((data[present], columns[present], indptr), shape=(N, N))
+        temp.has_sorted_indices = True
+
+        if self.matrix.nnz == 0:
+            self.matrix = temp
+        else:
+            self.matrix = self.matrix + temp
+
     @property
     def numpyArray(self):
         return self.matrix.toarray()
@@ -375,6 +452,221 @@ class _ScipyMatrix(_SparseMatrix):
         """
         return _ScipyMatrix(matrix=self.matrix.transpose(copy=True))
 
+class _ScipySparsityPattern(object):
+    """Symbolic CSR structure of a batch of `(id1, id2)` insertions
+
+    The (expensive) sort and duplicate reduction needed to turn
+    coordinate triplets into compressed sparse rows is done once, when
+    the pattern is created.  Each insertion is mapped to the slot of the
+    CSR `data` array it accumulates into, so numeric assembly is a single
+    scatter-add.
+
+    >>> pattern = _ScipySparsityPattern(shape=(3, 3),
+    ...                                 id1=[1, 2, 0, 0, 1],
+    ...                                 id2=[2, 2, 0, 0, 2])
+    >>> print(pattern.nnz)
+    3
+    >>> print(pattern.matches(shape=(3, 3),
+    ...                       id1=numerix.array([1, 2, 0, 0, 1]),
+    ...                       id2=numerix.array([2, 2, 0, 0, 2])))
+    True
+    >>> print(pattern.matches(shape=(3, 3),
+    ...                       id1=numerix.array([1, 2, 0, 0, 1]),
+    ...                       id2=numerix.array([2, 2, 0, 1, 2])))
+    False
+    >>> print(pattern.assemble([1.73, 2.2, 8.4, 3.9, 1.23]).toarray())
+    [[ 12.3    0.     0.  ]
+     [  0.     0.     2.96]
+     [  0.     0.     2.2 ]]
+    """
+
+    def __init__(self, shape, id1, id2):
+        """
+        Parameters
+        ----------
+        shape : tuple of int
+            The shape of the matrix being assembled.
+        id1 : array_like
+            The row indices.
+        id2 : array_like
+            The column indices.
+        """
+        self.shape = tuple(shape)
+        self.id1 = numerix.array(id1, dtype=numerix.INT_DTYPE)
+        self.id2 = numerix.array(id2, dtype=numerix.INT_DTYPE)
+
+        rows, cols = self.shape
+        keys = self.id1 * cols + self.id2
+        keys, self.mapping = numerix.unique(keys, return_inverse=True)
+        self.nnz = len(keys)
+
+        self.indices = (keys % cols).astype(numerix.INT_DTYPE)
+        self.indptr = numerix.searchsorted(keys // cols,
+                                           numerix.arange(rows + 1)).astype(numerix.INT_DTYPE)
+
+        self._unions = {}
+
+    def matches(self, shape, id1, id2):
+        """Whether this pattern was built from the same insertions"""
+        return (self.shape == tuple(shape)
+                and numerix.array_equal(self.id1, id1)
+                and numerix.array_equal(self.id2, id2))
+
+    def assemble(self, vector):
+        """Accumulate `vector` into a new CSR matrix with this pattern
+
+        Parameters
+        ----------
+        vector : array_like
+            The values to insert, in the order of the pattern's `id1`
+            and `id2`.
+
+        Returns
+        -------
+        ~scipy.sparse.csr_matrix
+        """
+        data = numerix.bincount(self.mapping,
+                                weights=numerix.asarray(vector, dtype=float),
+                                minlength=self.nnz)
+        return self._matrix(data)
+
+    def _matrix(self, data):
+        # scipy is free to modify the structure of the matrix in place,
+        # e.g., `eliminate_zeros()`, so the pattern's arrays are copied
+        # (which is cheap compared to recomputing them)
+        return sp.csr_matrix((data, self.indices.copy(), self.indptr.copy()),
+                             shape=self.shape, copy=False)
+
+    #: number of distinct unions retained for each pattern
+    maxUnions = 16
+
+    def union(self, other):
+        """Structure holding the entries of this pattern and of `other`
+
+        >>> diagonal = _ScipySparsityPattern(shape=(3, 3),
+        ...                                  id1=[0, 1, 2], id2=[0, 1, 2])
+        >>> upper = _ScipySparsityPattern(shape=(3, 3),
+        ...                               id1=[0, 1, 1], id2=[1, 2, 2])
+        >>> union, slots, mapping = diagonal.union(upper)
+        >>> print(union.nnz)
+        5
+        >>> print(slots)
+        [0 2 4]
+        >>> print(mapping)
+        [1 3 3]
+        >>> union is diagonal.union(upper)[0]
+        True
+        >>> diagonal.union(diagonal)[0] is diagonal
+        True
+
+        Parameters
+        ----------
+        other : ~fipy.matrices.scipyMatrix._ScipySparsityPattern
+            The pattern of the insertions being added.
+
+        Returns
+        -------
+        union : ~fipy.matrices.scipyMatrix._ScipySparsityPattern
+            The combined structure, which is this pattern itself if it
+            already holds every entry of `other`.
+        slots : ndarray
+            The slot of `union` that each entry of this pattern moves to.
+        mapping : ndarray
+            The slot of `union` that each insertion of `other` accumulates
+            into.
+        """
+        found = self._unions.get(id(other))
+        if found is not None and found[0] is other:
+            return found[1:]
+
+        rows = numerix.repeat(numerix.arange(self.shape[0], dtype=numerix.INT_DTYPE),
+                              numerix.diff(self.indptr))
+        union = _ScipySparsityPattern(shape=self.shape,
+                                      id1=numerix.concatenate((rows, other.id1)),
+                                      id2=numerix.concatenate((self.indices, other.id2)))
+        slots = union.mapping[:self.nnz]
+        mapping = union.mapping[self.nnz:]
+        if union.nnz == self.nnz:
+            union = self
+
+        if len(self._unions) >= self.maxUnions:
+            self._unions.clear()
+        self._unions[id(other)] = (other, union, slots, mapping)
+
+        return union, slots, mapping
+
+class _ScipySparsityPatternCache(object):
+    """Sparsity patterns previously seen for each `Mesh`
+
+    Terms on a fixed mesh insert values at the same positions on every
+    sweep and every time step, so the CSR structure is only computed the
+    first time a particular batch of insertions is seen.  Candidate
+    patterns are confirmed by comparing the insertion indices, which is
+    much cheaper than sorting them.
+
+    >>> from fipy import Grid1D
+    >>> mesh = Grid1D(nx=3)
+    >>> cache = _ScipySparsityPatternCache()
+    >>> p1 = cache.pattern(mesh, (3, 3), numerix.arange(3), numerix.arange(3))
+    >>> p2 = cache.pattern(mesh, (3, 3), numerix.arange(3), numerix.arange(3))
+    >>> p1 is p2
+    True
+    >>> p3 = cache.pattern(mesh, (3, 3), numerix.arange(3), numerix.arange(3)[::-1])
+    >>> p1 is p3
+    False
+    >>> print(cache.hits, cache.misses)
+    1 2
+    """
+
+    #: number of distinct patterns retained for each mesh and shape
+    maxPatterns = 16
+
+    def __init__(self):
+        self._patterns = weakref.WeakKeyDictionary()
+        self.hits = 0
+        self.misses = 0
+
+    def pattern(self, mesh, shape, id1, id2):
+        """Obtain the (possibly cached) pattern for the insertions
+
+        Parameters
+        ----------
+        mesh : ~fipy.meshes.mesh.Mesh
+            The `Mesh` the insertions are associated with.
+        shape : tuple of int
+            The shape of the matrix being assembled.
+        id1 : array_like
+            The row indices.
+        id2 : array_like
+            The column indices.
+
+        Returns
+        -------
+        ~fipy.matrices.scipyMatrix._ScipySparsityPattern
+        """
+        patterns = self._patterns.setdefault(mesh, {})
+        candidates = patterns.setdefault((tuple(shape), len(id1)), [])
+
+        for i, pattern in enumerate(candidates):
+            if pattern.matches(shape, id1, id2):
+                self.hits += 1
+                # most recently used to the front
+                candidates.insert(0, candidates.pop(i))
+                return pattern
+
+        self.misses += 1
+        pattern = _ScipySparsityPattern(shape=shape, id1=id1, id2=id2)
+        candidates.insert(0, pattern)
+        del candidates[self.maxPatterns:]
+
+        return pattern
+
+    def clear(self):
+        """Forget all patterns"""
+        self._patterns.clear()
+
+_sparsityPatterns = _ScipySparsityPatternCache()
+
 class _ScipyMatrixFromShape(_ScipyMatrix):
 
     def __init__(self, rows, cols,
@@ -444,6 +736,85 @@ class _ScipyBaseMeshMatrix(_ScipyMatrixFromShape):
         """
         return var.value
 
+    def addAt(self, vector, id1, id2):
+        """Add elements of `vector` to the positions in the matrix corresponding to (`id1`,`id2`)
+
+        The CSR structure for a given set of positions on `mesh` is only
+        computed the first time those positions are seen.  Values at
+        positions the matrix already holds are accumulated into its `data`
+        in place.
+
+        Parameters
+        ----------
+        vector : array_like
+            The values to insert.
+        id1 : array_like
+            The row indices.
+        id2 : array_like
+            The column indices.
+
+        Examples
+        --------
+
+            >>> from fipy import Grid1D
+            >>> mesh = Grid1D(nx=3)
+            >>> L = _ScipyMeshMatrix(mesh=mesh)
+            >>> L.addAt([1.73, 2.2, 8.4, 3.9, 1.23], [1, 2, 0, 0, 1], [2, 2, 0, 0, 2])
+            >>> L.addAt([1., 1., 1.], [0, 1, 2], [0, 1, 2])
+            >>> print(L)
+            13.300000      ---        ---    
+                ---     1.000000   2.960000  
+                ---        ---     3.200000  
+
+        Repeating insertions reuses the storage of the matrix
+
+            >>> data = L.matrix.data
+            >>> L.addAt([1., 1., 1.], [0, 1, 2], [0, 1, 2])
+            >>> L.matrix.data is data
+            True
+            >>> print(L)
+            14.300000      ---        ---    
+                ---     2.000000   2.960000  
+                ---        ---     4.200000  
+        """
+        assert len(id1) == len(id2) == len(vector)
+
+        pattern = _sparsityPatterns.pattern(mesh=self.mesh,
+                                            shape=self.matrix.shape,
+                                            id1=id1,
+                                            id2=id2)
+        structure = self._structure()
+
+        if structure is not None:
+            union, slots, mapping = structure.union(pattern)
+            if union is not structure:
+                data = numerix.zeros(union.nnz, dtype=self.matrix.dtype)
+                data[slots] = self.matrix.data
+                self._setStructure(union, union._matrix(data))
+            numerix.add.at(self.matrix.data, mapping,
+                           numerix.asarray(vector, dtype=self.matrix.dtype))
+        elif self.matrix.nnz == 0:
+            self._setStructure(pattern, pattern.assemble(vector))
+        else:
+            self.matrix = self.matrix + pattern.assemble(vector)
+
+    def _setStructure(self, pattern, matrix):
+        self.matrix = matrix
+        self._pattern = (pattern, matrix, matrix.indices, matrix.indptr)
+
+    def _structure(self):
+        """The pattern of the entries of `matrix`, if it is still the
+        one that `addAt` last assembled"""
+        pattern, matrix, indices, indptr = getattr(self, "_pattern",
+                                                   (None, None, None, None))
+        if (self.matrix is matrix
+            and matrix.indices is indices
+            and matrix.indptr is indptr
+            and matrix.nnz == pattern.nnz):
+            return pattern
+        else:
+            return None
+
 class _ScipyRowMeshMatrix(_ScipyBaseMeshMatrix):
     def __init__(self, mesh, cols, numberOfEquations=1,
                  nonZerosPerRow=0, exactNonZeros=False,
@@ -513,6 +884,9 @@ class _ScipyColMeshMatrix(_ScipyBaseMeshMatrix):
                                                   storeZeros=storeZeros)
 
 class _ScipyMeshMatrix(_ScipyRowMeshMatrix):
+    # coupled equations can be assembled block by block
+    _blockAssembly = True
+
     def __init__(self, mesh, numberOfVariables=1, numberOfEquations=1,
                  nonZerosPerRow=0, exactNonZeros=False, matrix=None, storeZeros=True):
         """Creates a `_ScipyBaseMeshMatrix` associated with equations and variables.
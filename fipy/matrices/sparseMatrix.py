@@ -117,6 +117,47 @@ class _SparseMatrix(object):
     def addAtDiagonal(self, vector):
         raise NotImplementedError
 
+    def addAtFaces(self, vector, rows1, rows2, cols1, cols2):
+        """Add elements of `vector` as couplings between pairs of cells
+
+        Each element `v` adds `v` to (`rows1`, `cols1`) and (`rows2`,
+        `cols2`) and subtracts `v` from (`rows1`, `cols2`) and (`rows2`,
+        `cols1`), as for the flux across a face between two cells.
+
+        Parameters
+        ----------
+        vector : array_like
+            The values to insert, e.g., one per face.
+        rows1, rows2 : array_like
+            The row indices of the cells on either side.
+        cols1, cols2 : array_like
+            The column indices of the cells on either side.
+        """
+        # a single insertion of the four contributions lets the
+        # matrix sum duplicates once rather than performing four
+        # sparse additions
+        self.addAt(numerix.concatenate((vector, -vector, -vector, vector)),
+                   numerix.concatenate((rows1, rows1, rows2, rows2)),
+                   numerix.concatenate((cols1, cols2, cols1, cols2)))
+
+    def addAtStencil(self, shape, couplings):
+        """Add a constant coupling between neighboring cells of a structured grid
+
+        Equivalent to `addAtFaces()` for every pair of adjacent cells of a
+        grid of `shape` cells, numbered with the first axis varying
+        fastest, with the value for each pair taken from `couplings`
+        according to the axis along which they are adjacent.
+
+        Parameters
+        ----------
+        shape : tuple of int
+            The number of cells along each axis.
+        couplings : tuple of float
+            The value inserted for each pair of neighbors along each axis.
+        """
+        vector, rows1, rows2 = _stencilFaces(shape, couplings)
+        self.addAtFaces(vector, rows1, rows2, rows1, rows2)
+
     def exportMmf(self, filename):
         raise NotImplementedError
 
@@ -148,6 +189,20 @@ class _SparseMatrix(object):
 ##         numMatrix = self.take(indices[0].ravel(), indices[1].ravel())
 ##      return numerix.reshape(numMatrix, shape)
 
+def _stencilFaces(shape, couplings):
+    """The `(vector, rows1, rows2)` face couplings of a structured grid stencil"""
+    ids = numerix.arange(int(numerix.prod(shape))).reshape(tuple(shape)[::-1])
+    vectors, lower, upper = [], [], []
+    for axis, coupling in enumerate(couplings):
+        along = len(shape) - 1 - axis
+        n = shape[axis]
+        lower.append(numerix.take(ids, numerix.arange(n - 1), axis=along).ravel())
+        upper.append(numerix.take(ids, numerix.arange(1, n), axis=along).ravel())
+        vectors.append(numerix.repeat(float(coupling), len(lower[-1])))
+    return (numerix.concatenate(vectors),
+            numerix.concatenate(lower).astype(numerix.INT_DTYPE),
+            numerix.concatenate(upper).astype(numerix.INT_DTYPE))
+
 class _Mesh2Matrix(object):
     _bodies = None
     _ghosts = None
@@ -10,7 +10,7 @@ if solver_suite == 'trilinos':
 elif solver_suite == 'no-pysparse':
     docTestModuleNames = ('trilinosMatrix',)
 elif solver_suite == 'scipy' or solver_suite == 'pyamg':
-    docTestModuleNames = ('scipyMatrix',)
+    docTestModuleNames = ('scipyMatrix', 'matrixFreeMatrix', 'blockSparseMatrix')
 elif solver_suite == 'pysparse':
     docTestModuleNames = ('pysparseMatrix',)
 elif solver_suite == 'pyamgx':
@@ -20,6 +20,8 @@ elif solver_suite == 'petsc':
 else:
     raise ImportError('Unknown solver package %s' % solver_suite)
 
+docTestModuleNames += ('deferredSparseMatrix',)
+
 def _suite():
     return _LateImportDocTestSuite(docTestModuleNames=docTestModuleNames, base=__name__)
 
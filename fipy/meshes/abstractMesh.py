@@ -37,6 +37,12 @@ class AbstractMesh(object):
     def _setGeometry(self):
         raise NotImplementedError
 
+    # increased with every change to the topology or geometry
+    _version = 0
+
+    def _stamp(self):
+        self._version += 1
+
     """
     Scale business
     """
@@ -49,6 +55,7 @@ class AbstractMesh(object):
         scaleLength : float
         """
         self._scale['length'] = scaleLength
+        self._stamp()
 
     scale = property(lambda s: s._scale, _setScale)
 
@@ -65,6 +72,123 @@ class AbstractMesh(object):
     def getNearestCell(self, point):
         return self._getCellsByID([self._getNearestCellID(point)])[0]
 
+    @property
+    def _cellCenterTree(self):
+        """:class:`~scipy.spatial.cKDTree` of the global cell centers
+
+        The tree is built when first needed and again whenever the
+        geometry changes.  `None` if :mod:`scipy` is not available.
+        """
+        cached = self.__dict__.get("_cellCenterTreeCache")
+        if cached is None or cached[0] != self._version:
+            try:
+                from scipy.spatial import cKDTree
+            except ImportError:
+                return None
+            centers = numerix.asarray(self.cellCenters.globalValue)
+            cached = (self._version, cKDTree(centers.T))
+            self._cellCenterTreeCache = cached
+
+        return cached[1]
+
+    def _globalPoints(self, points):
+        """`points` as a (`dim`, M) array"""
+        return numerix.reshape(numerix.asarray(points, dtype=float), (self.dim, -1))
+
+    def getNearestCellIDs(self, points, k=1):
+        """Global IDs of the cells whose centers are nearest to `points`
+
+        The search uses a spatial index of the cell centers, built once
+        for the mesh, when :mod:`scipy` is available, and compares every
+        point with every cell center when it is not.
+
+            >>> from fipy import Tri2D
+            >>> mesh = Tri2D(nx=3, ny=2)
+            >>> points = ((0.45, 2.8, 1.3), (0.4, 0.15, 1.55))
+            >>> print(mesh.getNearestCellIDs(points, k=3))
+            [[18 20 16]
+             [12  2 10]
+             [ 0 14 22]]
+            >>> print(numerix.allequal(mesh.getNearestCellIDs(points)[0],
+            ...                        numerix.nearest(mesh.cellCenters.globalValue,
+            ...                                        points)))
+            True
+
+        The spatial index is only rebuilt when the geometry changes
+
+            >>> tree = mesh._cellCenterTree # doctest: +SCIPY
+            >>> print(mesh._cellCenterTree is tree) # doctest: +SCIPY
+            True
+            >>> mesh._setGeometry()
+            >>> print(mesh._cellCenterTree is tree) # doctest: +SCIPY
+            False
+
+        Parameters
+        ----------
+        points : array_like
+            Coordinates of M points, with shape (`dim`, M).
+        k : int
+            Number of cells to find for each point, no more than the number
+            of cells in the mesh.
+
+        Returns
+        -------
+        ndarray
+            IDs of the `k` cells nearest to each point, nearest first, with
+            shape (`k`, M).  Cells whose centers are equally distant from a
+            point may be found in any order.
+        """
+        points = self._globalPoints(points)
+        tree = self._cellCenterTree
+        if tree is not None:
+            distances, IDs = tree.query(points.T, k=k)
+            return numerix.reshape(IDs, (points.shape[-1], k)).T
+        elif k == 1:
+            centers = self.cellCenters.globalValue
+            return numerix.nearest(data=centers, points=points)[numerix.newaxis]
+        else:
+            centers = self.cellCenters.globalValue
+            IDs = numerix.empty((k, points.shape[-1]), dtype=numerix.INT_DTYPE)
+            for i, point in enumerate(points.T):
+                distances = numerix.sum((centers - point[..., numerix.newaxis])**2, axis=0)
+                IDs[:, i] = numerix.argsort(distances, kind="stable")[:k]
+            return IDs
+
+    def getCellIDsWithin(self, points, radius):
+        """Global IDs of the cells whose centers are within `radius` of `points`
+
+        Useful for monitoring the solution in the vicinity of probe points.
+
+            >>> from fipy import Grid2D
+            >>> mesh = Grid2D(nx=4, ny=3)
+            >>> for IDs in mesh.getCellIDsWithin(((0.5, 2.), (0.5, 1.5)), radius=1.2):
+            ...     print(IDs)
+            [0 1 4]
+            [ 1  2  5  6  9 10]
+
+        Parameters
+        ----------
+        points : array_like
+            Coordinates of M points, with shape (`dim`, M).
+        radius : float
+            Largest distance from a point to the centers of its cells.
+
+        Returns
+        -------
+        list of ndarray
+            Sorted IDs of the cells near each of the M points.
+        """
+        points = self._globalPoints(points)
+        tree = self._cellCenterTree
+        if tree is not None:
+            return [numerix.sort(numerix.array(IDs, dtype=numerix.INT_DTYPE))
+                    for IDs in tree.query_ball_point(points.T, r=radius)]
+        else:
+            centers = self.cellCenters.globalValue
+            return [numerix.nonzero(numerix.sum((centers - point[..., numerix.newaxis])**2,
+                                                axis=0) <= radius**2)[0].astype(numerix.INT_DTYPE)
+                    for point in points.T]
+
     def _getCellFaceIDsInternal(self):
         return self._cellFaceIDs
 
@@ -261,7 +385,10 @@ class AbstractMesh(object):
             numerix.put(self.cellFaceIDs[i], faceCellIDs, cellFaceIDs[i])
 
         ## calculate new topology
+        if hasattr(self, '_cellFaceIncidenceMatrix'):
+            del self._cellFaceIncidenceMatrix
         self._setTopology()
+        self._stamp()
 
         ## calculate new geometry
         self._handleFaceConnection()
@@ -499,6 +626,69 @@ class AbstractMesh(object):
                                                      self.interiorFaceIDs, axis=1)
         return self._interiorFaceCellIDs
 
+    @property
+    def _cellFaceIncidence(self):
+        """Sparse matrix of the orientation of each face with respect to each cell
+
+        Row `i` holds the `_cellToFaceOrientations` of cell `i` in the
+        columns of its faces, so that oriented sums over the faces of each
+        cell are a single sparse product.  Built once and cached.
+
+        >>> from fipy.meshes import Grid1D
+        >>> mesh = Grid1D(nx=3)
+        >>> print(mesh._cellFaceIncidence.toarray())
+        [[ 1.  1.  0.  0.]
+         [ 0. -1.  1.  0.]
+         [ 0.  0. -1.  1.]]
+        """
+        if not hasattr(self, '_cellFaceIncidenceMatrix'):
+            self._cellFaceIncidenceMatrix = self._calcCellFaceIncidence()
+        return self._cellFaceIncidenceMatrix
+
+    def _calcCellFaceIncidence(self):
+        from scipy import sparse
+
+        ids = self.cellFaceIDs
+        orientations = self._cellToFaceOrientations
+        present = ~(MA.getmaskarray(ids) | MA.getmaskarray(orientations))
+        cellIDs = numerix.indices(present.shape)[-1]
+
+        return sparse.csr_matrix((numerix.array(MA.filled(orientations, 0), 'd')[present],
+                                  (cellIDs[present],
+                                   numerix.array(MA.filled(ids, 0))[present])),
+                                 shape=(self.numberOfCells, self.numberOfFaces))
+
+    def _sumOverCellFaces(self, faceValues):
+        """Sum oriented `faceValues` over the faces of each cell
+
+        `faceValues` may have leading element dimensions; the sum is over
+        the last (face) axis only.
+
+        >>> from fipy.meshes import Grid1D
+        >>> mesh = Grid1D(nx=3)
+        >>> print(mesh._sumOverCellFaces(numerix.arange(4.)**2))
+        [ 1.  3.  5.]
+        >>> print(mesh._sumOverCellFaces([[1., 1., 1., 1.],
+        ...                               [0., 1., 2., 3.]]))
+        [[ 2.  0.  0.]
+         [ 1.  1.  1.]]
+
+        The result agrees with the masked sum over `cellFaceIDs`
+
+        >>> from fipy.meshes import Grid2D
+        >>> mesh = Grid2D(nx=3, ny=2)
+        >>> faceValues = numerix.arange(mesh.numberOfFaces, dtype=float)
+        >>> masked = MA.sum(numerix.take(faceValues, mesh.cellFaceIDs)
+        ...                 * mesh._cellToFaceOrientations, 0)
+        >>> print(numerix.allclose(mesh._sumOverCellFaces(faceValues), masked))
+        True
+        """
+        faceValues = numerix.asarray(faceValues)
+        shape = faceValues.shape
+        faceValues = faceValues.reshape((int(numerix.prod(shape[:-1])), shape[-1]))
+        cellValues = (self._cellFaceIncidence * faceValues.T).T
+        return cellValues.reshape(shape[:-1] + (self.numberOfCells,))
+
     @property
     def _numberOfFacesPerCell(self):
         cellFaceIDs = self.cellFaceIDs
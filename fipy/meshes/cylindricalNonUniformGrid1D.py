@@ -53,6 +53,9 @@ class CylindricalNonUniformGrid1D(NonUniformGrid1D):
                                                           *args,
                                                           **kwargs)
 
+        # the geometry is calculated before the vertices are moved
+        self._evaluateGeometry()
+
         self.vertexCoords += origin
         self.args['origin'] = origin
 
@@ -29,6 +29,10 @@ class CylindricalNonUniformGrid2D(NonUniformGrid2D):
         super(CylindricalNonUniformGrid2D, self).__init__(dx=dx, dy=dy, nx=nx, ny=ny, overlap=overlap,
                         communicator=communicator, *args, **kwargs)
 
+        # the geometry is calculated before the face areas and the
+        # vertices are changed in place
+        self._evaluateGeometry()
+
         self._faceAreas *= self.faceCenters[0].value
 
         self._scaledFaceAreas = self._scale['area'] * self._faceAreas
@@ -7,8 +7,12 @@ from builtins import range
 from builtins import str
 __docformat__ = 'restructuredtext'
 
+import hashlib
+import json
 import logging
 import os
+import re
+import shutil
 from subprocess import Popen, PIPE
 import sys
 import tempfile
@@ -19,6 +23,7 @@ _log = logging.getLogger(__name__)
 
 from fipy.tools import numerix as nx
 from fipy.tools import parallelComm
+from fipy.tools import parser
 from fipy.tools import serialComm
 from fipy.tools.version import Version, parse_version
 from fipy.tests.doctestPlus import register_skipper
@@ -93,7 +98,13 @@ def gmshVersion(communicator=parallelComm):
     return communicator.bcast(verStr)
 
 def _gmshVersion(communicator=parallelComm):
-    version = gmshVersion(communicator) or "0.0"
+    global _gmshVersionString
+
+    # only ask the `gmsh` executable once
+    if _gmshVersionString is None:
+        _gmshVersionString = gmshVersion(communicator)
+
+    version = _gmshVersionString or "0.0"
     try:
         version = parse_version(version)
     except ValueError:
@@ -104,9 +115,104 @@ def _gmshVersion(communicator=parallelComm):
 
     return version
 
+_gmshVersionString = None
+
+def _meshCacheDirectory():
+    """Directory in which to cache meshes read from Gmsh, if any"""
+    directory = parser.parse("--gmsh-cache", action="store", type="string")
+    if directory is None:
+        directory = os.environ.get("FIPY_GMSH_CACHE")
+    return directory
+
+class _MeshCacheEntry(object):
+    """Arrays read from a Gmsh `MSH` file, stored on disk for reuse
+
+    An entry is identified by a hash of everything that determines the
+    mesh: the geometry script or `.msh` file, the arguments passed to
+    Gmsh, the version of Gmsh, the dimensions, and the number of
+    partitions and the partition read.  The arrays are stored as `.npy`
+    files, which are memory mapped, copy-on-write, when loaded.
+
+    >>> directory = tempfile.mkdtemp()
+    >>> entry = _MeshCacheEntry(directory, b"Point(1) = {0, 0, 0};", ["-2"], "4.11.1", 2)
+    >>> print(entry.exists)
+    False
+    >>> entry.save(dict(vertexCoords=nx.array([[0., 1.], [0., 0.]])),
+    ...            dict(dimensions=2))
+    >>> print(entry.exists)
+    True
+    >>> arrays, meta = entry.load()
+    >>> print(arrays["vertexCoords"])
+    [[ 0.  1.]
+     [ 0.  0.]]
+    >>> print(meta["dimensions"])
+    2
+
+    Different inputs give different entries
+
+    >>> print(_MeshCacheEntry(directory, b"Point(1) = {0, 0, 0};", ["-3"], "4.11.1", 2).exists)
+    False
+
+    >>> import shutil
+    >>> shutil.rmtree(directory)
+    """
+
+    _version = "1"
+
+    def __init__(self, directory, *sources):
+        key = hashlib.sha256(self._version.encode("ascii"))
+        for source in sources:
+            if not isinstance(source, bytes):
+                source = repr(source).encode("utf-8")
+            key.update(b"%d:" % len(source))
+            key.update(source)
+        self.directory = directory
+        self.path = os.path.join(directory, key.hexdigest())
+
+    @property
+    def exists(self):
+        # entries are renamed into place once complete
+        return os.path.isdir(self.path)
+
+    def load(self):
+        """Returns the arrays and the other data of the entry"""
+        with open(os.path.join(self.path, "meta.json"), "r") as f:
+            meta = json.load(f)
+
+        arrays = dict()
+        for name in meta.pop("arrays"):
+            arrays[name] = nx.asarray(nx.load(os.path.join(self.path, name + ".npy"),
+                                              mmap_mode="c"))
+
+        return arrays, meta
+
+    def save(self, arrays, meta):
+        """Store `arrays` and the JSON serializable `meta` data"""
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        temporary = tempfile.mkdtemp(dir=self.directory, prefix=".")
+        try:
+            for name, value in arrays.items():
+                nx.save(os.path.join(temporary, name + ".npy"), value)
+            meta = dict(meta, arrays=sorted(arrays.keys()))
+            with open(os.path.join(temporary, "meta.json"), "w") as f:
+                json.dump(meta, f)
+            os.rename(temporary, self.path)
+        except OSError:
+            # another process stored the same entry first
+            # or the cache can't be written
+            shutil.rmtree(temporary, ignore_errors=True)
+
 def openMSHFile(name, dimensions=None, coordDimensions=None, communicator=parallelComm, overlap=1, mode='r', background=None):
     """Open a Gmsh `MSH` file
 
+    If the :envvar:`FIPY_GMSH_CACHE` environment variable, or the
+    `--gmsh-cache` command line flag, names a directory, the mesh read from
+    a file is stored there and later requests for the same mesh load it
+    without running Gmsh or parsing the file.  Meshes generated with a
+    `background` are not cached, nor do cached meshes notice changes to
+    files merged or included by a Gmsh script.
+
     Parameters
     ----------
     filename : str
@@ -147,20 +253,14 @@ def openMSHFile(name, dimensions=None, coordDimensions=None, communicator=parall
     if mode.startswith('r'):
         if not os.path.exists(name):
             # we must have been passed a Gmsh script
-            if communicator.procID == 0:
-                (f, geoFile) = tempfile.mkstemp('.geo')
-                file = os.fdopen(f, 'w')
-                file.writelines(name)
-                file.close()
-            else:
-                geoFile = None
-            communicator.Barrier()
-            geoFile = communicator.bcast(geoFile)
+            # (written to a file once we know Gmsh must run)
+            geoFile = None
+            geometry = name.encode('utf-8')
         else:
             # Gmsh isn't picky about file extensions,
             # so we peek at the start of the file to deduce the type
-            f = open(name, 'r')
-            filetype = f.readline().strip()
+            f = open(name, 'rb')
+            filetype = f.readline().strip().decode('latin-1')
             f.close()
             if filetype == "$MeshFormat":
                 geoFile = None
@@ -174,7 +274,11 @@ def openMSHFile(name, dimensions=None, coordDimensions=None, communicator=parall
                 # must be a Gmsh script file
                 geoFile = name
 
-        if geoFile is not None:
+            # only read if the mesh cache needs it
+            geometry = None
+
+        gmshFlags = []
+        if geoFile is not None or not os.path.exists(name):
             gmshFlags = ["-%d" % dimensions, "-nopopup"]
 
             if communicator.Nproc > 1:
@@ -200,6 +304,42 @@ def openMSHFile(name, dimensions=None, coordDimensions=None, communicator=parall
 
             gmshFlags += ["-format", "msh2", "-smooth", "8"]
 
+        cacheEntry = None
+        cacheDirectory = _meshCacheDirectory()
+        if cacheDirectory is not None and background is None:
+            if geometry is None:
+                with open(name, 'rb') as f:
+                    geometry = f.read()
+            cacheEntry = _MeshCacheEntry(cacheDirectory,
+                                         geometry,
+                                         gmshFlags,
+                                         str(version),
+                                         dimensions,
+                                         coordDimensions,
+                                         communicator.Nproc,
+                                         communicator.procID)
+
+            # every process must agree to skip Gmsh
+            if communicator.all(nx.array(cacheEntry.exists)):
+                return MSHFile(filename=None,
+                               dimensions=dimensions,
+                               coordDimensions=coordDimensions,
+                               communicator=communicator,
+                               mode=mode,
+                               cacheEntry=cacheEntry)
+
+        if not os.path.exists(name):
+            if communicator.procID == 0:
+                (f, geoFile) = tempfile.mkstemp('.geo')
+                file = os.fdopen(f, 'w')
+                file.writelines(name)
+                file.close()
+            else:
+                geoFile = None
+            communicator.Barrier()
+            geoFile = communicator.bcast(geoFile)
+
+        if geoFile is not None:
             if background is not None:
                 if communicator.procID == 0:
                     f, bgmf = tempfile.mkstemp(suffix=".pos")
@@ -249,6 +389,7 @@ def openMSHFile(name, dimensions=None, coordDimensions=None, communicator=parall
     elif mode.startswith('w'):
         mshFile = name
         gmshOutput = ""
+        cacheEntry = None
     else:
         raise ValueError("mode string must begin with one of 'r' or 'w', not '%s'" % mode[0])
 
@@ -258,7 +399,8 @@ def openMSHFile(name, dimensions=None, coordDimensions=None, communicator=parall
                    communicator=communicator,
                    gmshOutput=gmshOutput,
                    mode=mode,
-                   fileIsTemporary=fileIsTemporary)
+                   fileIsTemporary=fileIsTemporary,
+                   cacheEntry=cacheEntry)
 
 def openPOSFile(name, communicator=parallelComm, mode='w'):
     """Open a Gmsh `POS` post-processing file
@@ -270,6 +412,127 @@ def openPOSFile(name, communicator=parallelComm, mode='w'):
                    communicator=communicator,
                    mode=mode)
 
+_elementNodeCounts = {1: 2, 2: 3, 3: 4, 4: 4, 5: 8, 6: 6, 7: 5, 8: 3, 9: 6,
+                      10: 9, 11: 10, 12: 27, 13: 18, 14: 14, 15: 1, 16: 8,
+                      17: 20, 18: 15, 19: 13, 20: 9, 21: 10, 22: 12, 23: 15,
+                      24: 15, 25: 21, 26: 4, 27: 5, 28: 6, 29: 20, 30: 35,
+                      31: 56, 92: 64, 93: 125}
+
+def _nodesPerElement(elementType):
+    """Number of nodes of a Gmsh element type
+
+    Binary element records are not delimited, so their lengths must be
+    known in advance.
+    """
+    try:
+        return _elementNodeCounts[elementType]
+    except KeyError:
+        raise GmshException("Gmsh element type %d is not supported" % elementType)
+
+def _tokenize(text, dtype):
+    r"""Parse whitespace separated numbers
+
+    Parameters
+    ----------
+    text : bytes
+        ASCII contents of a section of a MSH file.
+    dtype : ~numpy.dtype
+        Type of the numbers.
+
+    Returns
+    -------
+    values : ndarray
+        All numbers in `text`.
+    counts : ndarray
+        How many of `values` are on each non-blank line of `text`.
+
+    >>> values, counts = _tokenize(b"3\n1  2 3\n\n 4\t5 \r\n", dtype=int)
+    >>> print(values)
+    [3 1 2 3 4 5]
+    >>> print(counts)
+    [1 3 2]
+    """
+    characters = nx.frombuffer(text, dtype=nx.uint8)
+    blank = nx.in1d(characters, nx.frombuffer(b" \t\r\n", dtype=nx.uint8))
+    starts = ~blank
+    starts[1:] &= blank[:-1]
+    lines = nx.searchsorted(nx.flatnonzero(characters == ord("\n")),
+                            nx.flatnonzero(starts))
+    counts = nx.bincount(lines)
+
+    return nx.fromstring(text, dtype=dtype, sep=" "), counts[counts > 0]
+
+def _gather(values, starts, lengths, fill, width=0):
+    """Rows of `lengths` consecutive `values` from each of `starts`, padded
+    with `fill` to the longest row, or `width`
+
+    >>> print(_gather(nx.arange(10), nx.array([1, 5]), nx.array([3, 1]), fill=-1))
+    [[ 1  2  3]
+     [ 5 -1 -1]]
+    """
+    width = max(width, lengths.max(initial=0))
+    columns = nx.arange(width)
+    valid = columns < lengths[..., nx.newaxis]
+    indices = nx.where(valid, starts[..., nx.newaxis] + columns, 0)
+    return nx.where(valid, values[indices], fill)
+
+def _stacked(arrays, fill, width=0):
+    """Concatenate the rows of `arrays`, padded with `fill` to the widest,
+    or `width`
+    """
+    width = max([width] + [a.shape[-1] for a in arrays])
+    return nx.concatenate([a if a.shape[-1] == width
+                           else nx.concatenate((a, nx.zeros((len(a), width - a.shape[-1]),
+                                                            dtype=a.dtype) + fill),
+                                               axis=-1)
+                           for a in arrays]).astype(nx.INT_DTYPE)
+
+
+def _firstOccurrences(rows):
+    """Number the distinct `rows` in the order they first occur
+
+    Returns
+    -------
+    first : ndarray
+        Index of the first occurrence of each distinct row.
+    labels : ndarray
+        Number of the distinct row equal to each row.
+
+    >>> first, labels = _firstOccurrences(nx.array([[3, 1], [2, 2], [3, 1],
+    ...                                             [0, 5], [2, 2]]))
+    >>> print(first)
+    [0 1 3]
+    >>> print(labels)
+    [0 1 0 2 1]
+    """
+    if len(rows) == 0:
+        return nx.zeros((0,), 'l'), nx.zeros((0,), 'l')
+
+    # pack each row of (-1 padded) IDs into a single integer, if it fits
+    base = int(rows.max()) + 2
+    if base**rows.shape[-1] < 2**63:
+        packed = nx.zeros(len(rows), dtype=nx.int64)
+        for column in rows.swapaxes(0, 1):
+            packed = packed * base + (column + 1)
+        order = nx.argsort(packed, kind="stable")
+        packed = packed[order]
+        distinct = packed[1:] != packed[:-1]
+    else:
+        order = nx.lexsort(rows.swapaxes(0, 1)[::-1])
+        distinct = (rows[order][1:] != rows[order][:-1]).any(axis=-1)
+
+    group = nx.cumsum(nx.concatenate(([0], distinct)))
+    # sorting is stable, so the first of each group occurs first
+    first = order[nx.concatenate(([True], distinct))]
+    byOccurrence = nx.argsort(first)
+    number = nx.empty(len(first), 'l')
+    number[byOccurrence] = nx.arange(len(first))
+    labels = nx.empty(len(rows), 'l')
+    labels[order] = number[group]
+
+    return first[byOccurrence], labels
+
+
 class GmshFile(object):
     """Base class for Gmsh mesh storage files."""
 
@@ -282,7 +545,10 @@ class GmshFile(object):
         self.formatWritten = False
 
         # open the .msh file
-        if (hasattr(self.filename, "name")
+        if self.filename is None:
+            # nothing to read
+            self.fileobj = None
+        elif (hasattr(self.filename, "name")
             and hasattr(self.filename, "read")
             and hasattr(self.filename, "write")):
             self.fileobj = self.filename
@@ -324,7 +590,8 @@ class GmshFile(object):
         pass
 
     def close(self):
-        self.fileobj.close()
+        if self.fileobj is not None:
+            self.fileobj.close()
 
     def __del__(self):
         if self.fileIsTemporary:
@@ -504,7 +771,8 @@ class MSHFile(GmshFile):
     Does not support gmsh versions < 2. If partitioning, gmsh
     version must be >= 2.5.
 
-    TODO: Refactor face extraction functions.
+    Reads ASCII and binary files in MSH file formats 2 and 4.1.
+    A partitioned mesh must be in MSH file format 2.
     """
     def __init__(self, filename,
                        dimensions,
@@ -512,12 +780,13 @@ class MSHFile(GmshFile):
                        communicator=parallelComm,
                        gmshOutput="",
                        mode='r',
-                       fileIsTemporary=False):
+                       fileIsTemporary=False,
+                       cacheEntry=None):
         """
         Parameters
         ----------
         filename : str
-            Gmsh output file
+            Gmsh output file, or `None` to load the mesh from `cacheEntry`
         dimensions : int
             Dimension of mesh
         coordDimensions : int
@@ -535,155 +804,185 @@ class MSHFile(GmshFile):
             Add a `b` to the mode for binary files.
         fileIsTemporary : bool
             If `True`, `filename` should be cleaned up on deletion
+        cacheEntry : ~fipy.meshes.gmshMesh._MeshCacheEntry
+            Where to store the mesh that is read, or to load it from
         """
         self.dimensions = dimensions
         self.coordDimensions = coordDimensions
         self.gmshOutput = gmshOutput
+        self.cacheEntry = cacheEntry
 
         self.mesh = None
         self.meshWritten = False
 
+        if mode.startswith('r') and 'b' not in mode:
+            # sections may be binary, whatever the file type
+            mode += 'b'
+
         GmshFile.__init__(self, filename=filename, communicator=communicator, mode=mode, fileIsTemporary=fileIsTemporary)
 
-    def _getMetaData(self):
+    def _getMetaData(self, data):
         """
         Extracts `gmshVersion`, file-type, and data-size in that
         order.
         """
-        self._seekForHeader("MeshFormat")
-        metaData = self.fileobj.readline().split()
-        self.fileobj.seek(0)
-        return [float(x) for x in metaData]
+        text = self._section(data, "MeshFormat", binary=True)
+        end = bytes(text[:80]).index(b"\n")
+        version, fileType, dataSize = bytes(text[:end]).split()[:3]
 
-    def _isolateData(self, title):
-        """
-        Gets all data between $[title] and $End[title], writes
-        it out to its own file.
+        self._byteOrder = "<"
+        if int(fileType) == 1:
+            # binary files write the integer 1 to reveal their endianness
+            one = nx.frombuffer(text, dtype="<i4", count=1, offset=end + 1)[0]
+            if one != 1:
+                self._byteOrder = ">"
+
+        return float(version), int(fileType), int(dataSize)
+
+    def _section(self, data, title, binary=False):
         """
-        newF, newPath = tempfile.mkstemp(title, text=True)
-        newF = os.fdopen(newF, 'w')
-        try:
-            self._seekForHeader(title)
-        except Exception as e:
-            newF.close()
-            os.unlink(newPath)
-            raise
+        Gets all data between $[title] and $End[title].
 
-        # extract the actual data within section
-        while True:
-            line = self.fileobj.readline()
-            if ("$End%s" % title) not in line:
-                newF.write(line)
-            else: break
+        The length of a binary section is only known once it is parsed,
+        so, if `binary`, the (uncopied) remainder of `data` is returned.
+        """
+        header = re.search(br"^\$" + title.encode("ascii") + br"[ \t\r]*\n",
+                           data, flags=re.MULTILINE)
+        if header is None:
+            raise EOFError("No `%s' header found!" % title)
 
-        self.fileobj.seek(0)
-        newF.close()
-        return newPath
+        if binary:
+            return memoryview(data)[header.end():]
+        else:
+            return data[header.end():data.find(b"$End" + title.encode("ascii"),
+                                               header.end())]
 
-    def _seekForHeader(self, title):
+    def _binaryReader(self, text):
         """
-        Iterate through a file until we end up at the section header
-        for `title`. Function has obvious side-effects on `self.fileobj`.
+        Returns a function that reads `count` items of `dtype` from
+        binary `text`, advancing past them.
         """
-        while True:
-            line = self.fileobj.readline()
-            if len(line) == 0:
-                raise EOFError("No `%s' header found!" % title)
-                break
-            elif (("$%s" % title) not in line):
-                continue
-            else:
-                break # found header
+        position = [0]
+
+        def read(dtype, count=1):
+            dtype = nx.dtype(dtype).newbyteorder(self._byteOrder)
+            values = nx.frombuffer(text, dtype=dtype, count=int(count),
+                                   offset=position[0])
+            position[0] += values.nbytes
+            return values
+
+        return read
 
     def _deriveCellsAndFaces(self, cellsToVertIDs, shapeTypes, numCells):
         """
-        Uses element information obtained from `_parseElementFile` to deliver
+        Uses element information obtained from `_parseElements` to deliver
         `facesToVertices` and `cellsToFaces`.
+
+        All faces of all cells of each shape are generated at once.  The
+        faces shared by cells are identified by their sorted vertex IDs
+        and numbered in the order they are first encountered, cell by
+        cell.
         """
 
         allShapes  = nx.unique(shapeTypes).tolist()
         maxFaces   = max([self.numFacesPerCell[x] for x in allShapes])
 
+        numVertices = (cellsToVertIDs >= 0).sum(axis=-1)
+        # an extra column of padding, for faces with fewer vertices
+        # than others to index with -1
+        paddedCells = nx.concatenate((cellsToVertIDs,
+                                      -nx.ones((numCells, 1), dtype=nx.INT_DTYPE)),
+                                     axis=-1)
+
+        faces = []
+        faceCells = []
+        cellFaces = []
+        for shapeType in allShapes:
+            ofShape = (shapeTypes == shapeType)
+            for length in nx.unique(numVertices[ofShape]):
+                cells = nx.flatnonzero(ofShape & (numVertices == length))
+                orderings = self._faceOrderings(shapeType=shapeType,
+                                                numVertices=length)
+                orderings = _stacked([nx.array([o]) for o in orderings], fill=-1)
+                faces.append(paddedCells[cells[..., nx.newaxis, nx.newaxis],
+                                         orderings].reshape((-1, orderings.shape[-1])))
+                faceCells.append(nx.repeat(cells, len(orderings)))
+                cellFaces.append(nx.tile(nx.arange(len(orderings)), len(cells)))
+
+        # visit faces cell by cell
+        faceCells = nx.concatenate(faceCells)
+        cellFaces = nx.concatenate(cellFaces)
+        order = nx.argsort(faceCells * maxFaces + cellFaces, kind="stable")
+        faces = _stacked(faces, fill=-1)[order]
+        faceCells = faceCells[order]
+        cellFaces = cellFaces[order]
+
+        # NB: faces are sorted to spot duplicates
+        first, faceIDs = _firstOccurrences(nx.sort(faces, axis=-1))
+        uniqueFaces = faces[first]
+
         # `cellsToFaces` must be padded with -1; see mesh.py
-        currNumFaces = 0
         cellsToFaces = nx.ones((numCells, maxFaces), 'l') * -1
-        facesDict    = {}
-        uniqueFaces  = []
-
-        # we now build `cellsToFaces` and `uniqueFaces`,
-        # the latter will result in `facesToVertices`.
-        for cellIdx in range(numCells):
-            shapeType = shapeTypes[cellIdx]
-            cell = cellsToVertIDs[cellIdx]
-
-            if shapeType in [5, 12, 17]: # hexahedron
-                faces = self._extractOrderedFaces(cell=cell,
-                                                  faceOrderings=[[0, 1, 2, 3], # ordering of vertices gleaned from
-                                                                 [4, 5, 6, 7], # a one-cube Grid3D example
-                                                                 [0, 1, 5, 4],
-                                                                 [3, 2, 6, 7],
-                                                                 [0, 3, 7, 4],
-                                                                 [1, 2, 6, 5]])
-            elif shapeType in [6, 13, 18]: # prism
-                faces = self._extractOrderedFaces(cell=cell,
-                                                  faceOrderings=[[0, 1, 2],
-                                                                 [5, 4, 3],
-                                                                 [3, 4, 1, 0],
-                                                                 [4, 5, 2, 1],
-                                                                 [5, 3, 0, 2]])
-            elif shapeType in [7, 14, 19]: # pyramid
-                faces = self._extractOrderedFaces(cell=cell,
-                                                  faceOrderings=[[0, 1, 2, 3],
-                                                                 [0, 1, 4],
-                                                                 [1, 2, 4],
-                                                                 [2, 3, 4],
-                                                                 [3, 0, 4]])
-            else:
-                if shapeType in [2, 9, 20, 21, 22, 23, 24, 25]:
-                    faceLength = 2 # triangle
-                elif shapeType in [3, 10, 16]:
-                    faceLength = 2 # quadrangle
-                elif shapeType in [4, 11, 29, 30, 31]:
-                    faceLength = 3 # tetrahedron
-
-                faces = self._extractRegularFaces(cell=cell,
-                                                  faceLength=faceLength,
-                                                  facesPerCell=self.numFacesPerCell[shapeType])
-
-            for faceIdx in range(len(faces)):
-                # NB: currFace is sorted for the key to spot duplicates
-                currFace = faces[faceIdx]
-                keyStr   = ' '.join([str(x) for x in sorted(currFace)])
-
-                if keyStr in facesDict:
-                    cellsToFaces[cellIdx][faceIdx] = facesDict[keyStr]
-                else: # new face
-                    facesDict[keyStr] = currNumFaces
-                    cellsToFaces[cellIdx][faceIdx] = currNumFaces
-                    uniqueFaces.append(currFace)
-                    currNumFaces += 1
-
-        # pad short faces with -1
-        maxFaceLen = max([len(f) for f in uniqueFaces])
-        uniqueFaces = [[-1] * (maxFaceLen - len(f)) + f for f in uniqueFaces]
-
-        facesToVertices = nx.array(uniqueFaces, dtype=nx.INT_DTYPE)
-
-        return facesToVertices.swapaxes(0, 1)[::-1], cellsToFaces.swapaxes(0, 1).copy('C'), facesDict
-
-    def _translateNodesToVertices(self, entitiesNodes, vertexMap):
-        """Translates e`ntitiesNodes` from Gmsh node IDs to `vertexCoords` indices.
+        cellsToFaces[faceCells, cellFaces] = faceIDs
+
+        # vertices of each face in reverse, padded with -1
+        faceLengths = (uniqueFaces >= 0).sum(axis=-1)
+        reverse = faceLengths[..., nx.newaxis] - 1 - nx.arange(faceLengths.max())
+        facesToVertices = nx.where(reverse >= 0,
+                                   nx.take_along_axis(uniqueFaces,
+                                                      nx.maximum(reverse, 0),
+                                                      axis=-1),
+                                   -1).astype(nx.INT_DTYPE)
+
+        return facesToVertices.swapaxes(0, 1), cellsToFaces.swapaxes(0, 1).copy('C')
+
+    def _faceOrderings(self, shapeType, numVertices):
+        """Positions, among the `numVertices` vertices of a cell of
+        `shapeType`, of the vertices of each of its faces
         """
-        entitiesVertices = []
+        if shapeType in [5, 12, 17]: # hexahedron
+            return self._extractOrderedFaces(cell=nx.arange(numVertices),
+                                             faceOrderings=[[0, 1, 2, 3], # ordering of vertices gleaned from
+                                                            [4, 5, 6, 7], # a one-cube Grid3D example
+                                                            [0, 1, 5, 4],
+                                                            [3, 2, 6, 7],
+                                                            [0, 3, 7, 4],
+                                                            [1, 2, 6, 5]])
+        elif shapeType in [6, 13, 18]: # prism
+            return self._extractOrderedFaces(cell=nx.arange(numVertices),
+                                             faceOrderings=[[0, 1, 2],
+                                                            [5, 4, 3],
+                                                            [3, 4, 1, 0],
+                                                            [4, 5, 2, 1],
+                                                            [5, 3, 0, 2]])
+        elif shapeType in [7, 14, 19]: # pyramid
+            return self._extractOrderedFaces(cell=nx.arange(numVertices),
+                                             faceOrderings=[[0, 1, 2, 3],
+                                                            [0, 1, 4],
+                                                            [1, 2, 4],
+                                                            [2, 3, 4],
+                                                            [3, 0, 4]])
+        else:
+            if shapeType in [2, 9, 20, 21, 22, 23, 24, 25]:
+                faceLength = 2 # triangle
+            elif shapeType in [3, 10, 16]:
+                faceLength = 2 # quadrangle
+            elif shapeType in [4, 11, 29, 30, 31]:
+                faceLength = 3 # tetrahedron
 
-        for entity in entitiesNodes:
-            try:
-                vertIndices = vertexMap[nx.array(entity)]
-            except IndexError:
-                vertIndices = nx.ones((len(entity),), 'l') * -1
-            entitiesVertices.append(vertIndices)
+            return self._extractRegularFaces(cell=nx.arange(numVertices),
+                                             faceLength=faceLength,
+                                             facesPerCell=self.numFacesPerCell[shapeType])
+
+    def _translateNodesToVertices(self, entitiesNodes, vertexMap):
+        """Translates `entitiesNodes` from Gmsh node IDs to `vertexCoords` indices.
 
-        return entitiesVertices
+        Padding, and nodes that are not vertices of any cell, become -1.
+        """
+        known = (entitiesNodes >= 0) & (entitiesNodes < len(vertexMap))
+        return nx.where(known,
+                        vertexMap[nx.where(known, entitiesNodes, 0)],
+                        -1)
 
     def _extractRegularFaces(self, cell, faceLength, facesPerCell):
         """Return faces for a regular poly(gon|hedron)
@@ -720,164 +1019,196 @@ class MSHFile(GmshFile):
         3. Build faces
         4. Build `cellsToFaces`
 
-        Isolate relevant data into three files, store in
-        `self.nodesPath` for `$Nodes`,
-        `self.elemsPath` for `$Elements`.
-        `self.namesFile` for `$PhysicalNames`.
+        Each of the `$Nodes`, `$Elements` and `$PhysicalNames` sections
+        is parsed into arrays in one pass.  ASCII and binary files in
+        MSH formats 2 and 4.1 can be read.
 
         Returns `vertexCoords`, `facesToVertexID`, `cellsToFaceID`,
                 `cellGlobalIDMap`, `ghostCellGlobalIDMap`.
         """
-        self.version, self.fileType, self.dataSize = self._getMetaData()
-        self.nodesPath = self._isolateData("Nodes")
-        self.elemsPath = self._isolateData("Elements")
-        try:
-            self.namesPath = self._isolateData("PhysicalNames")
-        except EOFError as e:
-            self.namesPath = None
-
-        try:
-            if self.dimensions is None:
-                nodesFile = open(self.nodesPath, 'r')
-                nodesFile.readline() # skip number of nodes
-
-                # We assume we have a 2D file unless we find a node
-                # with a non-zero Z coordinate
-                self.dimensions = 2
-                for node in nodesFile:
-                    line   = node.split()
-
-                    newVert = [float(x) for x in line]
-
-                    if newVert[2] != 0.0:
-                        self.dimensions = 3
-                        break
-
-                nodesFile.close()
-
-            self.coordDimensions = self.coordDimensions or self.dimensions
-
-            # we need a conditional here so we don't pick up 2D shapes in 3D
-            if self.dimensions == 2:
-                self.numVertsPerFace = {1: 2, # 2-node line
-                                        8: 2} # 3-node line
-                self.numFacesPerCell = { 2: 3, # 3-node triangle (3 faces)
-                                         9: 3, # 6-node triangle (we only read 1st 3)
-                                        20: 3, # 9-node triangle (we only read 1st 3)
-                                        21: 3, # 10-node triangle (we only read 1st 3)
-                                        22: 3, # 12-node triangle (we only read 1st 3)
-                                        23: 3, # 15-node triangle (we only read 1st 3)
-                                        24: 3, # 15-node triangle (we only read 1st 3)
-                                        25: 3, # 21-node triangle (we only read 1st 3)
-                                         3: 4, # 4-node quadrangle (4 faces)
-                                        10: 4, # 9-node quadrangle (we only read 1st 4)
-                                        16: 4} # 8-node quadrangle (we only read 1st 4)
-            elif self.dimensions == 3:
-                self.numVertsPerFace = { 2: 3, # 3-node triangle (3 vertices)
-                                         9: 3, # 6-node triangle (we only read 1st 3)
-                                        20: 3, # 9-node triangle (we only read 1st 3)
-                                        21: 3, # 10-node triangle (we only read 1st 3)
-                                        22: 3, # 12-node triangle (we only read 1st 3)
-                                        23: 3, # 15-node triangle (we only read 1st 3)
-                                        24: 3, # 15-node triangle (we only read 1st 3)
-                                        25: 3, # 21-node triangle (we only read 1st 3)
-                                         3: 4, # 4-node quadrangle (4 vertices)
-                                        10: 4, # 9-node quadrangle (we only read 1st 4)
-                                        16: 4} # 8-node quadrangle (we only read 1st 4)
-                self.numFacesPerCell = { 4: 4, # 4-node tetrahedron (4 faces)
-                                        11: 4, # 10-node tetrahedron (we only read 1st 4)
-                                        29: 4, # 20-node tetrahedron (we only read 1st 4)
-                                        30: 4, # 35-node tetrahedron (we only read 1st 4)
-                                        31: 4, # 56-node tetrahedron (we only read 1st 4)
-                                         5: 6, # 8-node hexahedron (6 faces)
-                                        12: 6, # 27-node tetrahedron (we only read 1st 6)
-                                        17: 6, # 20-node tetrahedron (we only read 1st 6)
-                                         6: 5, # 6-node prism (5 faces)
-                                        13: 5, # 18-node prism (we only read 1st 6)
-                                        18: 5, # 15-node prism (we only read 1st 6)
-                                         7: 5, # 5-node pyramid (5 faces)
-                                        14: 5, # 14-node pyramid (we only read 1st 5)
-                                        19: 5} # 13-node pyramid (we only read 1st 5)
-            else:
-                raise GmshException("Mesh has fewer than 2 or more than 3 dimensions")
-
-            _log.debug("Parsing elements.")
-            (cellsData,
-             ghostsData,
-             facesData) = self._parseElementFile()
-
-            cellsToGmshVerts = cellsData.nodes + ghostsData.nodes
-            numCellsTotal    = len(cellsData.nodes) + len(ghostsData.nodes)
-            allShapeTypes    = cellsData.shapes + ghostsData.shapes
-            allShapeTypes    = nx.array(allShapeTypes)
-            allShapeTypes    = nx.delete(allShapeTypes, nx.s_[numCellsTotal:])
-            self.physicalCellMap = nx.array(cellsData.physicalEntities
-                                            + ghostsData.physicalEntities)
-            self.geometricalCellMap = nx.array(cellsData.geometricalEntities
-                                               + ghostsData.geometricalEntities)
-
-            if numCellsTotal < 1:
-                errStr = "Gmsh hasn't produced any cells! Check your Gmsh code."
-                errStr += "\n\nGmsh output:\n%s" % "".join(self.gmshOutput).rstrip()
-                raise GmshException(errStr)
-
-            _log.debug("Recovering coords.")
-            _log.debug("numcells %d" % numCellsTotal)
-            vertexCoords, vertIDtoIdx = self._vertexCoordsAndMap(cellsToGmshVerts)
-
-            # translate Gmsh IDs to `vertexCoord` indices
-            cellsToVertIDs = self._translateNodesToVertices(cellsToGmshVerts,
-                                                            vertIDtoIdx)
-
-            _log.debug("Building cells and faces.")
-            (facesToV,
-             cellsToF,
-             facesDict) = self._deriveCellsAndFaces(cellsToVertIDs,
-                                                    allShapeTypes,
-                                                    numCellsTotal)
-
-            # cell entities were easy to record on parsing
-            # but we don't use Gmsh faces, so we need to correlate the nodes
-            # that make up the Gmsh faces with the vertex IDs of the FiPy faces
-            # so that we can check if any are named
-            faceEntitiesDict = dict()
-
-            # translate Gmsh IDs to `vertexCoord` indices
-            facesToVertIDs = self._translateNodesToVertices(facesData.nodes,
-                                                            vertIDtoIdx)
-
-            for face, physicalEntity, geometricalEntity in zip(facesToVertIDs,
-                                                               facesData.physicalEntities,
-                                                               facesData.geometricalEntities):
-                faceEntitiesDict[' '.join([str(x) for x in sorted(face)])] = (physicalEntity, geometricalEntity)
-
-            self.physicalFaceMap = nx.zeros(facesToV.shape[-1:], 'l')
-            self.geometricalFaceMap = nx.zeros(facesToV.shape[-1:], 'l')
-            for face in list(facesDict.keys()):
-                # not all faces are necessarily tagged
-                if face in faceEntitiesDict:
-                    self.physicalFaceMap[facesDict[face]] = faceEntitiesDict[face][0]
-                    self.geometricalFaceMap[facesDict[face]] = faceEntitiesDict[face][1]
-
-            self.physicalNames = self._parseNamesFile()
-
-        finally:
-            os.unlink(self.nodesPath)
-            os.unlink(self.elemsPath)
-            if self.namesPath is not None:
-                os.unlink(self.namesPath)
-
-        # convert lists of cell vertices to a properly oriented masked array
-        maxVerts = max([len(v) for v in cellsToVertIDs])
-        # ticket:539 - NumPy 1.7 casts to array before concatenation and empty array defaults to float
-        cellsToVertIDs = [nx.concatenate((v, nx.array([-1] * (maxVerts-len(v)), dtype=nx.INT_DTYPE))) for v in cellsToVertIDs]
+        if self.fileobj is None:
+            return self._loadCache()
+
+        data = self.fileobj.read()
+        if not isinstance(data, bytes):
+            # file object was opened in text mode
+            data = data.encode("latin-1")
+
+        self.version, self.fileType, self.dataSize = self._getMetaData(data)
+
+        if not (2. <= self.version < 3. or 4.1 <= self.version < 5.):
+            raise GmshException("Gmsh MSH file format version %s is not supported" % self.version)
+        if self.version >= 4. and self.communicator.Nproc > 1:
+            raise GmshException("Partitioned meshes must be in Gmsh MSH file format version 2")
+
+        _log.debug("Parsing nodes.")
+        nodeIDs, nodeCoords = self._parseNodes(data)
+
+        if self.dimensions is None:
+            # We assume we have a 2D file unless we find a node
+            # with a non-zero Z coordinate
+            self.dimensions = 3 if (nodeCoords[..., 2] != 0.).any() else 2
+
+        self.coordDimensions = self.coordDimensions or self.dimensions
+
+        # we need a conditional here so we don't pick up 2D shapes in 3D
+        if self.dimensions == 2:
+            self.numVertsPerFace = {1: 2, # 2-node line
+                                    8: 2} # 3-node line
+            self.numFacesPerCell = { 2: 3, # 3-node triangle (3 faces)
+                                     9: 3, # 6-node triangle (we only read 1st 3)
+                                    20: 3, # 9-node triangle (we only read 1st 3)
+                                    21: 3, # 10-node triangle (we only read 1st 3)
+                                    22: 3, # 12-node triangle (we only read 1st 3)
+                                    23: 3, # 15-node triangle (we only read 1st 3)
+                                    24: 3, # 15-node triangle (we only read 1st 3)
+                                    25: 3, # 21-node triangle (we only read 1st 3)
+                                     3: 4, # 4-node quadrangle (4 faces)
+                                    10: 4, # 9-node quadrangle (we only read 1st 4)
+                                    16: 4} # 8-node quadrangle (we only read 1st 4)
+        elif self.dimensions == 3:
+            self.numVertsPerFace = { 2: 3, # 3-node triangle (3 vertices)
+                                     9: 3, # 6-node triangle (we only read 1st 3)
+                                    20: 3, # 9-node triangle (we only read 1st 3)
+                                    21: 3, # 10-node triangle (we only read 1st 3)
+                                    22: 3, # 12-node triangle (we only read 1st 3)
+                                    23: 3, # 15-node triangle (we only read 1st 3)
+                                    24: 3, # 15-node triangle (we only read 1st 3)
+                                    25: 3, # 21-node triangle (we only read 1st 3)
+                                     3: 4, # 4-node quadrangle (4 vertices)
+                                    10: 4, # 9-node quadrangle (we only read 1st 4)
+                                    16: 4} # 8-node quadrangle (we only read 1st 4)
+            self.numFacesPerCell = { 4: 4, # 4-node tetrahedron (4 faces)
+                                    11: 4, # 10-node tetrahedron (we only read 1st 4)
+                                    29: 4, # 20-node tetrahedron (we only read 1st 4)
+                                    30: 4, # 35-node tetrahedron (we only read 1st 4)
+                                    31: 4, # 56-node tetrahedron (we only read 1st 4)
+                                     5: 6, # 8-node hexahedron (6 faces)
+                                    12: 6, # 27-node tetrahedron (we only read 1st 6)
+                                    17: 6, # 20-node tetrahedron (we only read 1st 6)
+                                     6: 5, # 6-node prism (5 faces)
+                                    13: 5, # 18-node prism (we only read 1st 6)
+                                    18: 5, # 15-node prism (we only read 1st 6)
+                                     7: 5, # 5-node pyramid (5 faces)
+                                    14: 5, # 14-node pyramid (we only read 1st 5)
+                                    19: 5} # 13-node pyramid (we only read 1st 5)
+        else:
+            raise GmshException("Mesh has fewer than 2 or more than 3 dimensions")
+
+        _log.debug("Parsing elements.")
+        (cellsData,
+         ghostsData,
+         facesData) = self._parseElements(data)
+
+        allCellsData     = cellsData + ghostsData
+        cellsToGmshVerts = allCellsData.nodes
+        numCellsTotal    = len(allCellsData.shapes)
+        allShapeTypes    = allCellsData.shapes
+        self.physicalCellMap = allCellsData.physicalEntities
+        self.geometricalCellMap = allCellsData.geometricalEntities
+
+        if numCellsTotal < 1:
+            errStr = "Gmsh hasn't produced any cells! Check your Gmsh code."
+            errStr += "\n\nGmsh output:\n%s" % "".join(self.gmshOutput).rstrip()
+            raise GmshException(errStr)
+
+        _log.debug("Recovering coords.")
+        _log.debug("numcells %d" % numCellsTotal)
+        vertexCoords, vertIDtoIdx = self._vertexCoordsAndMap(cellsToGmshVerts,
+                                                             nodeIDs,
+                                                             nodeCoords)
+
+        # translate Gmsh IDs to `vertexCoord` indices
+        cellsToVertIDs = self._translateNodesToVertices(cellsToGmshVerts,
+                                                        vertIDtoIdx)
+
+        _log.debug("Building cells and faces.")
+        facesToV, cellsToF = self._deriveCellsAndFaces(cellsToVertIDs,
+                                                       allShapeTypes,
+                                                       numCellsTotal)
+
+        # cell entities were easy to record on parsing
+        # but we don't use Gmsh faces, so we need to correlate the nodes
+        # that make up the Gmsh faces with the vertex IDs of the FiPy faces
+        # so that we can check if any are named
+
+        # translate Gmsh IDs to `vertexCoord` indices
+        facesToVertIDs = self._translateNodesToVertices(facesData.nodes,
+                                                        vertIDtoIdx)
+
+        # a Gmsh face with a node that isn't a vertex of any cell
+        # can't be a FiPy face
+        complete = ((facesToVertIDs >= 0) == (facesData.nodes >= 0)).all(axis=-1)
+
+        # FiPy faces are distinct and listed first, so they are labeled in
+        # order and any Gmsh face with the same vertices gets the same label
+        numFaces = facesToV.shape[-1]
+        first, labels = _firstOccurrences(nx.sort(_stacked([facesToV.swapaxes(0, 1),
+                                                             facesToVertIDs[complete]],
+                                                            fill=-1),
+                                                  axis=-1))
+        labels = labels[numFaces:]
+        # not all faces are necessarily tagged
+        tagged = labels < numFaces
+
+        self.physicalFaceMap = nx.zeros(facesToV.shape[-1:], 'l')
+        self.geometricalFaceMap = nx.zeros(facesToV.shape[-1:], 'l')
+        self.physicalFaceMap[labels[tagged]] = facesData.physicalEntities[complete][tagged]
+        self.geometricalFaceMap[labels[tagged]] = facesData.geometricalEntities[complete][tagged]
+
+        self.physicalNames = self._parseNames(data)
+
+        # convert padded cell vertices to a properly oriented masked array
         cellsToVertIDs = nx.MA.masked_equal(cellsToVertIDs, value=-1).swapaxes(0, 1)
 
         _log.debug("Done with cells and faces.")
+
+        if self.cacheEntry is not None:
+            self._saveCache(vertexCoords, facesToV, cellsToF,
+                            cellsData.idmap, ghostsData.idmap,
+                            cellsToVertIDs)
+
         return (vertexCoords, facesToV, cellsToF,
                 cellsData.idmap, ghostsData.idmap,
                 cellsToVertIDs)
 
+    def _saveCache(self, vertexCoords, facesToV, cellsToF,
+                   cellGlobalIDs, ghostCellGlobalIDs, cellsToVertIDs):
+        arrays = dict(vertexCoords=vertexCoords,
+                      facesToVertices=facesToV,
+                      cellsToFaces=cellsToF,
+                      cellGlobalIDs=nx.array(cellGlobalIDs, dtype=nx.INT_DTYPE),
+                      ghostCellGlobalIDs=nx.array(ghostCellGlobalIDs, dtype=nx.INT_DTYPE),
+                      cellsToVertices=nx.MA.filled(cellsToVertIDs, -1),
+                      physicalCellMap=self.physicalCellMap,
+                      geometricalCellMap=self.geometricalCellMap,
+                      physicalFaceMap=self.physicalFaceMap,
+                      geometricalFaceMap=self.geometricalFaceMap)
+        meta = dict(dimensions=self.dimensions,
+                    coordDimensions=self.coordDimensions,
+                    physicalNames=self.physicalNames)
+        self.cacheEntry.save(arrays, meta)
+
+    def _loadCache(self):
+        arrays, meta = self.cacheEntry.load()
+
+        self.dimensions = meta["dimensions"]
+        self.coordDimensions = meta["coordDimensions"]
+        # JSON keys are strings
+        self.physicalNames = dict((int(dim), names)
+                                  for dim, names in meta["physicalNames"].items())
+        self.physicalCellMap = arrays["physicalCellMap"]
+        self.geometricalCellMap = arrays["geometricalCellMap"]
+        self.physicalFaceMap = arrays["physicalFaceMap"]
+        self.geometricalFaceMap = arrays["geometricalFaceMap"]
+
+        return (arrays["vertexCoords"],
+                arrays["facesToVertices"],
+                arrays["cellsToFaces"],
+                arrays["cellGlobalIDs"].tolist(),
+                arrays["ghostCellGlobalIDs"].tolist(),
+                nx.MA.masked_equal(arrays["cellsToVertices"], value=-1))
+
     def write(self, obj, time=0.0, timeindex=0):
         if not self.formatWritten:
             self._writeMeshFormat()
@@ -1005,50 +1336,208 @@ class MSHFile(GmshFile):
 
         self.fileobj.write("$EndElementData\n")
 
-    def _vertexCoordsAndMap(self, cellsToGmshVerts):
+    def _vertexCoordsAndMap(self, cellsToGmshVerts, nodeIDs, nodeCoords):
         """
         Returns `vertexCoords` and mapping from Gmsh ID to `vertexCoords`
         indices (same as in `MSHFile`).
 
-        Unlike parent, doesn't use `genfromtxt`
-        because we want to avoid loading the entire `.msh` file into memory.
+        Only the nodes that are vertices of cells are kept.
         """
-        allVerts     = [v for c in cellsToGmshVerts for v in c] # flatten
-        allVerts     = nx.unique(nx.array(allVerts, dtype=nx.INT_DTYPE)) # remove dups
-        allVerts     = nx.sort(allVerts)
+        allVerts     = nx.unique(cellsToGmshVerts[cellsToGmshVerts >= 0]) # sorted, without dups
         maxVertIdx   = allVerts[-1] + 1 # add one to offset zero
         vertGIDtoIdx = nx.ones(maxVertIdx, 'l') * -1 # gmsh ID -> vertexCoords idx
-        vertexCoords = nx.empty((len(allVerts), self.coordDimensions))
-        nodeCount    = 0
 
         # establish map. This works because allVerts is a sorted set.
         vertGIDtoIdx[allVerts] = nx.arange(len(allVerts))
 
-        nodesFile = open(self.nodesPath, 'r')
-        nodesFile.readline() # skip number of nodes
-
-        # now we walk through node file with a sorted unique list of vertices
-        # in hand. When we encounter 0th element in `allVerts`, save it
-        # to `vertexCoords` then pop its ID off `allVerts`.
-        for node in nodesFile:
-            line   = node.split()
-            nodeID = int(line[0])
-
-            if nodeID == allVerts[nodeCount]:
-                newVert = [float(x) for x in line[1:self.coordDimensions+1]]
-                vertexCoords[nodeCount,:] = nx.array(newVert)
-                nodeCount += 1
-
-            if len(allVerts) == nodeCount:
-                break
-
-        nodesFile.close()
+        nodeGIDtoIdx = nx.zeros(max(maxVertIdx, nodeIDs.max() + 1), 'l')
+        nodeGIDtoIdx[nodeIDs] = nx.arange(len(nodeIDs))
+        vertexCoords = nodeCoords[nodeGIDtoIdx[allVerts], :self.coordDimensions]
 
         # transpose for FiPy
         transCoords = vertexCoords.swapaxes(0, 1)
         return transCoords, vertGIDtoIdx
 
-    def _parseElementFile(self):
+    def _parseNodes(self, data):
+        """
+        Returns the Gmsh IDs and the three coordinates of all nodes.
+        """
+        if self.fileType == 0:
+            values = nx.fromstring(self._section(data, "Nodes"),
+                                   dtype=float, sep=" ")
+            if self.version < 4.:
+                # skip number of nodes
+                records = values[1:].reshape((-1, 4))
+                return records[..., 0].astype(nx.INT_DTYPE), records[..., 1:]
+
+            # numEntityBlocks numNodes minNodeTag maxNodeTag
+            position = 4
+            IDs, coords = [], []
+            for block in range(int(values[0])):
+                (entityDim,
+                 entityTag,
+                 parametric,
+                 numNodesInBlock) = values[position:position + 4].astype(nx.INT_DTYPE)
+                position += 4
+                IDs.append(values[position:position + numNodesInBlock].astype(nx.INT_DTYPE))
+                position += numNodesInBlock
+                width = 3 + (entityDim if parametric else 0)
+                coords.append(values[position:position + numNodesInBlock * width].reshape((-1, width))[..., :3])
+                position += numNodesInBlock * width
+        else:
+            text = self._section(data, "Nodes", binary=True)
+            if self.version < 4.:
+                end = bytes(text[:80]).index(b"\n")
+                record = nx.dtype([("ID", "i4"), ("coords", "f8", (3,))]).newbyteorder(self._byteOrder)
+                records = nx.frombuffer(text, dtype=record,
+                                        count=int(bytes(text[:end])),
+                                        offset=end + 1)
+                return records["ID"].astype(nx.INT_DTYPE), records["coords"].astype(float)
+
+            read = self._binaryReader(text)
+            size = "u%d" % self.dataSize
+            numEntityBlocks = read(size, 4)[0]
+            IDs, coords = [], []
+            for block in range(numEntityBlocks):
+                entityDim, entityTag, parametric = read("i4", 3)
+                numNodesInBlock = read(size)[0]
+                IDs.append(read(size, numNodesInBlock).astype(nx.INT_DTYPE))
+                width = 3 + (entityDim if parametric else 0)
+                coords.append(read("f8", numNodesInBlock * width).reshape((-1, width))[..., :3].astype(float))
+
+        return (nx.concatenate(IDs + [nx.zeros((0,), nx.INT_DTYPE)]),
+                nx.concatenate(coords + [nx.zeros((0, 3))]))
+
+    def _parseEntities(self, data):
+        """
+        Returns the physical entity (0 if none) of each `(dimension, tag)`
+        geometrical entity of a MSH 4 file.
+        """
+        physical = dict()
+        try:
+            text = self._section(data, "Entities", binary=(self.fileType == 1))
+        except EOFError:
+            return physical
+
+        if self.fileType == 0:
+            values, counts = _tokenize(text, dtype=float)
+            values = values.astype(nx.INT_DTYPE)
+            records = nx.split(values, nx.cumsum(counts)[:-1])
+            numbers, records = records[0], records[1:]
+            for dim in range(4):
+                for record in records[:numbers[dim]]:
+                    # points have coordinates; others, bounding boxes
+                    numPhysicalTags = 4 if dim == 0 else 7
+                    if record[numPhysicalTags] > 0:
+                        physical[(dim, record[0])] = record[numPhysicalTags + 1]
+                    else:
+                        physical[(dim, record[0])] = 0
+                records = records[numbers[dim]:]
+        else:
+            read = self._binaryReader(text)
+            size = "u%d" % self.dataSize
+            numbers = read(size, 4)
+            for dim in range(4):
+                for entity in range(numbers[dim]):
+                    tag = read("i4")[0]
+                    read("f8", 3 if dim == 0 else 6)
+                    physicalTags = read("i4", read(size)[0])
+                    physical[(dim, tag)] = physicalTags[0] if len(physicalTags) > 0 else 0
+                    if dim > 0:
+                        read("i4", read(size)[0]) # bounding entities
+
+        return physical
+
+    def _readElements(self, data):
+        """
+        Returns the Gmsh ID, type, tags and nodes of every element in
+        the file, with the tags and nodes padded with 0 and -1,
+        respectively.  The tags of a MSH 4 element are its physical and
+        geometrical entities, as in MSH 2.
+        """
+        if self.version < 4.:
+            if self.fileType == 0:
+                values, counts = _tokenize(self._section(data, "Elements"),
+                                           dtype=nx.INT_DTYPE)
+                # skip number of elements
+                counts = counts[1:]
+                starts = 1 + nx.cumsum(counts) - counts
+                # elm-number elm-type number-of-tags <tags> node-number-list
+                numTags = values[starts + 2]
+                return (values[starts],
+                        values[starts + 1],
+                        _gather(values, starts + 3, numTags, fill=0, width=2),
+                        numTags,
+                        _gather(values, starts + 3 + numTags, counts - 3 - numTags, fill=-1))
+
+            text = self._section(data, "Elements", binary=True)
+            end = bytes(text[:80]).index(b"\n")
+            read = self._binaryReader(text[end + 1:])
+            blocks = []
+            numElements = int(bytes(text[:end]))
+            while numElements > 0:
+                elmType, numElmFollow, numTags = read("i4", 3)
+                block = read("i4", numElmFollow * (1 + numTags + _nodesPerElement(elmType)))
+                block = block.reshape((numElmFollow, -1)).astype(nx.INT_DTYPE)
+                blocks.append((block[..., 0],
+                               nx.repeat(elmType, numElmFollow),
+                               block[..., 1:1 + numTags],
+                               nx.repeat(numTags, numElmFollow),
+                               block[..., 1 + numTags:]))
+                numElements -= numElmFollow
+        else:
+            physical = self._parseEntities(data)
+            blocks = []
+            if self.fileType == 0:
+                values, counts = _tokenize(self._section(data, "Elements"),
+                                           dtype=nx.INT_DTYPE)
+                # numEntityBlocks numElements minElementTag maxElementTag
+                position, line = 4, 1
+                for block in range(values[0]):
+                    entityDim, entityTag, elementType, numElementsInBlock = values[position:position + 4]
+                    position += 4
+                    line += 1
+                    width = counts[line] if numElementsInBlock > 0 else 1
+                    elements = values[position:position + numElementsInBlock * width]
+                    blocks.append((entityDim, entityTag, elementType,
+                                   elements.reshape((numElementsInBlock, width))))
+                    position += numElementsInBlock * width
+                    line += numElementsInBlock
+            else:
+                read = self._binaryReader(self._section(data, "Elements", binary=True))
+                size = "u%d" % self.dataSize
+                numEntityBlocks = read(size, 4)[0]
+                for block in range(numEntityBlocks):
+                    entityDim, entityTag, elementType = read("i4", 3)
+                    numElementsInBlock = read(size)[0]
+                    elements = read(size, numElementsInBlock * (1 + _nodesPerElement(elementType)))
+                    blocks.append((entityDim, entityTag, elementType,
+                                   elements.reshape((numElementsInBlock, -1)).astype(nx.INT_DTYPE)))
+
+            blocks = [(elements[..., 0],
+                       nx.repeat(elementType, len(elements)),
+                       nx.repeat([[physical.get((entityDim, entityTag), 0), entityTag]],
+                                 len(elements), axis=0),
+                       nx.repeat(2, len(elements)),
+                       elements[..., 1:])
+                      for (entityDim, entityTag, elementType, elements) in blocks]
+
+        (IDs,
+         types,
+         tags,
+         numTags,
+         nodes) = zip(*(blocks or [(nx.zeros((0,), nx.INT_DTYPE),) * 2
+                                   + (nx.zeros((0, 2), nx.INT_DTYPE),)
+                                   + (nx.zeros((0,), nx.INT_DTYPE),)
+                                   + (nx.zeros((0, 0), nx.INT_DTYPE),)]))
+
+        return (nx.concatenate(IDs).astype(nx.INT_DTYPE),
+                nx.concatenate(types).astype(nx.INT_DTYPE),
+                _stacked(tags, fill=0, width=2),
+                nx.concatenate(numTags).astype(nx.INT_DTYPE),
+                _stacked(nodes, fill=-1))
+
+    def _parseElements(self, data):
         """
         Return three objects, the first for non-ghost cells, the second for
         ghost cells, and the third for faces.
@@ -1057,121 +1546,83 @@ class MSHFile(GmshFile):
         calculation is consolidated here: if we were ever to need to CALCULATE
         GHOST CELLS OURSELVES, the only code we'd have to change is in here.
         """
+        IDs, types, tags, numTags, nodes = self._readElements(data)
+
+        isCell = nx.in1d(types, list(self.numFacesPerCell.keys()))
+        isFace = nx.in1d(types, list(self.numVertsPerFace.keys()))
+
+        # the partition tags for don't seem to always be present
+        # and don't always make much sense when they are
+        labeled = numTags >= 2
+        physicalEntities = nx.where(labeled, tags[..., 0], -1)
+        geometricalEntities = nx.where(labeled, tags[..., 1], -1)
+
+        # any remaining tags start with a count of the partitions that follow
+        countIdx = nx.where(labeled, 2, 0)
+        partitioned = numTags > countIdx
+        counts = tags[nx.arange(len(tags)), nx.minimum(countIdx, tags.shape[-1] - 1)]
+        disagree = isCell & partitioned & (counts != numTags - countIdx - 1)
+        if disagree.any():
+            first = nx.flatnonzero(disagree)[0]
+            warnings.warn("Partition count %d does not agree with number of remaining tags %d." % (counts[first], numTags[first] - countIdx[first] - 1),
+                          SyntaxWarning, stacklevel=3)
 
-        def _parseTags(offset, currLineInts):
-            if offset == -1:
-                # if first valid shape
-                offset = currLineInts[0]
-
-            numTags = currLineInts[2]
-            tags    = currLineInts[3:(3+numTags)]
-
-            # the partition tags for don't seem to always be present
-            # and don't always make much sense when they are
-
-            if len(tags) >= 2:
-                physicalEntity = tags.pop(0)
-                geometricalEntity = tags.pop(0)
-            else:
-                physicalEntity = geometricalEntity = -1
-
-            return offset, tags, physicalEntity, geometricalEntity
-
-
-        cellsData = _ElementData()
-        ghostsData = _ElementData()
-        facesData = _ElementData()
-
-        cellOffset = -1 # this will be subtracted from gmsh ID to obtain global ID
-        faceOffset = -1 # this will be subtracted from gmsh ID to obtain global ID
-        pid = self.communicator.procID + 1
-
-        elemsFile = open(self.elemsPath, 'r')
-
-        elemsFile.readline() # skip number of elements
-        for el in elemsFile:
-            currLineInts = [int(x) for x in el.split()]
-            elemType     = currLineInts[1]
-
-            if elemType in list(self.numFacesPerCell.keys()):
-                # element is a cell
-
-                (cellOffset,
-                 tags,
-                 physicalEntity,
-                 geometricalEntity) = _parseTags(offset=cellOffset,
-                                                 currLineInts=currLineInts)
-                currLineInts[0] -= cellOffset
-
-                if len(tags) > 0:
-                    # next item is a count
-                    if tags[0] != len(tags) - 1:
-                        warnings.warn("Partition count %d does not agree with number of remaining tags %d." % (tags[0], len(tags) - 1),
-                                      SyntaxWarning, stacklevel=2)
-                    tags = tags[1:]
-
-                if self.communicator.Nproc > 1:
-                    for tag in tags:
-                        if -tag == pid:
-                            # if we're collecting ghost cells and this is our ghost cell
-                            ghostsData.add(currLine=currLineInts, elType=elemType,
-                                           physicalEntity=physicalEntity,
-                                           geometricalEntity=geometricalEntity)
-                        elif tag == pid:
-                            # el is in this processor's partition or we collect all cells
-                            cellsData.add(currLine=currLineInts, elType=elemType,
-                                          physicalEntity=physicalEntity,
-                                          geometricalEntity=geometricalEntity)
-                else:
-                    # we collect all cells
-                    cellsData.add(currLine=currLineInts, elType=elemType,
-                                  physicalEntity=physicalEntity,
-                                  geometricalEntity=geometricalEntity)
-            elif elemType in list(self.numVertsPerFace.keys()):
-                # element is a face
-
-                (faceOffset,
-                 tags,
-                 physicalEntity,
-                 geometricalEntity) = _parseTags(offset=faceOffset,
-                                                 currLineInts=currLineInts)
-                currLineInts[0] -= faceOffset
-
-                facesData.add(currLine=currLineInts, elType=elemType,
-                              physicalEntity=physicalEntity,
-                              geometricalEntity=geometricalEntity)
-
-        elemsFile.close()
-
-        return cellsData, ghostsData, facesData
-
-
-    def _parseNamesFile(self):
+        if self.communicator.Nproc > 1:
+            pid = self.communicator.procID + 1
+            column = nx.arange(tags.shape[-1])
+            partitions = ((column > countIdx[..., nx.newaxis])
+                          & (column < numTags[..., nx.newaxis]))
+            # el is in this processor's partition
+            cells = isCell & (partitions & (tags == pid)).any(axis=-1)
+            # we're collecting ghost cells and this is our ghost cell
+            ghosts = isCell & (partitions & (tags == -pid)).any(axis=-1)
+        else:
+            # we collect all cells
+            cells = isCell
+            ghosts = nx.zeros(isCell.shape, dtype=bool)
+
+        def elementData(selection, elements):
+            # subtract the Gmsh ID of the first element of the kind
+            # to obtain global ID
+            offset = IDs[elements][0] if elements.any() else 0
+            return _ElementData(nodes=nodes[selection],
+                                shapes=types[selection],
+                                idmap=IDs[selection] - offset,
+                                physicalEntities=physicalEntities[selection],
+                                geometricalEntities=geometricalEntities[selection])
+
+        return (elementData(cells, isCell),
+                elementData(ghosts, isCell),
+                elementData(isFace, isFace))
+
+    def _parseNames(self, data):
         physicalNames = {
             0: dict(),
             1: dict(),
             2: dict(),
             3: dict()
         }
-        if self.namesPath is not None:
-            namesFile = open(self.namesPath, 'r')
-
-            namesFile.readline() # skip number of elements
-            for nm in namesFile:
-                nm = nm.split()
-                if self.version > 2.0:
-                    dim = [int(nm.pop(0))]
-                else:
-                    # Gmsh format prior to 2.1 did not unambiguously tie
-                    # physical names to physical entities of different dimensions
-                    # http://article.gmane.org/gmane.comp.cad.gmsh.general/1601
-                    dim = [0, 1, 2, 3]
-                num = int(nm.pop(0))
-                name = " ".join(nm)[1:-1]
-                for d in dim:
-                    physicalNames[d][name] = int(num)
-
-            namesFile.close()
+        try:
+            text = self._section(data, "PhysicalNames").decode("utf-8")
+        except EOFError:
+            return physicalNames
+
+        # skip number of names
+        for nm in text.splitlines()[1:]:
+            nm = nm.split()
+            if len(nm) == 0:
+                continue
+            if self.version > 2.0:
+                dim = [int(nm.pop(0))]
+            else:
+                # Gmsh format prior to 2.1 did not unambiguously tie
+                # physical names to physical entities of different dimensions
+                # http://article.gmane.org/gmane.comp.cad.gmsh.general/1601
+                dim = [0, 1, 2, 3]
+            num = int(nm.pop(0))
+            name = " ".join(nm)[1:-1]
+            for d in dim:
+                physicalNames[d][name] = int(num)
 
         return physicalNames
 
@@ -1282,26 +1733,28 @@ class _ElementData(object):
     Bookkeeping for cells. Declared as own class for generality.
 
     :Properties:
-    - `nodes`: A Python list of the vertices that make up this element
-    - `shapes`: A `shapeTypes` Python list
+    - `nodes`: An array of the vertices that make up each element, padded with -1
+    - `shapes`: An array of the `shapeTypes` of the elements
     - `idmap`: A Python list which maps `vertexCoords` index to global ID
-    - `physicalEntities`: A Python list of the Gmsh physical entities each element is in
-    - `geometricalEntities`: A Python list of the Gmsh geometrical entities each element is in
+    - `physicalEntities`: An array of the Gmsh physical entities each element is in
+    - `geometricalEntities`: An array of the Gmsh geometrical entities each element is in
     """
-    def __init__(self):
-        self.nodes = []
-        self.shapes = []
-        self.idmap = [] # vertexCoords idx -> gmsh ID (global ID)
-        self.physicalEntities = []
-        self.geometricalEntities = []
-
-    def add(self, currLine, elType, physicalEntity, geometricalEntity):
-        numTags = currLine[2]
-        self.nodes.append(currLine[(numTags+3):])
-        self.shapes.append(elType)
-        self.idmap.append(currLine[0])
-        self.physicalEntities.append(physicalEntity)
-        self.geometricalEntities.append(geometricalEntity)
+    def __init__(self, nodes, shapes, idmap, physicalEntities, geometricalEntities):
+        # drop any padding that no element needs
+        self.nodes = nodes[..., :(nodes >= 0).sum(axis=-1).max(initial=0)]
+        self.shapes = shapes
+        self.idmap = list(idmap.tolist()) # vertexCoords idx -> gmsh ID (global ID)
+        self.physicalEntities = physicalEntities
+        self.geometricalEntities = geometricalEntities
+
+    def __add__(self, other):
+        return _ElementData(nodes=_stacked([self.nodes, other.nodes], fill=-1),
+                            shapes=nx.concatenate((self.shapes, other.shapes)),
+                            idmap=nx.array(self.idmap + other.idmap, dtype=nx.INT_DTYPE),
+                            physicalEntities=nx.concatenate((self.physicalEntities,
+                                                             other.physicalEntities)),
+                            geometricalEntities=nx.concatenate((self.geometricalEntities,
+                                                                other.geometricalEntities)))
 
 class _GmshTopology(_MeshTopology):
 
@@ -3,6 +3,9 @@ from __future__ import unicode_literals
 from builtins import range
 __docformat__ = 'restructuredtext'
 
+import os
+import tempfile
+
 from fipy.meshes.abstractMesh import AbstractMesh
 from fipy.meshes.representations.meshRepresentation import _MeshRepresentation
 from fipy.meshes.topologies.meshTopology import _MeshTopology
@@ -11,6 +14,7 @@ from fipy.tools import numerix
 from fipy.tools.numerix import MA
 from fipy.tools.dimensions.physicalField import PhysicalField
 from fipy.tools import serialComm
+from fipy.tools import parser
 
 __all__ = ["MeshAdditionError", "Mesh"]
 from future.utils import text_to_native_str
@@ -19,12 +23,92 @@ __all__ = [text_to_native_str(n) for n in __all__]
 class MeshAdditionError(Exception):
     pass
 
+def _scratchDirectory():
+    """Directory in which to keep the geometry of meshes, if any"""
+    directory = parser.parse("--mesh-scratch", action="store", type="string")
+    if directory is None:
+        directory = os.environ.get("FIPY_MESH_SCRATCH")
+    return directory
+
+def _isMapped(value):
+    """Whether the data of `value` are in a memory mapped file"""
+    value = MA.getdata(value)
+    while isinstance(value, numerix.ndarray):
+        if isinstance(value, numerix.memmap):
+            return True
+        value = value.base
+    return False
+
+def _onScratch(value):
+    """Copy of `value` in a memory mapped file in the scratch directory
+
+    The file is deleted as soon as it is mapped, so its space is released
+    along with the array.  The copy is a plain `ndarray` view of the
+    `memmap`, as :mod:`~fipy.tools.numerix` does not recognize
+    subclasses.  Anything other than a numerical array, or an array that
+    is already mapped, e.g., one shared by two quantities, is returned as
+    is, as is everything when there is no scratch directory.
+    """
+    directory = _scratchDirectory()
+    if (directory is None
+        or not isinstance(value, numerix.ndarray)
+        or _isMapped(value)):
+        return value
+    elif MA.isMaskedArray(value):
+        return MA.array(_onScratch(MA.getdata(value)),
+                        mask=MA.getmask(value), fill_value=value.fill_value)
+    elif (type(value) is not numerix.ndarray
+          or value.dtype.hasobject
+          or value.size == 0):
+        return value
+
+    with tempfile.TemporaryFile(dir=directory) as f:
+        mapped = numerix.memmap(f, dtype=value.dtype, mode="w+", shape=value.shape)
+        mapped[...] = value
+    return mapped.view(numerix.ndarray)
+
+class _Geometry(object):
+    """Geometric quantity of a `Mesh`, calculated when first needed
+
+    The method `calc` returns `names[index]`, along with the other
+    quantities in `names`, which are all retained by the `Mesh` until
+    they are forgotten.
+    """
+
+    def __init__(self, calc, names, index):
+        self.calc = calc
+        self.names = names
+        self.index = index
+
+    def __get__(self, mesh, cls):
+        if mesh is None:
+            return self
+
+        values = getattr(mesh, self.calc)()
+        if len(self.names) == 1:
+            values = (values,)
+        for name, value in zip(self.names, values):
+            # keep any quantity of the group that was assigned
+            if name not in mesh.__dict__:
+                mesh.__dict__[name] = _onScratch(value)
+
+        return mesh.__dict__[self.names[self.index]]
+
+def _geometry(calc, *names):
+    """Quantities `names`, returned together by the `Mesh` method `calc`"""
+    return tuple(_Geometry(calc, names, index) for index in range(len(names)))
+
 class Mesh(AbstractMesh):
     """Generic mesh class using numerix to do the calculations
 
         Meshes contain cells, faces, and vertices.
 
         This is built for a non-mixed element mesh.
+
+        The geometry of the mesh is only calculated when it is first
+        needed.  If the :envvar:`FIPY_MESH_SCRATCH` environment variable
+        names a directory, the geometry is kept in memory mapped files
+        there, so that the arrays of a very large mesh can be paged out.
     """
 
     def __init__(self, vertexCoords, faceVertexIDs, cellFaceIDs, communicator=serialComm, _RepresentationClass=_MeshRepresentation, _TopologyClass=_MeshTopology):
@@ -120,27 +204,64 @@ class Mesh(AbstractMesh):
     Geometry set and calculate
     """
 
+    _faceCenters, = _geometry("_calcFaceCenters", "_faceCenters")
+    _faceAreas, = _geometry("_calcFaceAreas", "_faceAreas")
+    _cellCenters, = _geometry("_calcCellCenters", "_cellCenters")
+    (_internalFaceToCellDistances,
+     _cellToFaceDistanceVectors) = _geometry("_calcFaceToCellDistAndVec",
+                                             "_internalFaceToCellDistances",
+                                             "_cellToFaceDistanceVectors")
+    (_internalCellDistances,
+     _cellDistanceVectors) = _geometry("_calcCellDistAndVec",
+                                       "_internalCellDistances",
+                                       "_cellDistanceVectors")
+    faceNormals, = _geometry("_calcFaceNormals", "faceNormals")
+    _orientedFaceNormals, = _geometry("_calcOrientedFaceNormals", "_orientedFaceNormals")
+    _cellVolumes, = _geometry("_calcCellVolumes", "_cellVolumes")
+    _faceCellToCellNormals, = _geometry("_calcFaceCellToCellNormals", "_faceCellToCellNormals")
+    (_faceTangents1,
+     _faceTangents2) = _geometry("_calcFaceTangents", "_faceTangents1", "_faceTangents2")
+    _cellToCellDistances, = _geometry("_calcCellToCellDist", "_cellToCellDistances")
+    _cellAreas, = _geometry("_calcCellAreas", "_cellAreas")
+    _cellNormals, = _geometry("_calcCellNormals", "_cellNormals")
+
+    def _forget(self, *names):
+        """Discard the quantities `names`, to be calculated again when needed"""
+        for name in names:
+            self.__dict__.pop(name, None)
+
+    def _evaluateGeometry(self):
+        """Calculate all of the geometry not yet needed
+
+        Must be called before the vertices, the topology or any of the
+        geometry are changed in place, so that the geometry that is not
+        explicitly recalculated describes the mesh as it was.
+        """
+        for cls in type(self).__mro__:
+            for name, attr in vars(cls).items():
+                if isinstance(attr, _Geometry):
+                    getattr(self, name)
+
     def _setGeometry(self, scaleLength = 1.):
-        self._faceCenters = self._calcFaceCenters()
-        self._faceAreas = self._calcFaceAreas()
-        self._cellCenters = self._calcCellCenters()
-        (self._internalFaceToCellDistances,
-         self._cellToFaceDistanceVectors) = self._calcFaceToCellDistAndVec()
-        (self._internalCellDistances,
-         self._cellDistanceVectors) = self._calcCellDistAndVec()
-        self.faceNormals = self._calcFaceNormals()
-        self._orientedFaceNormals = self._calcOrientedFaceNormals()
-        self._cellVolumes = self._calcCellVolumes()
-        self._faceCellToCellNormals = self._calcFaceCellToCellNormals()
-        (self._faceTangents1,
-         self._faceTangents2) = self._calcFaceTangents()
-        self._cellToCellDistances = self._calcCellToCellDist()
+        self._forget("_faceCenters",
+                     "_faceAreas",
+                     "_cellCenters",
+                     "_internalFaceToCellDistances",
+                     "_cellToFaceDistanceVectors",
+                     "_internalCellDistances",
+                     "_cellDistanceVectors",
+                     "faceNormals",
+                     "_orientedFaceNormals",
+                     "_cellVolumes",
+                     "_faceCellToCellNormals",
+                     "_faceTangents1",
+                     "_faceTangents2",
+                     "_cellToCellDistances",
+                     "_cellAreas",
+                     "_cellNormals")
 
         self._setScaledGeometry(self.scale['length'])
 
-        self._cellAreas = self._calcCellAreas()
-        self._cellNormals = self._calcCellNormals()
-
     def _calcFaceAreas(self):
         faceVertexIDs = MA.filled(self.faceVertexIDs, -1)
         substitute = numerix.repeat(faceVertexIDs[numerix.newaxis, 0],
@@ -326,20 +447,55 @@ class Mesh(AbstractMesh):
         self._scale['volume'] = self._calcVolumeScale()
         self._setScaledValues()
 
+    _scaledFaceAreas, = _geometry("_calcScaledFaceAreas", "_scaledFaceAreas")
+    _scaledCellVolumes, = _geometry("_calcScaledCellVolumes", "_scaledCellVolumes")
+    _scaledCellCenters, = _geometry("_calcScaledCellCenters", "_scaledCellCenters")
+    _scaledFaceToCellDistances, = _geometry("_calcScaledFaceToCellDistances",
+                                            "_scaledFaceToCellDistances")
+    _scaledCellDistances, = _geometry("_calcScaledCellDistances", "_scaledCellDistances")
+
+    _scaledCellToCellDistances, = _geometry("_calcScaledCellToCellDistances",
+                                            "_scaledCellToCellDistances")
+    _areaProjections, = _geometry("_calcAreaProjections", "_areaProjections")
+    _orientedAreaProjections, = _geometry("_calcOrientedAreaProjections",
+                                          "_orientedAreaProjections")
+    _faceToCellDistanceRatio, = _geometry("_calcFaceToCellDistanceRatio",
+                                          "_faceToCellDistanceRatio")
+    _faceAspectRatios, = _geometry("_calcFaceAspectRatios", "_faceAspectRatios")
+
     def _setScaledValues(self):
-        self._scaledFaceAreas = self._scale['area'] * self._faceAreas
-        self._scaledCellVolumes = self._scale['volume'] * self._cellVolumes
-        self._scaledCellCenters = self._scale['length'] * self._cellCenters
-        self._scaledFaceToCellDistances = self._scale['length'] * self._faceToCellDistances
-        self._scaledCellDistances = self._scale['length'] * self._cellDistances
+        self._stamp()
+        self._forget("_scaledFaceAreas",
+                     "_scaledCellVolumes",
+                     "_scaledCellCenters",
+                     "_scaledFaceToCellDistances",
+                     "_scaledCellDistances")
         self._setFaceDependentScaledValues()
 
     def _setFaceDependentScaledValues(self):
-        self._scaledCellToCellDistances = self._scale['length'] * self._cellToCellDistances
-        self._areaProjections = self._calcAreaProjections()
-        self._orientedAreaProjections = self._calcOrientedAreaProjections()
-        self._faceToCellDistanceRatio = self._calcFaceToCellDistanceRatio()
-        self._faceAspectRatios = self._calcFaceAspectRatios()
+        self._forget("_scaledCellToCellDistances",
+                     "_areaProjections",
+                     "_orientedAreaProjections",
+                     "_faceToCellDistanceRatio",
+                     "_faceAspectRatios")
+
+    def _calcScaledFaceAreas(self):
+        return self._scale['area'] * self._faceAreas
+
+    def _calcScaledCellVolumes(self):
+        return self._scale['volume'] * self._cellVolumes
+
+    def _calcScaledCellCenters(self):
+        return self._scale['length'] * self._cellCenters
+
+    def _calcScaledFaceToCellDistances(self):
+        return self._scale['length'] * self._faceToCellDistances
+
+    def _calcScaledCellDistances(self):
+        return self._scale['length'] * self._cellDistances
+
+    def _calcScaledCellToCellDistances(self):
+        return self._scale['length'] * self._cellToCellDistances
 
     def _calcAreaScale(self):
         return self.scale['length']**2
@@ -420,10 +576,13 @@ class Mesh(AbstractMesh):
         True
 
         """
-        self._cellToCellDistances = self._calcCellToCellDist()
-        self._faceCellToCellNormals = self._calcFaceCellToCellNormals()
+        self._forget("_cellToCellDistances", "_faceCellToCellNormals")
         self._setFaceDependentScaledValues()
 
+    def _connectFaces(self, faces0, faces1):
+        self._evaluateGeometry()
+        super(Mesh, self)._connectFaces(faces0, faces1)
+
     """calculate Topology methods"""
 
     def _calcFaceCellIDs(self):
@@ -544,7 +703,7 @@ class Mesh(AbstractMesh):
            [4 5 7 8]
 
         """
-        return numerix.nearest(data=self.cellCenters.globalValue, points=points)
+        return self.getNearestCellIDs(points)[0]
 
     def _test(self):
         """
@@ -845,6 +1004,41 @@ class Mesh(AbstractMesh):
             Traceback (most recent call last):
             ...
             ValueError: shape mismatch: objects cannot be broadcast to a single shape
+
+        The geometry is only calculated when it is needed
+
+            >>> from fipy.meshes import Tri2D
+            >>> mesh = Tri2D(nx=3, ny=2)
+            >>> print("_cellVolumes" in mesh.__dict__)
+            False
+            >>> print(numerix.allclose(mesh.cellVolumes, 0.25))
+            True
+            >>> print("_cellVolumes" in mesh.__dict__)
+            True
+            >>> print("_faceTangents1" in mesh.__dict__)
+            False
+
+        and can be kept in memory mapped files that are deleted as soon as
+        they are mapped
+
+            >>> import os
+            >>> import shutil
+            >>> import tempfile
+            >>> scratch = tempfile.mkdtemp()
+            >>> os.environ["FIPY_MESH_SCRATCH"] = scratch
+            >>> mapped = Tri2D(nx=3, ny=2)
+            >>> from fipy.meshes.mesh import _isMapped
+            >>> print(_isMapped(mapped._faceAreas) and _isMapped(mapped._cellVolumes))
+            True
+            >>> print(numerix.allclose(mapped._faceAreas, mesh._faceAreas))
+            True
+            >>> print(numerix.allclose(mapped._faceToCellDistances,
+            ...                        mesh._faceToCellDistances))
+            True
+            >>> print(os.listdir(scratch))
+            []
+            >>> del os.environ["FIPY_MESH_SCRATCH"]
+            >>> shutil.rmtree(scratch)
         """
 
 def _test():
@@ -12,7 +12,8 @@ class LinearCGSSolver(ScipyLinearCGSSolver):
     using the PyAMG `SmoothedAggregationPreconditioner` by default.
     """
 
-    def __init__(self, tolerance=1e-15, iterations=2000, precon=SmoothedAggregationPreconditioner()):
+    def __init__(self, tolerance=1e-15, iterations=2000, precon=SmoothedAggregationPreconditioner(),
+                 reusePreconditioner=False, preconditionerDegradation=None):
         """
         Parameters
         ----------
@@ -21,6 +22,15 @@ class LinearCGSSolver(ScipyLinearCGSSolver):
         iterations : int
             Maximum number of iterative steps to perform.
         precon : ~fipy.solvers.pyAMG.preconditioners.smoothedAggregationPreconditioner.SmoothedAggregationPreconditioner, optional
+        reusePreconditioner : bool or int
+            Whether to reuse the preconditioner for subsequent solves.
+            `True` reuses it indefinitely and an integer `N` rebuilds it
+            every `N` solves.
+        preconditionerDegradation : float, optional
+            Rebuild a reused preconditioner once the iteration count
+            grows by more than this fraction.
         """
 
-        super(LinearCGSSolver, self).__init__(tolerance=tolerance, iterations=iterations, precon=precon)
+        super(LinearCGSSolver, self).__init__(tolerance=tolerance, iterations=iterations, precon=precon,
+                                              reusePreconditioner=reusePreconditioner,
+                                              preconditionerDegradation=preconditionerDegradation)
@@ -13,7 +13,8 @@ class LinearGMRESSolver(ScipyLinearGMRESSolver):
     default.
     """
 
-    def __init__(self, tolerance=1e-15, iterations=2000, precon=SmoothedAggregationPreconditioner()):
+    def __init__(self, tolerance=1e-15, iterations=2000, precon=SmoothedAggregationPreconditioner(),
+                 reusePreconditioner=False, preconditionerDegradation=None):
         """
         Parameters
         ----------
@@ -22,6 +23,15 @@ class LinearGMRESSolver(ScipyLinearGMRESSolver):
         iterations : int
             Maximum number of iterative steps to perform.
         precon : ~fipy.solvers.pyAMG.preconditioners.smoothedAggregationPreconditioner.SmoothedAggregationPreconditioner, optional
+        reusePreconditioner : bool or int
+            Whether to reuse the preconditioner for subsequent solves.
+            `True` reuses it indefinitely and an integer `N` rebuilds it
+            every `N` solves.
+        preconditionerDegradation : float, optional
+            Rebuild a reused preconditioner once the iteration count
+            grows by more than this fraction.
         """
 
-        super(LinearGMRESSolver, self).__init__(tolerance=tolerance, iterations=iterations, precon=precon)
+        super(LinearGMRESSolver, self).__init__(tolerance=tolerance, iterations=iterations, precon=precon,
+                                                reusePreconditioner=reusePreconditioner,
+                                                preconditionerDegradation=preconditionerDegradation)
@@ -8,8 +8,12 @@ from fipy.solvers.scipy.linearCGSSolver import *
 from fipy.solvers.scipy.linearGMRESSolver import *
 from fipy.solvers.scipy.linearBicgstabSolver import *
 from fipy.solvers.scipy.linearLUSolver import *
+from fipy.solvers.scipy.linearFFTSolver import *
+from fipy.solvers.scipy.linearMultigridSolver import *
 from fipy.solvers.scipy.linearPCGSolver import *
 
+from fipy.solvers.scipy.preconditioners import *
+
 DefaultSolver = LinearLUSolver
 DefaultAsymmetricSolver = LinearLUSolver
 DummySolver = LinearGMRESSolver
@@ -0,0 +1,331 @@
+from __future__ import division
+from __future__ import unicode_literals
+from builtins import zip
+__docformat__ = 'restructuredtext'
+
+from scipy import fft
+
+from fipy.solvers.scipy.scipySolver import _ScipySolver
+from fipy.tools import numerix
+
+__all__ = ["LinearFFTSolver"]
+from future.utils import text_to_native_str
+__all__ = [text_to_native_str(n) for n in __all__]
+
+# boundary types, named by the kind of face constraint they arise from
+_PERIODIC, _NEUMANN, _DIRICHLET = "periodic", "Neumann", "Dirichlet"
+
+class LinearFFTSolver(_ScipySolver):
+    r"""
+    The `LinearFFTSolver` solves Poisson-type equations on structured grids
+    directly, by diagonalizing the discrete operator with fast transforms.
+
+    The solver applies to a scalar variable on a serial `Grid1D`,
+    `Grid2D` or `Grid3D` with uniform spacing, or on any of their periodic
+    counterparts, when the matrix is that of
+
+    .. math::
+
+       \nabla\cdot\left(D\nabla\phi\right) + s\phi
+
+    with constant :math:`D` and :math:`s`, such as a `DiffusionTerm`
+    with a constant coefficient, optionally combined with a
+    `TransientTerm` or `ImplicitSourceTerm` with constant coefficients.
+    Each side of the domain must be periodic, or have the value or the
+    gradient of the solution constrained on all of its faces.  The
+    transform along each axis is then a fast Fourier transform for a
+    periodic axis, or a discrete cosine or sine transform for fixed
+    gradient or fixed value sides, respectively, for a cost of
+    :math:`\mathcal{O}(N \log N)`.
+
+    Eligibility is determined from the mesh type and from the assembled
+    matrix itself, so no information about the terms is needed.  Any other
+    system is handed to the `fallback` solver.
+
+    >>> from fipy import Grid2D, CellVariable, DiffusionTerm, LinearLUSolver
+    >>> mesh = Grid2D(nx=20, ny=10, dx=0.5, dy=0.2)
+    >>> x, y = mesh.x, mesh.y
+    >>> phi = CellVariable(mesh=mesh)
+    >>> phi.constrain(0., mesh.facesLeft)
+    >>> phi.constrain(1., mesh.facesRight)
+    >>> phi.faceGrad.constrain(0.5, mesh.facesTop)
+    >>> eq = DiffusionTerm(coeff=2.) == numerix.sin(x) * y
+
+    >>> solver = LinearFFTSolver()
+    >>> eq.solve(var=phi, solver=solver)
+    >>> print(solver.transforms, solver.fallbacks)
+    1 0
+
+    which agrees with a direct factorization
+
+    >>> expected = phi.copy()
+    >>> eq.solve(var=expected, solver=LinearLUSolver())
+    >>> print(numerix.allclose(phi, expected, atol=1e-10))
+    True
+
+    Periodic axes are transformed with the fast Fourier transform
+
+    >>> from fipy import PeriodicGrid2DLeftRight, ImplicitSourceTerm
+    >>> periodic = PeriodicGrid2DLeftRight(nx=16, ny=8, dx=0.25, dy=0.5)
+    >>> psi = CellVariable(mesh=periodic)
+    >>> psi.constrain(1., periodic.facesBottom)
+    >>> eq = (DiffusionTerm(coeff=1.) - ImplicitSourceTerm(coeff=3.)
+    ...       == numerix.cos(numerix.pi * periodic.x / 2.))
+    >>> eq.solve(var=psi, solver=solver)
+    >>> print(solver.transforms, solver.fallbacks)
+    2 0
+    >>> expected = psi.copy()
+    >>> eq.solve(var=expected, solver=LinearLUSolver())
+    >>> print(numerix.allclose(psi, expected, atol=1e-10))
+    True
+
+    Variable coefficients are not eligible
+
+    >>> eq = DiffusionTerm(coeff=1. + x) == numerix.sin(x) * y
+    >>> eq.solve(var=phi, solver=solver)
+    >>> print(solver.transforms, solver.fallbacks)
+    2 1
+    >>> expected = phi.copy()
+    >>> eq.solve(var=expected, solver=LinearLUSolver())
+    >>> print(numerix.allclose(phi, expected, atol=1e-10))
+    True
+    """
+
+    def __init__(self, tolerance=1e-10, iterations=1000, precon=None,
+                 fallback=None):
+        """
+        Create a `LinearFFTSolver` object.
+
+        Parameters
+        ----------
+        tolerance : float
+            Relative discrepancy between the assembled matrix and the
+            structured operator that is accepted as a match.
+        iterations : int
+            Ignored.
+        precon
+            Preconditioner to use.  Ignored.
+        fallback : ~fipy.solvers.solver.Solver, optional
+            Solver for ineligible systems.  Defaults to a `LinearLUSolver`.
+        """
+        super(LinearFFTSolver, self).__init__(tolerance=tolerance,
+                                              iterations=iterations,
+                                              precon=precon)
+        if fallback is None:
+            from fipy.solvers.scipy.linearLUSolver import LinearLUSolver
+            fallback = LinearLUSolver(tolerance=tolerance)
+        self.fallback = fallback
+        self._eigenvalues = (None, None)
+        self.transforms = 0
+        self.fallbacks = 0
+
+    def _gridShape(self, L):
+        """Number of cells along each axis of an eligible mesh, or `None`"""
+        from fipy.meshes.uniformGrid1D import UniformGrid1D
+        from fipy.meshes.uniformGrid2D import UniformGrid2D
+        from fipy.meshes.uniformGrid3D import UniformGrid3D
+        from fipy.meshes.nonUniformGrid1D import NonUniformGrid1D
+        from fipy.meshes.nonUniformGrid2D import NonUniformGrid2D
+        from fipy.meshes.nonUniformGrid3D import NonUniformGrid3D
+        from fipy.meshes.cylindricalUniformGrid1D import CylindricalUniformGrid1D
+        from fipy.meshes.cylindricalUniformGrid2D import CylindricalUniformGrid2D
+        from fipy.meshes.sphericalUniformGrid1D import SphericalUniformGrid1D
+
+        mesh = self.var.mesh
+        if (not isinstance(mesh, (UniformGrid1D, UniformGrid2D, UniformGrid3D,
+                                  NonUniformGrid1D, NonUniformGrid2D, NonUniformGrid3D))
+            or isinstance(mesh, (CylindricalUniformGrid1D, CylindricalUniformGrid2D,
+                                 SphericalUniformGrid1D))
+            or mesh.communicator.Nproc > 1):
+            return None
+
+        shape = tuple(int(n) for n in mesh.shape)
+        N = int(numerix.prod(shape))
+        if (len(shape) != mesh.dim
+            or mesh.numberOfCells != N
+            or tuple(L._shape) != (N, N)):
+            return None
+
+        return shape
+
+    @staticmethod
+    def _takeRow(L, row, cols):
+        """Values of `L` in `row` at each of `cols`, read at once"""
+        return numerix.asarray(L.take([row] * len(cols), cols), dtype=float).ravel()
+
+    # multiple of the coupling added to the diagonal by a side, in place of
+    # the missing neighbor, since a fixed value face is half a cell away
+    _extra = {_NEUMANN: 0., _DIRICHLET: 2.}
+
+    @classmethod
+    def _side(cls, diagonal, along, end, inner, coupling):
+        """Kind of the side next to cells `end` along array axis `along`,
+        judged from the diagonal of the adjacent interior cells `inner`"""
+        difference = (numerix.take(diagonal, [end], axis=along)
+                      - numerix.take(diagonal, [inner], axis=along)).ravel()
+        extra = 1. - difference[0] / coupling
+        for kind, expected in cls._extra.items():
+            if abs(extra - expected) < 1e-8:
+                return kind
+        return None
+
+    def _structure(self, L):
+        """Diagonal shift, couplings and boundary types of the structured
+        operator matching `L`, or `None` if `L` has no such structure
+
+        Returns
+        -------
+        shape : tuple of int
+            Number of cells along each axis.
+        shift : float
+            Constant added to the diagonal.
+        couplings : tuple of float
+            Off-diagonal value between neighbors along each axis.
+        boundaries : tuple of tuple of str
+            Kind of the lower and upper side along each axis.
+        """
+        shape = self._gridShape(L)
+        if shape is None:
+            return None
+
+        diagonal = numerix.asarray(L.takeDiagonal()).reshape(shape[::-1])
+
+        # the first cell's neighbor along each axis, and the cell it would
+        # wrap around to if periodic
+        strides = numerix.cumprod((1,) + tuple(shape[:-1]))
+        neighbors = self._takeRow(L, 0, [col for n, stride in zip(shape, strides)
+                                         for col in (stride, (n - 1) * stride)])
+        neighbors = neighbors.reshape((len(shape), 2))
+
+        couplings = []
+        boundaries = []
+        # contribution of each axis to the diagonal of the first cell
+        corner = 0.
+        for axis, n in enumerate(shape):
+            along = len(shape) - 1 - axis
+            if n == 1:
+                # no neighbors, so anything on the diagonal is a shift
+                couplings.append(0.)
+                boundaries.append((_NEUMANN, _NEUMANN))
+            elif n < 3:
+                return None
+            else:
+                coupling, wrapped = [float(value) for value in neighbors[axis]]
+                if coupling == 0.:
+                    return None
+                elif abs(wrapped - coupling) <= 1e-8 * abs(coupling):
+                    boundaries.append((_PERIODIC, _PERIODIC))
+                    corner += -2 * coupling
+                elif wrapped == 0.:
+                    lower = self._side(diagonal, along, 0, 1, coupling)
+                    upper = self._side(diagonal, along, n - 1, n - 2, coupling)
+                    if lower is None or upper is None:
+                        return None
+                    boundaries.append((lower, upper))
+                    corner += (-1. - self._extra[lower]) * coupling
+                else:
+                    return None
+                couplings.append(coupling)
+
+        shift = float(diagonal.ravel()[0]) - corner
+
+        return shape, shift, tuple(couplings), tuple(boundaries)
+
+    @staticmethod
+    def _apply(shape, shift, couplings, boundaries, x):
+        """Product of the structured operator with `x`"""
+        x = x.reshape(shape[::-1])
+        y = shift * x
+        for axis, (coupling, (lower, upper)) in enumerate(zip(couplings, boundaries)):
+            if coupling == 0.:
+                continue
+            along = len(shape) - 1 - axis
+            xa = numerix.moveaxis(x, along, 0)
+            if lower == _PERIODIC:
+                ghost = numerix.concatenate((xa[-1:], xa, xa[:1]))
+            else:
+                # ghost values mirror the solution across a fixed gradient
+                # side and reverse its sign across a fixed value side
+                ghost = numerix.concatenate((xa[:1] if lower == _NEUMANN else -xa[:1],
+                                             xa,
+                                             xa[-1:] if upper == _NEUMANN else -xa[-1:]))
+            y += coupling * numerix.moveaxis(ghost[:-2] - 2 * xa + ghost[2:], 0, along)
+        return y.ravel()
+
+    # transforms that diagonalize the second difference along an axis with
+    # each combination of sides, and the frequencies of its eigenvectors
+    _transforms = {(_NEUMANN, _NEUMANN): ((fft.dct, fft.idct, 2), 0.),
+                   (_DIRICHLET, _DIRICHLET): ((fft.dst, fft.idst, 2), 1.),
+                   (_DIRICHLET, _NEUMANN): ((fft.dst, fft.idst, 4), 0.5),
+                   (_NEUMANN, _DIRICHLET): ((fft.dct, fft.idct, 4), 0.5)}
+
+    def _getEigenvalues(self, shape, shift, couplings, boundaries):
+        key = (shape, shift, couplings, boundaries)
+        if self._eigenvalues[0] != key:
+            eigenvalues = numerix.zeros(shape[::-1], 'd') + shift
+            for axis, (n, coupling, sides) in enumerate(zip(shape, couplings, boundaries)):
+                k = numerix.arange(n, dtype='d')
+                if sides[0] == _PERIODIC:
+                    theta = 2 * numerix.pi * k / n
+                else:
+                    theta = numerix.pi * (k + self._transforms[sides][1]) / n
+                mu = coupling * (2 * numerix.cos(theta) - 2)
+                index = [numerix.newaxis] * len(shape)
+                index[len(shape) - 1 - axis] = slice(None)
+                eigenvalues = eigenvalues + mu[tuple(index)]
+            self._eigenvalues = (key, eigenvalues)
+
+        return self._eigenvalues[1]
+
+    def _transform(self, structure, X, inverse=False):
+        shape, shift, couplings, boundaries = structure
+        periodic = [len(shape) - 1 - axis for axis, sides in enumerate(boundaries)
+                    if sides[0] == _PERIODIC]
+        if inverse and periodic:
+            X = fft.ifftn(X, axes=periodic).real
+        for axis, sides in enumerate(boundaries):
+            if sides[0] != _PERIODIC and shape[axis] > 1:
+                (forward, backward, kind), _ = self._transforms[sides]
+                X = (backward if inverse else forward)(X, type=kind,
+                                                       axis=len(shape) - 1 - axis,
+                                                       norm="ortho")
+        if not inverse and periodic:
+            X = fft.fftn(X, axes=periodic)
+        return X
+
+    def _solve_(self, L, x, b):
+        structure = self._structure(L)
+
+        if structure is not None:
+            probe = numerix.cos(numerix.arange(len(x)) * 1.2345) + 0.5
+            expected = numerix.asarray(L * probe)
+            discrepancy = numerix.L2norm(expected - self._apply(*(structure + (probe,))))
+            if not discrepancy <= self.tolerance * numerix.L2norm(expected):
+                self._log.debug("matrix differs from structured operator: %s",
+                                discrepancy)
+                structure = None
+
+        if structure is None:
+            self.fallbacks += 1
+            self._log.debug("falling back on %s", self.fallback)
+            self.fallback._storeMatrix(var=self.var, matrix=L, RHSvector=b)
+            return self.fallback._solve_(L, x, b)
+
+        shape = structure[0]
+        eigenvalues = self._getEigenvalues(*structure)
+        B = self._transform(structure, numerix.asarray(b).reshape(shape[::-1]))
+        X0 = self._transform(structure, numerix.asarray(x).reshape(shape[::-1]))
+        # modes in the null space, like the mean of a pure Neumann problem,
+        # keep their value from the initial guess
+        singular = abs(eigenvalues) <= 1e-12 * abs(eigenvalues).max()
+        X = numerix.where(singular, X0, B / numerix.where(singular, 1., eigenvalues))
+        self.transforms += 1
+
+        return numerix.asarray(self._transform(structure, X, inverse=True)).reshape(x.shape)
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
@@ -3,9 +3,11 @@ from __future__ import unicode_literals
 from builtins import range
 __docformat__ = 'restructuredtext'
 
+from collections import OrderedDict
+
 from scipy.sparse.linalg import splu
 
-from fipy.solvers.scipy.scipySolver import _ScipySolver
+from fipy.solvers.scipy.scipySolver import _ScipySolver, _fingerprint
 from fipy.tools import numerix
 from fipy.tools.timer import Timer
 
@@ -18,9 +20,99 @@ class LinearLUSolver(_ScipySolver):
     The `LinearLUSolver` solves a linear system of equations using
     LU-factorization.  The `LinearLUSolver` is a wrapper class for the
     the Scipy `scipy.sparse.linalg.splu` module.
+
+    Factorizations are retained and reused whenever the solver is asked to
+    solve a matrix identical to one it has already factored, such as the
+    matrix of a linear equation with constant coefficients and a constant
+    time step.
+
+    >>> from fipy import Grid1D, CellVariable, TransientTerm, DiffusionTerm
+    >>> mesh = Grid1D(nx=10)
+    >>> var = CellVariable(mesh=mesh, value=0.)
+    >>> var.constrain(1., mesh.facesLeft)
+    >>> eq = TransientTerm() == DiffusionTerm()
+    >>> solver = LinearLUSolver(maxFactorizations=2)
+    >>> for step in range(5):
+    ...     eq.solve(var=var, dt=1., solver=solver)
+    >>> print(solver.factorizations, solver.reuses)
+    1 4
+
+    A different matrix is factored anew, while the least recently used
+    factorization is discarded once `maxFactorizations` are held
+
+    >>> for dt in (2., 1., 3.):
+    ...     eq.solve(var=var, dt=dt, solver=solver)
+    >>> print(solver.factorizations, solver.reuses)
+    3 5
+    >>> print(len(solver._factorizations))
+    2
+
+    Several sources are solved for with a single factorization
+
+    >>> solver = LinearLUSolver()
+    >>> solutions = eq.solveMany(var=var, sources=[0., 1., 2.], dt=1.,
+    ...                          solver=solver)
+    >>> print(solver.factorizations, solver.reuses)
+    1 0
     """
 
+    def __init__(self, tolerance=1e-10, iterations=1000, precon=None,
+                 maxFactorizations=1):
+        """
+        Create a `LinearLUSolver` object.
+
+        Parameters
+        ----------
+        tolerance : float
+            Required error tolerance.
+        iterations : int
+            Maximum number of iterative refinement steps to perform.
+        precon
+            Preconditioner to use.  Ignored.
+        maxFactorizations : int
+            Number of factorizations to retain for reuse.  More than one
+            is useful when the solver is shared by several equations.
+            Zero disables reuse.
+        """
+        super(LinearLUSolver, self).__init__(tolerance=tolerance,
+                                             iterations=iterations,
+                                             precon=precon)
+        self.maxFactorizations = maxFactorizations
+        self._factorizations = OrderedDict()
+        self.factorizations = 0
+        self.reuses = 0
+
+    def _factor(self, L):
+        """Obtain the LU factorization of `L`, reusing a retained one if possible"""
+        if self.maxFactorizations > 0:
+            key = _fingerprint(L.matrix)
+            LU = self._factorizations.pop(key, None)
+            if LU is not None:
+                self.reuses += 1
+                self._log.debug("reusing LU factorization")
+                # most recently used goes to the end
+                self._factorizations[key] = LU
+                return LU
+
+        LU = splu(L.matrix.asformat("csc"), diag_pivot_thresh=1.,
+                                            relax=1,
+                                            panel_size=10,
+                                            permc_spec=3)
+        self.factorizations += 1
+
+        if self.maxFactorizations > 0:
+            self._factorizations[key] = LU
+            while len(self._factorizations) > self.maxFactorizations:
+                self._factorizations.popitem(last=False)
+
+        return LU
+
     def _solve_(self, L, x, b):
+        return self._solveMany_(L,
+                                x[..., numerix.newaxis],
+                                b[..., numerix.newaxis])[..., 0]
+
+    def _solveMany_(self, L, X, B):
         diag = L.takeDiagonal()
         maxdiag = max(numerix.absolute(diag))
 
@@ -28,32 +120,39 @@ class LinearLUSolver(_ScipySolver):
 
         with Timer() as t:
             L = L * (1 / maxdiag)
-            b = b * (1 / maxdiag)
+            B = B * (1 / maxdiag)
 
         self._log.debug("END precondition - {} ns".format(t.elapsed))
 
         self._log.debug("BEGIN solve")
 
         with Timer() as t:
-            LU = splu(L.matrix.asformat("csc"), diag_pivot_thresh=1.,
-                                                relax=1,
-                                                panel_size=10,
-                                                permc_spec=3)
+            LU = self._factor(L)
+            A = L.matrix
 
-            error0 = numerix.sqrt(numerix.sum((L * x - b)**2))
+            # refine all right hand sides together with the one factorization
+            error0 = numerix.sqrt(numerix.sum((A * X - B)**2, axis=0))
 
             for iteration in range(min(self.iterations, 10)):
-                errorVector = L * x - b
+                errorVector = A * X - B
 
-                if numerix.sqrt(numerix.sum(errorVector**2))  <= self.tolerance * error0:
+                if numerix.all(numerix.sqrt(numerix.sum(errorVector**2, axis=0))
+                               <= self.tolerance * error0):
                     break
 
-                xError = LU.solve(errorVector)
-                x[:] = x - xError
+                XError = LU.solve(errorVector)
+                X[:] = X - XError
 
         self._log.debug("END solve - {} ns".format(t.elapsed))
 
         self._log.debug('iterations: %d / %d', iteration+1, self.iterations)
-        self._log.debug('residual: %s', numerix.sqrt(numerix.sum(errorVector**2)))
+        self._log.debug('residual: %s', numerix.sqrt(numerix.sum(errorVector**2, axis=0)))
+
+        return X
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
 
-        return x
+if __name__ == "__main__":
+    _test()
@@ -0,0 +1,108 @@
+from __future__ import unicode_literals
+from builtins import range
+__docformat__ = 'restructuredtext'
+
+from fipy.solvers.scipy.scipySolver import _ScipySolver
+from fipy.solvers.scipy.preconditioners.multigridPreconditioner import MultigridPreconditioner
+from fipy.tools import numerix
+from fipy.tools.timer import Timer
+
+__all__ = ["LinearMultigridSolver"]
+from future.utils import text_to_native_str
+__all__ = [text_to_native_str(n) for n in __all__]
+
+class LinearMultigridSolver(_ScipySolver):
+    """
+    The `LinearMultigridSolver` solves a linear system of equations on a
+    `Grid1D`, `Grid2D` or `Grid3D` by repeating geometric multigrid
+    V-cycles until the residual is reduced by `tolerance`.  The cost of
+    each cycle grows linearly with the number of cells and the number of
+    cycles does not grow with resolution.  The cycles are those of a
+    :class:`~fipy.solvers.scipy.preconditioners.multigridPreconditioner.MultigridPreconditioner`,
+    which can also be passed to any of the SciPy Krylov solvers.
+
+    >>> from fipy import Grid2D, CellVariable, TransientTerm, DiffusionTerm
+    >>> from fipy.solvers.scipy.linearLUSolver import LinearLUSolver
+    >>> mesh = Grid2D(nx=40, ny=30)
+    >>> var = CellVariable(mesh=mesh, value=0.)
+    >>> var.constrain(1., mesh.facesLeft)
+    >>> eq = TransientTerm() == DiffusionTerm(coeff=10. + mesh.y)
+    >>> solver = LinearMultigridSolver(tolerance=1e-10)
+    >>> eq.solve(var=var, dt=10., solver=solver)
+    >>> print(solver.cycles < 20)
+    True
+    >>> expected = CellVariable(mesh=mesh, value=0.)
+    >>> expected.constrain(1., mesh.facesLeft)
+    >>> eq.solve(var=expected, dt=10., solver=LinearLUSolver())
+    >>> print(numerix.allclose(var, expected, atol=1e-8))
+    True
+    """
+
+    def __init__(self, tolerance=1e-10, iterations=100, precon=None,
+                 reusePreconditioner=False, preconditionerDegradation=None,
+                 extrapolationOrder=0):
+        """
+        Create a `LinearMultigridSolver` object.
+
+        Parameters
+        ----------
+        tolerance : float
+            Required reduction of the residual, relative to the right hand
+            side.
+        iterations : int
+            Maximum number of V-cycles to perform.
+        precon : ~fipy.solvers.scipy.preconditioners.multigridPreconditioner.MultigridPreconditioner, optional
+            The grid hierarchy and smoother to cycle with.
+        reusePreconditioner : bool or int
+            Whether to keep the grid hierarchy for subsequent solves.
+        preconditionerDegradation : float, optional
+            Rebuild a reused grid hierarchy once the number of cycles
+            grows by more than this fraction.
+        extrapolationOrder : {0, 1, 2}
+            Order of the extrapolation from previous time steps used as
+            the initial guess.
+        """
+        if precon is None:
+            precon = MultigridPreconditioner()
+        super(LinearMultigridSolver, self).__init__(tolerance=tolerance,
+                                                    iterations=iterations,
+                                                    precon=precon,
+                                                    reusePreconditioner=reusePreconditioner,
+                                                    preconditionerDegradation=preconditionerDegradation,
+                                                    extrapolationOrder=extrapolationOrder)
+        self.cycles = 0
+
+    def _solve_(self, L, x, b):
+        A = L.matrix
+        M = self._getPreconditioner(L, matrix=A)
+
+        self._log.debug("BEGIN solve")
+
+        with Timer() as t:
+            residual = b - A * x
+            reference = numerix.L2norm(b) or numerix.L2norm(residual)
+            for cycle in range(self.iterations):
+                if numerix.L2norm(residual) <= self.tolerance * reference:
+                    break
+                x = x + M.matvec(residual)
+                residual = b - A * x
+            else:
+                cycle = self.iterations
+
+        self._log.debug("END solve - {} ns".format(t.elapsed))
+
+        self._log.debug('iterations: %d / %d', cycle, self.iterations)
+        self._log.debug('residual: %s', numerix.L2norm(residual))
+
+        self.cycles = cycle
+        self._recordGuessIterations(cycle)
+        self._recordIterations(cycle)
+
+        return x
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
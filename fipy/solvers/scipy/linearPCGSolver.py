@@ -15,7 +15,9 @@ class LinearPCGSolver(_ScipyKrylovSolver):
     with no preconditioning by default.
     """
 
-    def __init__(self, tolerance=1e-15, iterations=2000, precon=None):
+    def __init__(self, tolerance=1e-15, iterations=2000, precon=None,
+                 reusePreconditioner=False, preconditionerDegradation=None,
+                 matrixFree=False, extrapolationOrder=0):
         """
         Parameters
         ----------
@@ -25,9 +27,26 @@ class LinearPCGSolver(_ScipyKrylovSolver):
             Maximum number of iterative steps to perform.
         precon
             Preconditioner to use.
+        reusePreconditioner : bool or int
+            Whether to reuse the preconditioner for subsequent solves.
+            `True` reuses it indefinitely and an integer `N` rebuilds it
+            every `N` solves.
+        preconditionerDegradation : float, optional
+            Rebuild a reused preconditioner once the iteration count
+            grows by more than this fraction.
+        matrixFree : bool
+            Whether to solve with a `LinearOperator` that applies the
+            discretization without assembling a sparse matrix.
+        extrapolationOrder : {0, 1, 2}
+            Order of the extrapolation from previous time steps used as
+            the initial guess.
         """
 
-        super(LinearPCGSolver, self).__init__(tolerance=tolerance, iterations=iterations, precon=precon)
+        super(LinearPCGSolver, self).__init__(tolerance=tolerance, iterations=iterations, precon=precon,
+                                              reusePreconditioner=reusePreconditioner,
+                                              preconditionerDegradation=preconditionerDegradation,
+                                              matrixFree=matrixFree,
+                                              extrapolationOrder=extrapolationOrder)
         self.solveFnc = cg
 
     def _canSolveAsymmetric(self):
@@ -0,0 +1,8 @@
+from __future__ import unicode_literals
+from fipy.solvers.scipy.preconditioners.blockJacobiPreconditioner import *
+from fipy.solvers.scipy.preconditioners.blockILUPreconditioner import *
+from fipy.solvers.scipy.preconditioners.multigridPreconditioner import *
+from fipy.solvers.scipy.preconditioners.jacobiPreconditioner import *
+from fipy.solvers.scipy.preconditioners.iluPreconditioner import *
+from fipy.solvers.scipy.preconditioners.ssorPreconditioner import *
+from fipy.solvers.scipy.preconditioners.smoothedAggregationPreconditioner import *
@@ -0,0 +1,66 @@
+from __future__ import unicode_literals
+__docformat__ = 'restructuredtext'
+
+from scipy.sparse.linalg import spilu
+
+from fipy.solvers.scipy.preconditioners.blockJacobiPreconditioner import BlockJacobiPreconditioner
+
+__all__ = ["BlockILUPreconditioner"]
+from future.utils import text_to_native_str
+__all__ = [text_to_native_str(n) for n in __all__]
+
+class BlockILUPreconditioner(BlockJacobiPreconditioner):
+    """
+    Block incomplete LU preconditioner for SciPy.
+
+    Like :class:`~fipy.solvers.scipy.preconditioners.BlockJacobiPreconditioner`,
+    but each diagonal block is only approximately factored, with
+    :func:`~scipy.sparse.linalg.spilu`.
+
+    >>> from fipy import Grid2D, CellVariable, TransientTerm, DiffusionTerm
+    >>> from fipy.solvers.scipy.linearGMRESSolver import LinearGMRESSolver
+    >>> from fipy.tools import numerix
+    >>> mesh = Grid2D(nx=20, ny=20)
+    >>> v0 = CellVariable(mesh=mesh, value=0.)
+    >>> v1 = CellVariable(mesh=mesh, value=0.)
+    >>> v0.constrain(1., mesh.facesLeft)
+    >>> v1.constrain(1., mesh.facesTop)
+    >>> eq = ((TransientTerm(var=v0) == DiffusionTerm(var=v0) + 0.1 * (v1 - v0))
+    ...       & (TransientTerm(var=v1) == DiffusionTerm(var=v1) + 0.1 * (v0 - v1)))
+    >>> solver = LinearGMRESSolver(tolerance=1e-10,
+    ...                            precon=BlockILUPreconditioner())
+    >>> eq.solve(dt=10., solver=solver)
+    >>> reference = v0.copy(), v1.copy()
+    >>> v0.setValue(0.)
+    >>> v1.setValue(0.)
+    >>> eq.solve(dt=10., solver=LinearGMRESSolver(tolerance=1e-10))
+    >>> print(numerix.allclose(v0, reference[0], atol=1e-6))
+    True
+    >>> print(numerix.allclose(v1, reference[1], atol=1e-6))
+    True
+    """
+
+    def __init__(self, dropTolerance=1e-4, fillFactor=10):
+        """
+        Parameters
+        ----------
+        dropTolerance : float
+            Drop tolerance of the incomplete factorization.
+        fillFactor : float
+            Upper bound on the ratio of the fill of the factorization to
+            that of the block.
+        """
+        self.dropTolerance = dropTolerance
+        self.fillFactor = fillFactor
+
+    def _factor(self, block):
+        return spilu(block.tocsc(),
+                     drop_tol=self.dropTolerance,
+                     fill_factor=self.fillFactor).solve
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
@@ -0,0 +1,88 @@
+from __future__ import unicode_literals
+from builtins import range
+__docformat__ = 'restructuredtext'
+
+from scipy.sparse.linalg import LinearOperator, splu
+
+from fipy.solvers.scipy.preconditioners.preconditioner import Preconditioner
+from fipy.tools import numerix
+
+__all__ = ["BlockJacobiPreconditioner"]
+from future.utils import text_to_native_str
+__all__ = [text_to_native_str(n) for n in __all__]
+
+class BlockJacobiPreconditioner(Preconditioner):
+    """
+    Block Jacobi preconditioner for SciPy.
+
+    Each equation of a coupled system is preconditioned by a factorization
+    of the block coupling it to its own solution variable, ignoring the
+    blocks that couple it to the other variables.  An uncoupled equation is
+    a single block, so it is preconditioned by its complete factorization.
+
+    >>> from fipy import Grid1D, CellVariable, TransientTerm, DiffusionTerm
+    >>> from fipy.solvers.scipy.linearGMRESSolver import LinearGMRESSolver
+    >>> mesh = Grid1D(nx=50)
+    >>> v0 = CellVariable(mesh=mesh, value=0.)
+    >>> v1 = CellVariable(mesh=mesh, value=1.)
+    >>> v0.constrain(1., mesh.facesLeft)
+    >>> eq = ((TransientTerm(var=v0) == DiffusionTerm(var=v0) - 0.1 * v1)
+    ...       & (TransientTerm(var=v1) == DiffusionTerm(var=v1)
+    ...                                   + 0.1 * v0 - 0.1 * v1))
+    >>> solver = LinearGMRESSolver(tolerance=1e-10,
+    ...                            precon=BlockJacobiPreconditioner())
+    >>> eq.solve(dt=1., solver=solver)
+    >>> reference = v0.copy(), v1.copy()
+    >>> v0.setValue(0.)
+    >>> v1.setValue(1.)
+    >>> eq.solve(dt=1., solver=LinearGMRESSolver(tolerance=1e-10))
+    >>> print(numerix.allclose(v0, reference[0]))
+    True
+    >>> print(numerix.allclose(v1, reference[1]))
+    True
+    """
+
+    def _factor(self, block):
+        """Returns a function that applies the inverse of `block`"""
+        return splu(block.tocsc()).solve
+
+    def _diagonalBlocks(self, L, A):
+        N = A.shape[0] // L.numberOfEquations
+        for index in range(L.numberOfEquations):
+            if hasattr(L, "_diagonalBlock"):
+                yield L._diagonalBlock(index)
+            else:
+                yield A[index * N:(index + 1) * N,
+                        index * N:(index + 1) * N]
+
+    def _operator(self, L, A):
+        """
+        Returns a `LinearOperator` that applies the inverses of the
+        diagonal blocks of `L`
+        """
+        inverses = []
+        for block in self._diagonalBlocks(L, A):
+            if block.nnz == 0:
+                # the equation doesn't involve its own variable
+                inverses.append(None)
+            else:
+                inverses.append(self._factor(block))
+
+        N = A.shape[0] // len(inverses)
+
+        def matvec(x):
+            x = numerix.asarray(x).ravel()
+            y = x.copy()
+            for index, inverse in enumerate(inverses):
+                if inverse is not None:
+                    y[index * N:(index + 1) * N] = inverse(x[index * N:(index + 1) * N])
+            return y
+
+        return LinearOperator(A.shape, matvec=matvec, dtype=A.dtype)
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
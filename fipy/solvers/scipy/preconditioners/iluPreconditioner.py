@@ -0,0 +1,66 @@
+from __future__ import unicode_literals
+__docformat__ = 'restructuredtext'
+
+from scipy.sparse.linalg import LinearOperator, spilu
+
+from fipy.solvers.scipy.preconditioners.preconditioner import Preconditioner
+
+__all__ = ["ILUPreconditioner"]
+from future.utils import text_to_native_str
+__all__ = [text_to_native_str(n) for n in __all__]
+
+class ILUPreconditioner(Preconditioner):
+    """
+    Incomplete LU preconditioner for SciPy.
+
+    A wrapper for :func:`~scipy.sparse.linalg.spilu`, in which the fill of
+    the factors is limited by `dropTolerance` and `fillFactor`.
+
+    >>> from fipy import Grid2D, CellVariable, TransientTerm, DiffusionTerm
+    >>> from fipy.solvers.scipy.linearGMRESSolver import LinearGMRESSolver
+    >>> from fipy.tools import numerix
+    >>> mesh = Grid2D(nx=40, ny=40)
+    >>> eq = TransientTerm() == DiffusionTerm(coeff=1. + mesh.y)
+    >>> def iterations(precon):
+    ...     var = CellVariable(mesh=mesh, value=0.)
+    ...     var.constrain(1., mesh.facesLeft)
+    ...     solver = LinearGMRESSolver(tolerance=1e-10, precon=precon)
+    ...     counts = []
+    ...     solver._recordIterations = counts.append
+    ...     eq.solve(var=var, dt=100., solver=solver)
+    ...     return counts[0]
+
+    A more complete factorization costs more to build and to apply, but
+    takes fewer iterations
+
+    >>> print(iterations(ILUPreconditioner(dropTolerance=1e-2, fillFactor=2))
+    ...       > iterations(ILUPreconditioner(dropTolerance=1e-5, fillFactor=20)))
+    True
+    """
+
+    def __init__(self, dropTolerance=1e-4, fillFactor=10):
+        """
+        Parameters
+        ----------
+        dropTolerance : float
+            Drop tolerance of the incomplete factorization.
+        fillFactor : float
+            Upper bound on the ratio of the fill of the factorization to
+            that of the matrix.
+        """
+        self.dropTolerance = dropTolerance
+        self.fillFactor = fillFactor
+
+    def _operator(self, L, A):
+        ILU = spilu(A.tocsc(),
+                    drop_tol=self.dropTolerance,
+                    fill_factor=self.fillFactor)
+
+        return LinearOperator(A.shape, matvec=ILU.solve, dtype=A.dtype)
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
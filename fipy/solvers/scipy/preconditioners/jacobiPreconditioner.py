@@ -0,0 +1,55 @@
+from __future__ import unicode_literals
+__docformat__ = 'restructuredtext'
+
+from scipy.sparse.linalg import LinearOperator
+
+from fipy.solvers.scipy.preconditioners.preconditioner import Preconditioner
+from fipy.tools import numerix
+
+__all__ = ["JacobiPreconditioner"]
+from future.utils import text_to_native_str
+__all__ = [text_to_native_str(n) for n in __all__]
+
+class JacobiPreconditioner(Preconditioner):
+    """
+    Jacobi preconditioner for SciPy.
+
+    Scales each equation by the inverse of its diagonal coefficient, which
+    helps when the coefficients vary widely over the mesh.
+
+    >>> from fipy import Grid1D, CellVariable, DiffusionTerm
+    >>> from fipy.solvers.scipy.linearPCGSolver import LinearPCGSolver
+    >>> mesh = Grid1D(nx=100)
+    >>> var = CellVariable(mesh=mesh)
+    >>> var.constrain(0., mesh.facesLeft)
+    >>> var.constrain(1., mesh.facesRight)
+    >>> eq = DiffusionTerm(coeff=10.**(4 * mesh.x / 100.))
+    >>> precon = JacobiPreconditioner()
+    >>> for sweep in range(3):
+    ...     eq.solve(var=var, solver=LinearPCGSolver(tolerance=1e-12,
+    ...                                              precon=precon))
+    >>> print(numerix.allclose(eq.justResidualVector(var=var), 0., atol=1e-8))
+    True
+
+    The matrix is the same for every sweep, so the preconditioner is only
+    built once
+
+    >>> print(precon.builds, precon.reuses)
+    1 2
+    """
+
+    def _operator(self, L, A):
+        diagonal = A.diagonal()
+        inverse = 1. / numerix.where(diagonal == 0, 1., diagonal)
+
+        def matvec(x):
+            return inverse * numerix.asarray(x).ravel()
+
+        return LinearOperator(A.shape, matvec=matvec, dtype=A.dtype)
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
@@ -0,0 +1,74 @@
+from __future__ import unicode_literals
+from builtins import object
+__all__ = ["Preconditioner"]
+from future.utils import text_to_native_str
+__all__ = [text_to_native_str(n) for n in __all__]
+
+import scipy.sparse as sp
+
+from fipy.solvers.scipy.scipySolver import _fingerprint
+from fipy.tools import numerix
+
+class Preconditioner(object):
+    """
+    Base preconditioner class for the SciPy solvers
+
+    .. attention:: This class is abstract. Always create one of its subclasses.
+
+    The preconditioner built for a matrix is retained and applied again,
+    without being rebuilt, for as long as the solver presents a matrix with
+    the same sparsity and values.  The numbers of `builds` and `reuses`
+    are counted.
+    """
+
+    builds = 0
+    reuses = 0
+
+    def __init__(self):
+        """
+        Create a `Preconditioner` object.
+        """
+        if self.__class__ is Preconditioner:
+            raise NotImplementedError("can't instantiate abstract base class")
+
+    @staticmethod
+    def _assembled(L):
+        """Sparse matrix of `L`, even if it is matrix-free"""
+        if hasattr(L, "_stencilTriplets"):
+            N = L._shape[0]
+            vector, id1, id2 = L._stencilTriplets()
+            ids = numerix.arange(N)
+            # the triplets include the diagonal entries of the face couplings
+            return sp.csr_matrix((numerix.concatenate((L._diagonal, vector)),
+                                  (numerix.concatenate((ids, id1)),
+                                   numerix.concatenate((ids, id2)))),
+                                 shape=L._shape)
+        else:
+            return sp.csr_matrix(L.matrix)
+
+    def _applyToMatrix(self, L):
+        """
+        Returns the preconditioner, as a
+        :class:`~scipy.sparse.linalg.LinearOperator`, for the FiPy mesh
+        matrix `L`, so that the structure of the system of equations
+        is available as well as the SciPy `L.matrix`.
+        """
+        A = self._assembled(L)
+        key = _fingerprint(A)
+        cached = self.__dict__.get("_cached")
+        if cached is not None and cached[0] == key:
+            self.reuses += 1
+            return cached[1]
+
+        operator = self._operator(L, A)
+        self.builds += 1
+        self._cached = (key, operator)
+
+        return operator
+
+    def _operator(self, L, A):
+        """
+        Returns the preconditioner for the FiPy mesh matrix `L`, whose
+        SciPy sparse matrix is `A`.
+        """
+        raise NotImplementedError
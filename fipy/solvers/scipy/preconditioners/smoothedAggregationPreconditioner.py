@@ -0,0 +1,72 @@
+from __future__ import unicode_literals
+__docformat__ = 'restructuredtext'
+
+from fipy.solvers.scipy.preconditioners.preconditioner import Preconditioner
+from fipy.tests.doctestPlus import register_skipper
+
+__all__ = ["SmoothedAggregationPreconditioner"]
+from future.utils import text_to_native_str
+__all__ = [text_to_native_str(n) for n in __all__]
+
+def _checkForPyAMG():
+    hasPyAMG = True
+    try:
+        import pyamg
+    except Exception:
+        hasPyAMG = False
+    return hasPyAMG
+
+register_skipper(flag="PYAMG",
+                 test=_checkForPyAMG,
+                 why="the `pyamg` package cannot be imported")
+
+class SmoothedAggregationPreconditioner(Preconditioner):
+    """
+    Smoothed aggregation algebraic multigrid preconditioner for SciPy.
+
+    A wrapper for :func:`pyamg.aggregation.smoothed_aggregation_solver`.
+    Unlike the
+    :class:`~fipy.solvers.scipy.preconditioners.multigridPreconditioner.MultigridPreconditioner`,
+    the coarse grids are found from the matrix alone, so any mesh can be
+    used.  Requires the `pyamg` package.
+
+    >>> from fipy import Grid2D, CellVariable, DiffusionTerm
+    >>> from fipy.solvers.scipy.linearPCGSolver import LinearPCGSolver
+    >>> from fipy.tools import numerix
+    >>> mesh = Grid2D(nx=100, ny=100, dx=0.01, dy=0.01)
+    >>> var = CellVariable(mesh=mesh)
+    >>> var.constrain(0., mesh.facesLeft)
+    >>> var.constrain(1., mesh.facesRight)
+    >>> precon = SmoothedAggregationPreconditioner()
+    >>> solver = LinearPCGSolver(tolerance=1e-10, precon=precon)
+    >>> DiffusionTerm().solve(var=var, solver=solver) # doctest: +PYAMG
+    >>> print(numerix.allclose(var, mesh.x, atol=1e-8)) # doctest: +PYAMG
+    True
+    """
+
+    def __init__(self, cycle="V", **kwargs):
+        """
+        Parameters
+        ----------
+        cycle : {"V", "W", "F", "AMLI"}
+            Type of multigrid cycle applied.
+        **kwargs
+            Passed to :func:`pyamg.aggregation.smoothed_aggregation_solver`,
+            e.g., `strength`, `smooth` or `max_coarse`.
+        """
+        self.cycle = cycle
+        self.kwargs = kwargs
+
+    def _operator(self, L, A):
+        import pyamg
+
+        hierarchy = pyamg.smoothed_aggregation_solver(A, **self.kwargs)
+
+        return hierarchy.aspreconditioner(cycle=self.cycle)
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
@@ -1,9 +1,12 @@
 from __future__ import unicode_literals
+from builtins import range
 __docformat__ = 'restructuredtext'
 
 __all__ = []
 
 from fipy.solvers.scipy.scipySolver import _ScipySolver
+from fipy.solvers.scipy.preconditioners.preconditioner import Preconditioner
+from fipy.tools import numerix
 from fipy.tools.timer import Timer
 
 class _ScipyKrylovSolver(_ScipySolver):
@@ -11,9 +14,159 @@ class _ScipyKrylovSolver(_ScipySolver):
     The base `ScipyKrylovSolver` class.
 
     .. attention:: This class is abstract. Always create one of its subclasses.
+
+    Building a preconditioner can cost more than the solve it accelerates.
+    Subject to `reusePreconditioner` and `preconditionerDegradation`, the
+    preconditioner built for one solve is applied to subsequent ones.
+
+    >>> from scipy.sparse.linalg import aslinearoperator
+    >>> from scipy.sparse import diags
+    >>> class _Jacobi(object):
+    ...     def _applyToMatrix(self, A):
+    ...         return aslinearoperator(diags(1. / A.diagonal()))
+    >>> from fipy import Grid1D, CellVariable, TransientTerm, DiffusionTerm
+    >>> from fipy.solvers.scipy.linearPCGSolver import LinearPCGSolver
+    >>> mesh = Grid1D(nx=100)
+    >>> var = CellVariable(mesh=mesh, value=0.)
+    >>> var.constrain(1., mesh.facesLeft)
+    >>> eq = TransientTerm() == DiffusionTerm()
+    >>> def sweep(solver, dts):
+    ...     for dt in dts:
+    ...         eq.solve(var=var, dt=dt, solver=solver)
+    ...     return solver.preconditionerBuilds
+
+    By default, the preconditioner is rebuilt for every solve
+
+    >>> print(sweep(LinearPCGSolver(precon=_Jacobi()), [1.] * 6))
+    6
+
+    but it can be kept indefinitely
+
+    >>> print(sweep(LinearPCGSolver(precon=_Jacobi(),
+    ...                             reusePreconditioner=True), [1.] * 6))
+    1
+
+    or rebuilt every `N` solves
+
+    >>> print(sweep(LinearPCGSolver(precon=_Jacobi(),
+    ...                             reusePreconditioner=4), [1.] * 6))
+    2
+
+    or rebuilt when the iteration count has grown too much
+
+    >>> print(sweep(LinearPCGSolver(precon=_Jacobi(),
+    ...                             preconditionerDegradation=0.5),
+    ...             [0.001, 0.001, 1000., 1000.]))
+    2
+
+    Several sources solved for at once share the preconditioner
+
+    >>> solver = LinearPCGSolver(precon=_Jacobi())
+    >>> solutions = eq.solveMany(var=var, sources=[0., 1., 2.], dt=1.,
+    ...                          solver=solver)
+    >>> print(solver.preconditionerBuilds)
+    1
+
+    A solver shared by two equations doesn't apply the preconditioner built
+    for one to the other
+
+    >>> other = CellVariable(mesh=mesh, value=0.)
+    >>> otherEq = TransientTerm() == DiffusionTerm(coeff=100.)
+    >>> solver = LinearPCGSolver(precon=_Jacobi(), reusePreconditioner=True)
+    >>> for step in range(3):
+    ...     eq.solve(var=var, dt=1., solver=solver)
+    ...     otherEq.solve(var=other, dt=1., solver=solver)
+    >>> print(solver.preconditionerBuilds)
+    6
+
+    With `matrixFree`, the terms are applied by a
+    :class:`~scipy.sparse.linalg.LinearOperator` instead of being
+    assembled into a sparse matrix
+
+    >>> var.setValue(0.)
+    >>> eq.solve(var=var, dt=1., solver=LinearPCGSolver())
+    >>> assembled = var.copy()
+    >>> var.setValue(0.)
+    >>> eq.solve(var=var, dt=1., solver=LinearPCGSolver(matrixFree=True))
+    >>> print(numerix.allclose(var, assembled))
+    True
+
+    With `extrapolationOrder`, each time step starts iterating from an
+    extrapolation of the solutions of previous time steps, if that is a
+    better guess than the current value
+
+    >>> def march(solver):
+    ...     var = CellVariable(mesh=mesh, value=0., hasOld=True)
+    ...     var.constrain(1., mesh.facesLeft)
+    ...     eq = TransientTerm() == DiffusionTerm()
+    ...     for step in range(5):
+    ...         var.updateOld()
+    ...         for sweep in range(2):
+    ...             eq.sweep(var=var, dt=1., solver=solver)
+    ...     return var
+    >>> solver = LinearPCGSolver(tolerance=1e-12, extrapolationOrder=2)
+    >>> print(numerix.allclose(march(solver), march(LinearPCGSolver(tolerance=1e-12))))
+    True
+    >>> print(len(solver._acceptedSolutions))
+    3
+
+    The first solve of each time step is counted, with its iterations, by
+    whether it started from the extrapolation
+
+    >>> stats = solver.extrapolationStatistics
+    >>> print(stats["extrapolatedSolves"] + stats["currentSolves"])
+    5
+    >>> print(stats["extrapolatedSolves"] > 0, stats["extrapolatedIterations"] > 0)
+    True True
     """
 
-    def _solve_(self, L, x, b):
+    def __init__(self, tolerance=1e-15, iterations=2000, precon=None,
+                 reusePreconditioner=False, preconditionerDegradation=None,
+                 matrixFree=False, extrapolationOrder=0):
+        """
+        Parameters
+        ----------
+        tolerance : float
+            Required error tolerance.
+        iterations : int
+            Maximum number of iterative steps to perform.
+        precon
+            Preconditioner to use.
+        reusePreconditioner : bool or int
+            Whether to reuse the preconditioner for subsequent solves.
+        preconditionerDegradation : float, optional
+            Rebuild a reused preconditioner once the iteration count
+            grows by more than this fraction.
+        matrixFree : bool
+            Whether to solve with a
+            :class:`~scipy.sparse.linalg.LinearOperator` that applies the
+            face contributions of the terms directly, rather than with an
+            assembled sparse matrix.  Any preconditioner receives this
+            `LinearOperator`.
+        extrapolationOrder : {0, 1, 2}
+            Order of the extrapolation from previous time steps used as
+            the initial guess.
+        """
+        super(_ScipyKrylovSolver, self).__init__(tolerance=tolerance, iterations=iterations, precon=precon,
+                                                 reusePreconditioner=reusePreconditioner,
+                                                 preconditionerDegradation=preconditionerDegradation,
+                                                 extrapolationOrder=extrapolationOrder)
+        self.matrixFree = matrixFree
+
+    @property
+    def _matrixClass(self):
+        if self.matrixFree:
+            from fipy.matrices.matrixFreeMatrix import _ScipyMatrixFreeMeshMatrix
+            return _ScipyMatrixFreeMeshMatrix
+        else:
+            return super(_ScipyKrylovSolver, self)._matrixClass
+
+    def _callbackArgs(self, callback):
+        """Keyword arguments to have `solveFnc` call `callback` each iteration"""
+        return dict(callback=callback)
+
+    def _precondition(self, L):
+        """Obtain the preconditioner `M` for the SciPy solver"""
         A = L.matrix
 
         self._log.debug("BEGIN precondition")
@@ -21,23 +174,60 @@ class _ScipyKrylovSolver(_ScipySolver):
         with Timer() as t:
             if self.preconditioner is None:
                 M = None
+            elif isinstance(self.preconditioner, Preconditioner):
+                # needs the structure of the system of equations
+                M = self._getPreconditioner(L, matrix=A)
             else:
-                M = self.preconditioner._applyToMatrix(A)
+                M = self._getPreconditioner(A, matrix=A)
 
         self._log.debug("END precondition - {} ns".format(t.elapsed))
 
+        return M
+
+    def _iterate(self, A, x, b, M):
         self._log.debug("BEGIN solve")
 
+        iterations = [0]
+
+        def callback(*args):
+            iterations[0] += 1
+
         with Timer() as t:
             x, info = self.solveFnc(A, b, x,
                                     rtol=self.tolerance,
                                     maxiter=self.iterations,
                                     M=M,
-                                    atol=0.0)
+                                    atol=0.0,
+                                    **self._callbackArgs(callback))
 
         self._log.debug("END solve - {} ns".format(t.elapsed))
 
+        self._log.debug('iterations: %d / %d', iterations[0], self.iterations)
+
+        self._recordGuessIterations(iterations[0])
+        if M is not None:
+            self._recordIterations(iterations[0])
+
         if info < 0:
             self._log.debug('failure: %s', self._warningList[info].__class__.__name__)
 
         return x
+
+    def _solve_(self, L, x, b):
+        return self._iterate(L.matrix, x, b, M=self._precondition(L))
+
+    def _solveMany_(self, L, X, B):
+        # every right hand side shares the matrix, and so the preconditioner
+        A = L.matrix
+        M = self._precondition(L)
+        for column in range(B.shape[1]):
+            X[..., column] = self._iterate(A, X[..., column].copy(), B[..., column], M=M)
+
+        return X
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
@@ -1,12 +1,23 @@
 from __future__ import unicode_literals
+from builtins import range
 __docformat__ = 'restructuredtext'
 
 __all__ = []
 
+import hashlib
+
 from fipy.matrices.scipyMatrix import _ScipyMeshMatrix
 from fipy.solvers.solver import Solver
 from fipy.tools import numerix
 
+def _fingerprint(matrix):
+    """Digest of the values and sparsity of a SciPy sparse matrix"""
+    matrix = matrix.tocsr()
+    digest = hashlib.sha1()
+    for array in (matrix.data, matrix.indices, matrix.indptr):
+        digest.update(numerix.ascontiguousarray(array).view(numerix.uint8))
+    return (matrix.shape, matrix.nnz, matrix.dtype.str, digest.hexdigest())
+
 class _ScipySolver(Solver):
     """
     The base `ScipySolver` class.
@@ -23,4 +34,31 @@ class _ScipySolver(Solver):
          if self.var.mesh.communicator.Nproc > 1:
              raise Exception("SciPy solvers cannot be used with multiple processors")
 
-         self.var[:] = numerix.reshape(self._solve_(self.matrix, self.var.ravel(), numerix.array(self.RHSvector)), self.var.shape)
+         b = numerix.array(self.RHSvector)
+         x = self._initialGuess(self.matrix, self.var.ravel(), b)
+
+         self.var[:] = numerix.reshape(self._solve_(self.matrix, x, b), self.var.shape)
+
+    def _solveMany(self, RHSvectors):
+        if self.var.mesh.communicator.Nproc > 1:
+            raise Exception("SciPy solvers cannot be used with multiple processors")
+
+        B = numerix.array([numerix.array(b).ravel() for b in RHSvectors]).swapaxes(0, 1)
+        X = numerix.repeat(self.var.ravel()[..., numerix.newaxis], B.shape[1], axis=1)
+
+        X = self._solveMany_(self.matrix, X, B)
+
+        solutions = []
+        for x in X.swapaxes(0, 1):
+            solution = self.var.copy()
+            solution[:] = numerix.reshape(x, self.var.shape)
+            solutions.append(solution)
+
+        return solutions
+
+    def _solveMany_(self, L, X, B):
+        """Solve `L` for each column of `B`, starting from the columns of `X`"""
+        for column in range(B.shape[1]):
+            X[..., column] = self._solve_(L, X[..., column].copy(), B[..., column])
+
+        return X
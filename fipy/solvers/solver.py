@@ -17,6 +17,8 @@ from builtins import object
 from builtins import str
 __docformat__ = 'restructuredtext'
 
+from collections import deque
+import hashlib
 import logging
 
 from fipy.tools import numerix
@@ -71,7 +73,9 @@ class Solver(object):
     .. attention:: This class is abstract. Always create one of its subclasses.
     """
 
-    def __init__(self, tolerance=1e-10, iterations=1000, precon=None):
+    def __init__(self, tolerance=1e-10, iterations=1000, precon=None,
+                 reusePreconditioner=False, preconditionerDegradation=None,
+                 extrapolationOrder=0):
         """
         Create a `Solver` object.
 
@@ -84,6 +88,28 @@ class Solver(object):
         precon
             Preconditioner to use.  Not all solver suites support
             preconditioners.
+        reusePreconditioner : bool or int
+            Whether to keep the preconditioner built for one solve and
+            apply it to subsequent solves for the same variable, of a
+            matrix with the same sparsity structure.
+            `True` reuses it indefinitely and an integer `N` rebuilds it
+            every `N` solves.  Not all solver suites support reuse.
+        preconditionerDegradation : float, optional
+            Rebuild a reused preconditioner once a solve takes more than
+            this fraction of additional iterations, compared to the first
+            solve after the preconditioner was built, e.g., `0.5` to
+            rebuild when the iteration count degrades by 50%.  Implies
+            reuse.
+        extrapolationOrder : {0, 1, 2}
+            Start iterating from the current value of the solution
+            variable (0), or from a linear (1) or quadratic (2)
+            extrapolation of the solutions accepted at previous time steps,
+            assumed equally spaced.  A new time step is recognized when
+            the old value of the variable changes.  The extrapolation is
+            only used when it reduces the initial residual.  The
+            iterations taken by the first solve of each time step, with
+            and without the extrapolated guess, are counted in
+            `extrapolationStatistics`.
         """
         if self.__class__ is Solver:
             raise NotImplementedError("can't instantiate abstract base class")
@@ -92,6 +118,18 @@ class Solver(object):
         self.iterations = iterations
 
         self.preconditioner = precon
+        self.reusePreconditioner = reusePreconditioner
+        self.preconditionerDegradation = preconditionerDegradation
+        self.preconditionerBuilds = 0
+        self._discardPreconditioner()
+
+        self.extrapolationOrder = extrapolationOrder
+        self._acceptedSolutions = deque(maxlen=extrapolationOrder + 1)
+        self._guess = None
+        self.extrapolationStatistics = dict(extrapolatedSolves=0,
+                                            extrapolatedIterations=0,
+                                            currentSolves=0,
+                                            currentIterations=0)
 
         self._log = logging.getLogger(self.__class__.__module__
                                       + "." + self.__class__.__name__)
@@ -101,9 +139,174 @@ class Solver(object):
         self.matrix = matrix
         self.RHSvector = RHSvector
 
+    def _discardPreconditioner(self):
+        self._preconditioned = None
+        self._preconditionedKey = None
+        self._preconditionedSolves = 0
+        self._referenceIterations = None
+        self._preconditionerDegraded = False
+
+    def _preconditionerKey(self, matrix):
+        """What a retained preconditioner must have been built for
+
+        The shape and sparsity structure of `matrix` and the variables
+        being solved for, so that a solver shared by several equations
+        doesn't apply one's preconditioner to another.
+        """
+        fingerprint = None
+        if hasattr(matrix, "indices") and hasattr(matrix, "indptr"):
+            digest = hashlib.sha1(numerix.asarray(matrix.indptr).tobytes())
+            digest.update(numerix.asarray(matrix.indices).tobytes())
+            fingerprint = digest.hexdigest()
+        var = getattr(self, "var", None)
+        variables = tuple(id(v) for v in getattr(var, "vars", [var]))
+        return (tuple(matrix.shape), fingerprint, variables)
+
+    def _preconditionerIsStale(self, key):
+        reuse = (self.reusePreconditioner is not False
+                 or self.preconditionerDegradation is not None)
+
+        if (not reuse
+            or self._preconditioned is None
+            or self._preconditionedKey != key
+            or self._preconditionerDegraded):
+            return True
+        elif self.reusePreconditioner is True or self.reusePreconditioner is False:
+            return False
+        else:
+            return self._preconditionedSolves >= self.reusePreconditioner
+
+    def _getPreconditioner(self, A, matrix):
+        """Obtain the preconditioner for `A`, subject to the reuse policy
+
+        Parameters
+        ----------
+        A
+            The matrix to pass to the preconditioner's `_applyToMatrix()`.
+        matrix : ~scipy.sparse.spmatrix
+            The sparse matrix of the system.  A retained preconditioner is
+            only reused for matrices of the same shape and sparsity
+            structure, solving for the same variables.
+        """
+        key = self._preconditionerKey(matrix)
+        if self._preconditionerIsStale(key):
+            self._discardPreconditioner()
+            self._preconditioned = self.preconditioner._applyToMatrix(A)
+            self._preconditionedKey = key
+            self.preconditionerBuilds += 1
+            self._log.debug("preconditioner builds: %d", self.preconditionerBuilds)
+        else:
+            self._log.debug("reusing preconditioner (%d solves since build)",
+                            self._preconditionedSolves)
+
+        self._preconditionedSolves += 1
+
+        return self._preconditioned
+
+    def _recordIterations(self, iterations):
+        """Track the iterations taken with a retained preconditioner"""
+        if self._referenceIterations is None:
+            self._referenceIterations = iterations
+        elif (self.preconditionerDegradation is not None
+              and iterations > ((1 + self.preconditionerDegradation)
+                                * self._referenceIterations)):
+            self._preconditionerDegraded = True
+            self._log.debug("preconditioner degraded: %d iterations vs %d",
+                            iterations, self._referenceIterations)
+
+    def _recordGuessIterations(self, iterations):
+        """Count the iterations of the first solve of a time step, by
+        whether it started from the extrapolated guess"""
+        if self._guess is not None:
+            self.extrapolationStatistics[self._guess + "Solves"] += 1
+            self.extrapolationStatistics[self._guess + "Iterations"] += iterations
+            self._log.debug("iterations from %s guess: %d", self._guess, iterations)
+            self._guess = None
+
+    # weights of the most recent accepted solutions
+    _extrapolationWeights = {0: (1.,),
+                             1: (2., -1.),
+                             2: (3., -3., 1.)}
+
+    def _initialGuess(self, L, x, b):
+        """Extrapolate the initial guess from previously accepted solutions
+
+        Parameters
+        ----------
+        L
+            The matrix of the linear system.
+        x : ndarray
+            The current value of the solution variable.
+        b : ndarray
+            The right hand side vector.
+
+        Returns
+        -------
+        ndarray
+            `x` or, if it has a smaller residual, the extrapolated guess.
+        """
+        self._guess = None
+
+        accepted = numerix.array(getattr(self.var, "old", self.var)).ravel()
+        history = self._acceptedSolutions
+        if len(history) > 0 and history[-1].shape != accepted.shape:
+            history.clear()
+        elif len(history) > 0 and numerix.array_equal(history[-1], accepted):
+            # another sweep of the same time step
+            return x
+        history.append(accepted)
+
+        self._guess = "current"
+        order = min(self.extrapolationOrder, len(history) - 1)
+        if order == 0:
+            return x
+
+        guess = numerix.zeros(x.shape, 'd')
+        for weight, solution in zip(self._extrapolationWeights[order],
+                                    reversed(history)):
+            guess += weight * solution
+
+        residual = numerix.L2norm(L * x - b)
+        extrapolatedResidual = numerix.L2norm(L * guess - b)
+        self._log.debug("initial residual: %s (order %d extrapolation) vs %s",
+                        extrapolatedResidual, order, residual)
+
+        if extrapolatedResidual < residual:
+            self._guess = "extrapolated"
+            return guess
+        else:
+            return x
+
     def _solve(self):
         raise NotImplementedError
 
+    def _solveMany(self, RHSvectors):
+        """Solve the stored matrix for several right hand sides
+
+        Suites that can't do better solve each right hand side in turn.
+
+        Parameters
+        ----------
+        RHSvectors : list of array_like
+            The right hand side vectors.
+
+        Returns
+        -------
+        list
+            A copy of the solution variable holding the solution for each
+            of `RHSvectors`.
+        """
+        var, RHSvector = self.var, self.RHSvector
+        solutions = []
+        for b in RHSvectors:
+            x = var.copy()
+            self._storeMatrix(var=x, matrix=self.matrix, RHSvector=b)
+            self._solve()
+            solutions.append(x)
+        self._storeMatrix(var=var, matrix=self.matrix, RHSvector=RHSvector)
+
+        return solutions
+
     def _solve_(self, L, x, b):
         raise NotImplementedError
 
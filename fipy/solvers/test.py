@@ -1,12 +1,28 @@
 from __future__ import unicode_literals
 __all__ = []
 
-from fipy.tests.lateImportTest import _LateImportTestSuite
+from fipy.tests.doctestPlus import _LateImportDocTestSuite
 import fipy.tests.testProgram
+from fipy.solvers import solver_suite
+
+if solver_suite == 'scipy':
+    docTestModuleNames = ('scipy.linearLUSolver',
+                          'scipy.linearFFTSolver',
+                          'scipy.linearMultigridSolver',
+                          'scipy.scipyKrylovSolver',
+                          'scipy.preconditioners.blockJacobiPreconditioner',
+                          'scipy.preconditioners.blockILUPreconditioner',
+                          'scipy.preconditioners.multigridPreconditioner',
+                          'scipy.preconditioners.jacobiPreconditioner',
+                          'scipy.preconditioners.iluPreconditioner',
+                          'scipy.preconditioners.ssorPreconditioner',
+                          'scipy.preconditioners.smoothedAggregationPreconditioner')
+else:
+    docTestModuleNames = ()
 
 def _suite():
-    return _LateImportTestSuite(testModuleNames = (),
-                                base = __name__)
+    return _LateImportDocTestSuite(docTestModuleNames=docTestModuleNames,
+                                   base=__name__)
 
 if __name__ == '__main__':
     fipy.tests.testProgram.main(defaultTest='_suite')
@@ -167,6 +167,76 @@ class _AbstractDiffusionTerm(_UnaryTerm):
 
             return None
 
+    def _stencilCouplings(self, var, coeff):
+        """Constant coupling along each axis of a uniform grid
+
+        When a scalar variable on a serial, uniform Cartesian grid has the
+        same coefficient on every interior face normal to a given axis, the
+        coefficient matrix is a fixed stencil that can be assembled directly
+        from the grid dimensions, without gathering the cells adjacent to
+        each face.
+
+        >>> from fipy import Grid2D, Grid3D, CylindricalGrid2D, CellVariable, DiffusionTerm
+        >>> from fipy.matrices.scipyMatrix import _ScipyMeshMatrix
+        >>> from fipy.tools import numerix
+        >>> for mesh in (Grid2D(nx=4, ny=3, dx=0.5, dy=2.),
+        ...              Grid3D(nx=3, ny=2, nz=4, dx=1., dy=0.5, dz=3.)):
+        ...     var = CellVariable(mesh=mesh)
+        ...     term = DiffusionTerm(coeff=3.)
+        ...     var, L, b = term._buildMatrix(var, _ScipyMeshMatrix)
+        ...     coeff = term.coeffDict['cell 1 diag']
+        ...     print(term._stencilCouplings(var, coeff))
+        ...     full = term._getCoefficientMatrixForTests(_ScipyMeshMatrix, var, coeff)
+        ...     generic = _ScipyMeshMatrix(mesh=mesh)
+        ...     interiorFaces = numerix.nonzero(mesh.interiorFaces)[0]
+        ...     id1, id2 = [numerix.take(ids, interiorFaces) for ids in mesh._adjacentCellIDs]
+        ...     generic.addAtFaces(numerix.take(coeff, interiorFaces), id1, id2, id1, id2)
+        ...     print(numerix.allclose(full.numpyArray, generic.numpyArray))
+        (-12.0, -0.75)
+        True
+        (-4.5, -18.0, -0.5)
+        True
+
+        Other meshes, or coefficients that vary, are not eligible
+
+        >>> mesh = CylindricalGrid2D(nx=4, ny=3)
+        >>> var = CellVariable(mesh=mesh)
+        >>> print(DiffusionTerm()._stencilCouplings(var, numerix.ones(mesh.numberOfFaces)))
+        None
+        >>> mesh = Grid2D(nx=4, ny=3)
+        >>> var = CellVariable(mesh=mesh)
+        >>> print(DiffusionTerm()._stencilCouplings(var, mesh.faceCenters[0]))
+        None
+        """
+        from fipy.meshes.uniformGrid1D import UniformGrid1D
+        from fipy.meshes.uniformGrid2D import UniformGrid2D
+        from fipy.meshes.uniformGrid3D import UniformGrid3D
+
+        mesh = var.mesh
+        if (type(mesh) not in (UniformGrid1D, UniformGrid2D, UniformGrid3D)
+            or var.rank != 0
+            or mesh.communicator.Nproc > 1
+            or numerix.shape(coeff) != (mesh.numberOfFaces,)):
+            return None
+
+        coeff = numerix.asarray(coeff)
+        if coeff.dtype.kind != 'f':
+            return None
+
+        interiorFaces = numerix.asarray(mesh.interiorFaces)
+        normals = mesh.faceNormals
+        couplings = []
+        for axis in range(mesh.dim):
+            values = coeff[interiorFaces & (abs(normals[axis]) > 0.5)]
+            if len(values) == 0:
+                couplings.append(0.)
+            elif values.min() != values.max():
+                return None
+            else:
+                couplings.append(float(values[0]))
+
+        return tuple(couplings)
+
     def _getCoefficientMatrixForTests(self, SparseMatrix, var, coeff):
         """
         This method was introduced because `__getCoefficientMatrix` is private, but
@@ -177,6 +247,12 @@ class _AbstractDiffusionTerm(_UnaryTerm):
     def __getCoefficientMatrix(self, SparseMatrix, var, coeff):
         mesh = var.mesh
 
+        couplings = self._stencilCouplings(var, coeff)
+        if couplings is not None:
+            coefficientMatrix = SparseMatrix(mesh=mesh, nonZerosPerRow=2 * mesh.dim + 1)
+            coefficientMatrix.addAtStencil(mesh.shape, couplings)
+            return coefficientMatrix
+
         id1, id2 = mesh._adjacentCellIDs
         interiorFaces = numerix.nonzero(mesh.interiorFaces)[0]
 
@@ -192,10 +268,11 @@ class _AbstractDiffusionTerm(_UnaryTerm):
         facesPerCell = mesh._facesPerCell[..., mesh._localNonOverlappingCellIDs]
         coefficientMatrix = SparseMatrix(mesh=mesh, nonZerosPerRow=facesPerCell + 1)
         interiorCoeff = numerix.take(coeff, interiorFaces, axis=-1).ravel()
-        coefficientMatrix.addAt(interiorCoeff, id1.ravel(), id1.swapaxes(0, 1).ravel())
-        coefficientMatrix.addAt(-interiorCoeff, id1.ravel(), id2.swapaxes(0, 1).ravel())
-        coefficientMatrix.addAt(-interiorCoeff, id2.ravel(), id1.swapaxes(0, 1).ravel())
-        coefficientMatrix.addAt(interiorCoeff, id2.ravel(), id2.swapaxes(0, 1).ravel())
+
+        coefficientMatrix.addAtFaces(interiorCoeff,
+                                     rows1=id1.ravel(), rows2=id2.ravel(),
+                                     cols1=id1.swapaxes(0, 1).ravel(),
+                                     cols2=id2.swapaxes(0, 1).ravel())
 
 ##         print 'coefficientMatrix',coefficientMatrix
 ##         raw_input('stopped')
@@ -423,6 +500,22 @@ class _AbstractDiffusionTerm(_UnaryTerm):
 
         return (var, L, b)
 
+    def _buildInputs(self, var):
+        if (self.order != 2
+            or not hasattr(self, 'coeffDict')
+            or not hasattr(self, 'constraintB')):
+            return None
+
+        inputs = [self.coeffDict['cell 1 diag'], self.constraintL]
+        if hasattr(self, 'anisotropySource'):
+            inputs.append(self.anisotropySource)
+
+        # `constraintB` only depends on `var` at its constrained faces
+        for constraint in list(getattr(var, 'faceConstraints', [])) + var.faceGrad.constraints:
+            inputs += [constraint, constraint.value, constraint.where]
+
+        return inputs
+
     def _getDiffusionGeomCoeff(self, var):
         if var is self.var or self.var is None:
             return self._getGeomCoeff(var)
@@ -87,6 +87,14 @@ class CellTerm(_NonDiffusionTerm):
 
         return self.coeffVectors
 
+    def _buildInputs(self, var):
+        if self.coeffVectors is None or var is not self._var:
+            return None
+        inputs = list(self.coeffVectors.values())
+        if self._dependsOnOld:
+            inputs.append(var.old)
+        return inputs
+
     def _buildMatrixInline_(self, L, oldArray, b, dt, coeffVectors):
         oldArray = oldArray.value.ravel()
         N = len(oldArray)
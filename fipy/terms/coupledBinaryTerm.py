@@ -62,10 +62,17 @@ class _CoupledBinaryTerm(_AbstractBinaryTerm):
 
         """
 
-        from fipy.matrices.offsetSparseMatrix import OffsetSparseMatrix
-        SparseMatrix =  OffsetSparseMatrix(SparseMatrix=SparseMatrix,
-                                           numberOfVariables=len(self._vars),
-                                           numberOfEquations=len(self._uncoupledTerms))
+        if (getattr(SparseMatrix, "_blockAssembly", False)
+            and not getattr(SparseMatrix, "_deferred", False)):
+            # fill each equation/variable block in place
+            from fipy.matrices.blockSparseMatrix import BlockSparseMatrix
+            SparseMatrix = BlockSparseMatrix(SparseMatrix=SparseMatrix,
+                                             numberOfVariables=len(self._vars),
+                                             numberOfEquations=len(self._uncoupledTerms))
+        else:
+            SparseMatrix =  OffsetSparseMatrix(SparseMatrix=SparseMatrix,
+                                               numberOfVariables=len(self._vars),
+                                               numberOfEquations=len(self._uncoupledTerms))
         matrix = SparseMatrix(mesh=var.mesh)
         RHSvectors = []
 
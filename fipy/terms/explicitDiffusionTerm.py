@@ -22,6 +22,8 @@ class ExplicitDiffusionTerm(_AbstractDiffusionTerm):
 
     """
 
+    _dependsOnDt = True
+
     def _buildMatrix(self, var, SparseMatrix, boundaryConditions = (), dt=None, transientGeomCoeff=None, diffusionGeomCoeff=None):
         if hasattr(var, 'old'):
             varOld = var.old
@@ -33,6 +35,13 @@ class ExplicitDiffusionTerm(_AbstractDiffusionTerm):
 
         return (var, SparseMatrix(mesh=var.mesh), b - L * var.value)
 
+    def _buildInputs(self, var):
+        varOld = getattr(var, 'old', var)
+        inputs = _AbstractDiffusionTerm._buildInputs(self, varOld)
+        if inputs is None:
+            return None
+        return inputs + [var, varOld]
+
     def _getNormals(self, mesh):
         return mesh._faceCellToCellNormals
 
@@ -23,6 +23,8 @@ class ExplicitUpwindConvectionTerm(_AbstractUpwindConvectionTerm):
     For further details see :ref:`sec:NumericalSchemes`.
     """
 
+    _dependsOnDt = True
+
     def _getOldAdjacentValues(self, oldArray, id1, id2, dt):
         if dt is None:
             raise TransientTermError
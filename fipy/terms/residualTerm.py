@@ -26,6 +26,10 @@ class ResidualTerm(_ExplicitSourceTerm):
     def _getGeomCoeff(self, var):
         return self.coeff
 
+    def _buildInputs(self, var):
+        # the residual of `equation` is recalculated every time
+        return None
+
     def _buildMatrix(self, var, SparseMatrix, boundaryConditions=(), dt=None, transientGeomCoeff=None, diffusionGeomCoeff=None):
         vec = self.equation.justResidualVector(var=None,
                                                boundaryConditions=boundaryConditions,
@@ -1,10 +1,12 @@
 from __future__ import division
 from __future__ import unicode_literals
 from builtins import object
+from builtins import zip
 __docformat__ = 'restructuredtext'
 
 import logging
 import os
+import weakref
 
 from fipy import input
 from fipy.tools import numerix
@@ -64,6 +66,70 @@ class Term(object):
     def _checkVar(self, var):
         raise NotImplementedError
 
+    # number of times previously built contributions were reused
+    _reuses = 0
+
+    # whether the contributions depend on the time step or on the old
+    # value of the solution variable
+    _dependsOnDt = False
+    _dependsOnOld = False
+
+    def _buildInputs(self, var):
+        """Objects on which the contributions built for `var` depend
+
+        `Variable` objects are compared by their `version`, anything else
+        by identity.  `None` means that the contributions must be rebuilt
+        every time.
+        """
+        return None
+
+    def _buildSignature(self, var, SparseMatrix, boundaryConditions=(), dt=None, transientGeomCoeff=None, diffusionGeomCoeff=None, buildExplicitIfOther=False):
+        """Stamp of everything the contributions built for `var` depend on,
+        or `None` if they cannot be reused"""
+        return None
+
+    def _buildAndAddMatricesIfChanged(self, var, SparseMatrix, boundaryConditions=(), dt=None, transientGeomCoeff=None, diffusionGeomCoeff=None, buildExplicitIfOther=False):
+        """Build matrices, unless nothing they depend on has changed since
+        they were last built for `var`
+
+        Called by `_BinaryTerm` for each of its constituent `Term` objects.
+        The returned matrix and vector must not be modified.
+        """
+        builds = self.__dict__.setdefault("_builds", {})
+
+        previous = builds.get(id(var))
+        if previous is not None and previous[0]() is var:
+            signature = self._buildSignature(var, SparseMatrix,
+                                             boundaryConditions=boundaryConditions,
+                                             dt=dt,
+                                             transientGeomCoeff=transientGeomCoeff,
+                                             diffusionGeomCoeff=diffusionGeomCoeff,
+                                             buildExplicitIfOther=buildExplicitIfOther)
+            if signature is not None and signature == previous[1]:
+                self._reuses += 1
+                return previous[2]
+
+        built = self._buildAndAddMatrices(var,
+                                          SparseMatrix,
+                                          boundaryConditions=boundaryConditions,
+                                          dt=dt,
+                                          transientGeomCoeff=transientGeomCoeff,
+                                          diffusionGeomCoeff=diffusionGeomCoeff,
+                                          buildExplicitIfOther=buildExplicitIfOther)
+
+        signature = self._buildSignature(var, SparseMatrix,
+                                         boundaryConditions=boundaryConditions,
+                                         dt=dt,
+                                         transientGeomCoeff=transientGeomCoeff,
+                                         diffusionGeomCoeff=diffusionGeomCoeff,
+                                         buildExplicitIfOther=buildExplicitIfOther)
+        if signature is None:
+            builds.pop(id(var), None)
+        else:
+            builds[id(var)] = (weakref.ref(var), signature, built)
+
+        return built
+
     def _buildCache(self, matrix, RHSvector):
         if self._cacheMatrix:
             self._matrix = matrix
@@ -99,13 +165,16 @@ class Term(object):
             return var.shape[0]
 
     def _getMatrixClass(self, solver, var):
+        from fipy.matrices import deferredSparseMatrix
+        SparseMatrix = solver._matrixClass
+        if deferredSparseMatrix.deferredAssembly:
+            SparseMatrix = deferredSparseMatrix.DeferredSparseMatrix(SparseMatrix)
+
         if self._vectorSize(var) > 1:
             from fipy.matrices.offsetSparseMatrix import OffsetSparseMatrix
-            SparseMatrix =  OffsetSparseMatrix(SparseMatrix=solver._matrixClass,
+            SparseMatrix =  OffsetSparseMatrix(SparseMatrix=SparseMatrix,
                                                numberOfVariables=self._vectorSize(var),
                                                numberOfEquations=self._vectorSize(var))
-        else:
-            SparseMatrix = solver._matrixClass
 
         return SparseMatrix
 
@@ -195,6 +264,76 @@ class Term(object):
 
         self._log.debug("END solve - {} ns".format(t.elapsed))
 
+    def solveMany(self, var=None, sources=(), solver=None, boundaryConditions=(), dt=None):
+        r"""
+        Builds the `Term`'s linear system once and solves it for several
+        sources.  The solution for each `source` is that of
+        ``self == source``, but the matrix is only assembled, and, where
+        the solver supports it, factored or preconditioned, once.
+
+        >>> from fipy import *
+        >>> m = Grid1D(nx=10)
+        >>> v = CellVariable(mesh=m)
+        >>> v.constrain(0., m.exteriorFaces)
+        >>> sources = [1., m.x, -m.x**2]
+        >>> solutions = DiffusionTerm().solveMany(var=v, sources=sources)
+        >>> for source, solution in zip(sources, solutions):
+        ...     (DiffusionTerm() == source).solve(var=v)
+        ...     print(numerix.allclose(solution, v))
+        True
+        True
+        True
+
+        Parameters
+        ----------
+        var : ~fipy.variables.cellVariable.CellVariable
+            `Variable` to be solved for.  Provides the initial condition
+            and the old value.  It is not changed.
+        sources : list
+            Explicit sources, each a `float` or a value for every cell of
+            `var`.  For coupled equations, each source is a list with a
+            source for each equation.
+        solver : ~fipy.solvers.solver.Solver
+            Iterative solver to be used to solve the linear system of
+            equations.  The default sovler depends on the solver package
+            selected.
+        boundaryConditions : :obj:`tuple` of :obj:`~fipy.boundaryConditions.boundaryCondition.BoundaryCondition`
+        dt : float
+            Timestep size.
+
+        Returns
+        -------
+        list
+            A copy of `var` holding the solution for each of `sources`
+            (a list of copies of the variables, for coupled equations).
+        """
+
+        self._log.debug("BEGIN solveMany")
+
+        with Timer() as t:
+            solver = self._prepareLinearSystem(var, solver, boundaryConditions, dt)
+
+            RHSvector = numerix.array(solver.RHSvector).ravel()
+            RHSvectors = [RHSvector + self._sourceVector(solver.var, source)
+                          for source in sources]
+
+            solutions = solver._solveMany(RHSvectors)
+
+        self._log.debug("END solveMany - {} ns".format(t.elapsed))
+
+        return [getattr(solution, "vars", solution) for solution in solutions]
+
+    @staticmethod
+    def _sourceVector(var, source):
+        """Contribution of an explicit `source` to the right hand side vector"""
+        if hasattr(var, "vars"):
+            return numerix.concatenate([Term._sourceVector(v, s)
+                                        for v, s in zip(var.vars, source)])
+        else:
+            volumes = numerix.array(var.mesh.cellVolumes)
+            source = numerix.array(source) * numerix.ones(var.shape)
+            return numerix.ravel(source * volumes)
+
     def sweep(self, var=None, solver=None, boundaryConditions=(), dt=None, underRelaxation=None, residualFn=None, cacheResidual=False, cacheError=False):
         r"""
         Builds and solves the `Term`'s linear system once. This method
@@ -72,6 +72,9 @@ class TransientTerm(CellTerm):
     1
     """
 
+    _dependsOnDt = True
+    _dependsOnOld = True
+
     def _getWeight(self, var, transientGeomCoeff=None, diffusionGeomCoeff=None):
         return {
             'b vector':  0,
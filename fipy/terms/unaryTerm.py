@@ -3,6 +3,7 @@ __docformat__ = 'restructuredtext'
 
 __all__ = []
 
+import hashlib
 import os
 
 from fipy import input
@@ -86,6 +87,108 @@ class _UnaryTerm(Term):
 
         return (var, matrix, RHSvector)
 
+    @staticmethod
+    def _stamps(inputs):
+        from fipy.variables.variable import Variable
+        return tuple((id(obj), obj.version) if isinstance(obj, Variable) else id(obj)
+                     for obj in inputs)
+
+    @staticmethod
+    def _valueStamp(value):
+        """Digest of the numerical value of `value`, or of each of its
+        elements if it is a list
+
+        The geometric coefficients of an equation are recombined every
+        time it is built, so they are compared by value rather than by
+        `version`.
+        """
+        from fipy.variables.variable import Variable
+        if value is None:
+            return None
+        elif isinstance(value, (list, tuple)):
+            return tuple(_UnaryTerm._valueStamp(element) for element in value)
+        elif isinstance(value, Variable):
+            value = value.numericValue
+        value = numerix.ascontiguousarray(value)
+        return (value.shape, value.dtype.str, hashlib.sha1(value.tobytes()).hexdigest())
+
+    def _buildSignature(self, var, SparseMatrix, boundaryConditions=(), dt=None, transientGeomCoeff=None, diffusionGeomCoeff=None, buildExplicitIfOther=False):
+        """
+        The contributions are stamped with the `version` of each of their
+        inputs, with the mesh geometry, with the geometric coefficients of
+        the equation, with the kind of matrix and, if they depend on it,
+        with `dt`
+
+        >>> from fipy import *
+        >>> m = Grid1D(nx=3)
+        >>> v = CellVariable(mesh=m, value=1., hasOld=True)
+        >>> D = Variable(value=1.)
+        >>> transient = TransientTerm(var=v)
+        >>> diffusion = DiffusionTerm(coeff=D, var=v)
+        >>> eq = transient + diffusion
+        >>> SparseMatrix = DefaultSolver()._matrixClass
+        >>> def stamp(term, dt=1.):
+        ...     return term._buildSignature(v, SparseMatrix, dt=dt)
+        >>> print(stamp(diffusion))
+        None
+        >>> _ = eq._buildAndAddMatrices(var=v, SparseMatrix=SparseMatrix, dt=1.)
+        >>> print(stamp(diffusion) is None, stamp(transient) == stamp(transient, dt=2.))
+        False False
+
+        Only the transient contributions depend on the time step
+
+        >>> print(stamp(diffusion) == stamp(diffusion, dt=2.))
+        True
+
+        Solving for `v` changes neither
+
+        >>> signatures = stamp(transient), stamp(diffusion)
+        >>> v.setValue((1., 2., 3.))
+        >>> print(signatures == (stamp(transient), stamp(diffusion)))
+        True
+
+        but a new old value changes the transient contributions and a new
+        coefficient changes the diffusion contributions
+
+        >>> v.updateOld()
+        >>> print(stamp(transient) == signatures[0], stamp(diffusion) == signatures[1])
+        False True
+        >>> D.value = 2.
+        >>> print(stamp(diffusion) == signatures[1])
+        False
+        """
+        if len(boundaryConditions) > 0:
+            return None
+
+        if var is self.var or self.var is None:
+            inputs = self._buildInputs(var)
+        elif buildExplicitIfOther:
+            inputs = self._buildInputs(self.var)
+            if inputs is not None:
+                inputs = list(inputs) + [self.var]
+        else:
+            inputs = None
+
+        if inputs is None:
+            return None
+
+        if not self._dependsOnDt:
+            dt = None
+        elif dt is not None:
+            try:
+                dt = float(dt)
+            except TypeError:
+                return None
+
+        return (dt,
+                self._valueStamp(transientGeomCoeff),
+                self._valueStamp(diffusionGeomCoeff),
+                tuple(cls.__name__ for cls in getattr(SparseMatrix, "__mro__", ())),
+                getattr(SparseMatrix, "equationIndex", None),
+                getattr(SparseMatrix, "varIndex", None),
+                id(var.mesh), var.mesh._version,
+                self._stamps(inputs))
+
     def _reshapeIDs(self, var, ids):
         shape = (self._vectorSize(var), self._vectorSize(var), ids.shape[-1])
         ids = numerix.resize(ids, shape)
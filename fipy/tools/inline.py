@@ -9,9 +9,37 @@ import os
 import sys
 
 if '--inline' in [s.lower() for s in sys.argv[1:]]:
-    doInline = True
+    _requestInline = True
 else:
-    doInline = 'FIPY_INLINE' in os.environ
+    _requestInline = 'FIPY_INLINE' in os.environ
+
+# weave cannot be installed on Python 3, so expressions are compiled with
+# Numba unless another backend is explicitly requested
+inlineBackend = os.environ.get('FIPY_INLINE_BACKEND', 'numba').lower()
+
+if inlineBackend not in ('numba', 'numexpr', 'weave'):
+    raise ImportError("Unknown inline backend %s" % inlineBackend)
+
+#: hand-written C kernels and expressions are compiled with :mod:`weave`
+doInline = _requestInline and inlineBackend == 'weave'
+#: expressions of `Variable` objects are compiled with :mod:`numba`
+doNumba = _requestInline and inlineBackend == 'numba'
+
+#: expressions of `Variable` objects are evaluated with :mod:`numexpr`
+doNumexpr = _requestInline and inlineBackend == 'numexpr'
+
+if doNumba:
+    try:
+        import numba
+    except ImportError:
+        # evaluate with NumPy, as if inlining had not been requested
+        doNumba = False
+
+if doNumexpr:
+    try:
+        import numexpr
+    except ImportError:
+        doNumexpr = False
 
 _inlineFrameComment = 'FIPY_INLINE_COMMENT' in os.environ
 
@@ -185,3 +213,133 @@ static int arrayIndex(PyArrayObject* array, int i, int vec[])
     return index / array->descr->elsize;
 }
                  """)
+
+class _NumbaInlineError(Exception):
+    """An expression that Numba cannot compile or evaluate"""
+    pass
+
+# Python names for the functions that appear in the C representation of
+# `Variable` expressions
+_numbaFunctionNames = {
+    'asin': 'arcsin', 'acos': 'arccos', 'atan': 'arctan', 'atan2': 'arctan2',
+    'asinh': 'arcsinh', 'acosh': 'arccosh', 'atanh': 'arctanh',
+    'fabs': 'absolute', 'pow': 'power'
+}
+
+_numbaFunctions = ('sqrt', 'exp', 'log', 'log10', 'sin', 'cos', 'tan',
+                   'arcsin', 'arccos', 'arctan', 'arctan2',
+                   'sinh', 'cosh', 'tanh', 'arcsinh', 'arccosh', 'arctanh',
+                   'absolute', 'power', 'floor', 'ceil', 'conjugate',
+                   'maximum', 'minimum', 'fmod', 'hypot')
+
+_numbaKernels = {}
+
+def _numbaKernel(code, argNames, dimensions):
+    """Compile a loop over the elements of `result` that evaluates `code`
+
+    Kernels are cached by the expression, which identifies the structure of
+    the `Variable` tree, and Numba specializes each for the types and
+    dimensions of its arguments.
+    """
+    key = (code, argNames, dimensions)
+    if key not in _numbaKernels:
+        import numba
+        import numpy
+
+        namespace = dict((name, getattr(numpy, name)) for name in _numbaFunctions)
+        for alias, name in _numbaFunctionNames.items():
+            namespace[alias] = getattr(numpy, name)
+
+        dimList = ['i', 'j', 'k']
+        loops = ""
+        for dim in reversed(range(dimensions)):
+            d = dimList[dim]
+            loops += "    " * (dimensions - dim) + "for %s in range(n%s):\n" % (d, d)
+
+        source = "def _kernel(%s):\n%s%s%s\n" % (", ".join(argNames),
+                                                loops,
+                                                "    " * (dimensions + 1),
+                                                code)
+        try:
+            exec(source, namespace)
+            _numbaKernels[key] = numba.njit(cache=False, nogil=True)(namespace['_kernel'])
+        except Exception:
+            # not valid Python
+            _numbaKernels[key] = None
+
+    if _numbaKernels[key] is None:
+        raise _NumbaInlineError("previously failed to compile %s" % code)
+
+    return _numbaKernels[key]
+
+def _runNumbaInline(code_in, **args):
+    """Evaluate the C representation of a `Variable` expression with Numba
+
+    Counterpart of `_runInline()`.  Arrays are flattened, consistent with
+    the flat indices of the C representation.
+
+    Raises
+    ------
+    _NumbaInlineError
+        If Numba fails to compile or run the expression.
+    """
+    if 'ni' in args:
+        dimensions = 1
+        if 'nj' in args:
+            dimensions = 2
+            if 'nk' in args:
+                dimensions = 3
+    else:
+        dimensions = 0
+
+    for key in list(args.keys()):
+        if hasattr(args[key], 'ravel') and key != 'result':
+            if args[key].shape == ():
+                args[key] = args[key][()]
+            else:
+                args[key] = args[key].ravel()
+
+    result = args['result']
+    args['result'] = result.reshape((-1,))
+
+    argNames = tuple(sorted(args.keys()))
+
+    kernel = _numbaKernel(code_in, argNames, dimensions)
+    try:
+        kernel(*[args[name] for name in argNames])
+    except Exception as e:
+        _numbaKernels[(code_in, argNames, dimensions)] = None
+        raise _NumbaInlineError(str(e))
+
+    import numpy
+    if not numpy.may_share_memory(args['result'], result):
+        # `reshape` had to copy a non-contiguous result
+        result[...] = args['result'].reshape(result.shape)
+
+class _NumexprInlineError(Exception):
+    """An expression that numexpr cannot evaluate"""
+    pass
+
+def _runNumexpr(expression, **args):
+    """Evaluate the numexpr representation of a `Variable` expression
+
+    numexpr compiles `expression` once and evaluates it in blocks, with
+    its own threads, so none of the intermediate values of the
+    expression occupy a complete array.
+
+    Raises
+    ------
+    _NumexprInlineError
+        If numexpr fails to evaluate the expression.
+    """
+    import numexpr
+    import numpy
+
+    for key, value in args.items():
+        if numpy.ma.isMaskedArray(value):
+            raise _NumexprInlineError("%s is masked" % key)
+
+    try:
+        return numexpr.evaluate(expression, local_dict=args)
+    except Exception as e:
+        raise _NumexprInlineError(str(e))
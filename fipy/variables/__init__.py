@@ -3,6 +3,9 @@
 __docformat__ = 'restructuredtext'
 
 from fipy.variables.variable import *
+from fipy.variables.cacheManager import *
+from fipy.variables.dependencyGraph import *
+from fipy.variables.operandExecutor import *
 from fipy.variables.cellVariable import *
 from fipy.variables.faceVariable import *
 from fipy.variables.scharfetterGummelFaceVariable import *
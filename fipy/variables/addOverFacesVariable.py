@@ -17,6 +17,8 @@ class _AddOverFacesVariable(CellVariable):
         volume-weighted sum
     """
 
+    _evictable = True
+
     def __init__(self, faceVariable, mesh = None):
         if not mesh:
             mesh = faceVariable.mesh
@@ -67,14 +69,5 @@ class _AddOverFacesVariable(CellVariable):
         return self._makeValue(value = val)
 
     def _calcValueNoInline(self):
-        ids = self.mesh.cellFaceIDs
-
-        contributions = numerix.take(self.faceVariable, ids, axis=-1)
-
-        # FIXME: numerix.MA.filled casts away dimensions
-        s = (numerix.newaxis,) * (len(contributions.shape) - 2) + (slice(0, None, None),) + (slice(0, None, None),)
-
-        faceContributions = contributions * self.mesh._cellToFaceOrientations[s]
-
-        return numerix.tensordot(numerix.ones(faceContributions.shape[-2], 'd'),
-                                 numerix.MA.filled(faceContributions, 0.), (0, -2)) / self.mesh.cellVolumes
+        return (self.mesh._sumOverCellFaces(self.faceVariable.numericValue)
+                / self.mesh.cellVolumes)
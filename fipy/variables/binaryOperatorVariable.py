@@ -39,13 +39,18 @@ def _BinaryOperatorVariable(operatorClass=None):
         def _calcValue_(self):
             from fipy.variables.variable import Variable
             if isinstance(self.var[1], Variable):
-                val1 = self.var[1].value
+                if self._executor._pool is None:
+                    val0 = self.var[0].value
+                    val1 = self.var[1].value
+                else:
+                    val0, val1 = self._executor._values(self.var, result=self)
             else:
                 if isinstance(self.var[1], type('')):
                     self.var[1] = physicalField.PhysicalField(value=self.var[1])
+                val0 = self.var[0].value
                 val1 = self.var[1]
 
-            value = self.op(self.var[0].value, val1)
+            value = self.op(val0, val1)
             if self.return_scalar:
                 value = value[()]
 
@@ -0,0 +1,216 @@
+"""Memory budget for the cached values of intermediate `Variable` objects
+
+Derived quantities, like `faceGrad`, `harmonicFaceValue` or shared
+subexpressions, retain their value once it has been calculated.  When the
+:data:`variableCache` is given a budget, in bytes, it tracks these values and
+releases the least recently used ones when their total exceeds the budget.
+A released value is recalculated the next time it is needed.  Only values
+that are pure functions of other variables are released; the values of
+solution variables, or of random noise, are never touched.
+
+The budget is taken from the :envvar:`FIPY_CACHE_BUDGET` environment
+variable or the `--cache-budget` command line flag, or it can be set with
+
+>>> variableCache.budget = 2**30 # doctest: +SKIP
+"""
+from __future__ import division
+from __future__ import unicode_literals
+from builtins import object
+__docformat__ = 'restructuredtext'
+
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+from fipy.tools import numerix
+from fipy.tools import parser
+
+__all__ = ["CacheManager", "variableCache"]
+from future.utils import text_to_native_str
+__all__ = [text_to_native_str(n) for n in __all__]
+
+class CacheManager(object):
+    """Least-recently-used eviction of cached `Variable` values
+
+    >>> from fipy import Grid1D, CellVariable
+    >>> manager = CacheManager(budget=0)
+    >>> from fipy.variables.variable import Variable
+    >>> Variable._cacheManager, saved = manager, Variable._cacheManager
+
+    >>> mesh = Grid1D(nx=100)
+    >>> var = CellVariable(mesh=mesh, value=mesh.x**2)
+    >>> faceValue = var.harmonicFaceValue
+    >>> grad = var.faceGrad
+    >>> expected = faceValue.value.copy()
+
+    Each newly calculated value pushes older ones out of a budget that
+    only has room for one face array
+
+    >>> manager.budget = expected.nbytes
+    >>> print(grad.value.nbytes == manager.bytes)
+    True
+    >>> print(manager.statistics["evictions"] > 0)
+    True
+    >>> print(faceValue._evicted)
+    True
+
+    but they are recalculated when needed, which counts as a miss
+
+    >>> print(numerix.allclose(faceValue, expected))
+    True
+    >>> print(manager.statistics["misses"])
+    1
+    >>> print(grad._evicted)
+    True
+
+    whereas repeated requests for a resident value are hits
+
+    >>> manager.resetStatistics()
+    >>> print(numerix.allclose(faceValue.value, faceValue.value))
+    True
+    >>> print(manager.statistics["hits"], manager.statistics["misses"])
+    2 0
+
+    Lifting the budget stops the tracking
+
+    >>> manager.budget = None
+    >>> print(manager.bytes)
+    0
+
+    >>> Variable._cacheManager = saved
+    """
+
+    def __init__(self, budget=None):
+        """
+        Parameters
+        ----------
+        budget : int, optional
+            Maximum number of bytes held by the values of evictable
+            variables.  `None` places no limit and tracks nothing.
+        """
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.bytes = 0
+        self._budget = None
+        self.budget = budget
+        self.resetStatistics()
+
+    def _getBudget(self):
+        return self._budget
+
+    def _setBudget(self, budget):
+        with self._lock:
+            self._budget = budget
+            if budget is None:
+                self._entries.clear()
+                self.bytes = 0
+            else:
+                self._enforce()
+
+    budget = property(_getBudget, _setBudget)
+
+    @property
+    def statistics(self):
+        """Counts of `hits`, `misses` and `evictions`, with the current and
+        `peakBytes` and the number of resident `entries`
+
+        A miss is a request for an up to date value that had been released
+        and so had to be recalculated.
+        """
+        return dict(hits=self._hits,
+                    misses=self._misses,
+                    evictions=self._evictions,
+                    bytes=self.bytes,
+                    peakBytes=self._peakBytes,
+                    entries=len(self._entries))
+
+    def resetStatistics(self):
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._peakBytes = self.bytes
+
+    def clear(self):
+        """Release all tracked values"""
+        with self._lock:
+            while self._entries:
+                self._evictOldest()
+
+    def _touch(self, var):
+        """Record a use of the cached value of `var`"""
+        if self._budget is not None:
+            with self._lock:
+                key = id(var)
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+
+    def _miss(self):
+        """Record that a released value had to be recalculated"""
+        if self._budget is not None:
+            with self._lock:
+                self._misses += 1
+
+    def _store(self, var):
+        """Track the newly calculated value of `var`"""
+        if self._budget is not None:
+            with self._lock:
+                self._store_(var)
+
+    def _store_(self, var):
+        key = id(var)
+        self._forget(key)
+
+        value = var._value
+        if type(value) is not type(numerix.array(1)):
+            # masked arrays and `PhysicalField` values stay resident
+            return
+
+        def _release(ref, key=key, manager=weakref.ref(self)):
+            manager = manager()
+            if manager is not None:
+                with manager._lock:
+                    if manager._entries.get(key, (None,))[0] is ref:
+                        manager._forget(key)
+
+        self._entries[key] = (weakref.ref(var, _release), value.nbytes)
+        self.bytes += value.nbytes
+        self._peakBytes = max(self._peakBytes, self.bytes)
+
+        while self.bytes > self._budget and len(self._entries) > 1:
+            self._evictOldest()
+
+    def _forget(self, key):
+        if key in self._entries:
+            ref, nbytes = self._entries.pop(key)
+            self.bytes -= nbytes
+
+    def _evictOldest(self):
+        key, (ref, nbytes) = self._entries.popitem(last=False)
+        self.bytes -= nbytes
+        var = ref()
+        if var is not None:
+            var._evict()
+            self._evictions += 1
+
+    def _enforce(self):
+        while self.bytes > self._budget and self._entries:
+            self._evictOldest()
+
+def _parseBudget():
+    budget = parser.parse("--cache-budget", action="store", type="float")
+    if budget is None and "FIPY_CACHE_BUDGET" in os.environ:
+        budget = float(os.environ["FIPY_CACHE_BUDGET"])
+    if budget is not None:
+        budget = int(budget)
+    return budget
+
+variableCache = CacheManager(budget=_parseBudget())
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
@@ -0,0 +1,210 @@
+"""Iterative evaluation of the graph of `Variable` dependencies
+
+Each :class:`~fipy.variables.variable.Variable` records the variables it
+`requiredVariables` and those that subscribe to it.  Evaluating a variable
+normally pulls the values of its inputs recursively, so a long chain of
+derived variables can exceed Python's recursion limit, and a subexpression
+shared by several outputs is visited once per output.  A
+:class:`DependencyGraph` instead orders the graph topologically and
+evaluates each stale variable exactly once, inputs first, without
+recursion.  Variables fall back on it automatically when their evaluation
+is nested too deeply.
+"""
+from __future__ import unicode_literals
+from builtins import object
+__docformat__ = 'restructuredtext'
+
+import threading
+from contextlib import contextmanager
+
+__all__ = ["DependencyGraph"]
+from future.utils import text_to_native_str
+__all__ = [text_to_native_str(n) for n in __all__]
+
+# nesting of `Variable._getValue` in the current thread
+_evaluation = threading.local()
+
+def _evaluationDepth():
+    return getattr(_evaluation, "depth", 0)
+
+def _setEvaluationDepth(depth):
+    _evaluation.depth = depth
+
+class DependencyGraph(object):
+    """Directed acyclic graph of the variables that `outputs` depend on
+
+    >>> from fipy.variables.variable import Variable
+    >>> a = Variable(value=2.)
+    >>> b = Variable(value=3.)
+    >>> shared = a * b
+    >>> c = shared + 1
+    >>> d = shared - a
+    >>> graph = DependencyGraph([c, d])
+    >>> a.value = 5.
+
+    Every variable comes after all of its inputs, and shared nodes appear
+    only once
+
+    >>> order = graph.nodes
+    >>> print(len(order))
+    6
+    >>> position = dict((id(var), i) for i, var in enumerate(order))
+    >>> print(all(position[id(var)] < position[id(node)]
+    ...           for node in order for var in node.requiredVariables))
+    True
+
+    Variables that do not depend on each other can be evaluated together
+
+    >>> print([len(level) for level in graph.levels])
+    [1, 2]
+
+    >>> print([float(value) for value in graph.refresh()])
+    [16.0, 10.0]
+    >>> print(bool(shared.stale))
+    False
+
+    Chains deeper than the recursion limit allows are evaluated iteratively
+
+    >>> x = Variable(value=1.)
+    >>> y = x
+    >>> for i in range(400):
+    ...     y = y + 1
+    >>> print(y.value)
+    401.0
+    >>> x.value = 2.
+    >>> print(y.value)
+    402.0
+    """
+
+    def __init__(self, outputs):
+        """
+        Parameters
+        ----------
+        outputs : list of ~fipy.variables.variable.Variable
+            The variables to be evaluated.
+        """
+        self.outputs = list(outputs)
+
+    @staticmethod
+    def _needsCalculation(var):
+        return (len(var.requiredVariables) > 0
+                and (var.stale
+                     or not var._isCached()
+                     or var._value is None
+                     or var._evicted))
+
+    def _order(self, descend):
+        """Depth-first postorder of the variables, without recursion"""
+        order = []
+        visited = set()
+        for output in self.outputs:
+            if id(output) in visited:
+                continue
+            visited.add(id(output))
+            stack = [(output, iter(output.requiredVariables if descend(output) else ()))]
+            while stack:
+                node, inputs = stack[-1]
+                for var in inputs:
+                    if id(var) not in visited:
+                        visited.add(id(var))
+                        stack.append((var, iter(var.requiredVariables if descend(var) else ())))
+                        break
+                else:
+                    stack.pop()
+                    order.append(node)
+        return order
+
+    @property
+    def nodes(self):
+        """All variables in the graph, in evaluation order"""
+        return self._order(descend=lambda var: True)
+
+    @property
+    def staleNodes(self):
+        """The variables that must be recalculated, in evaluation order"""
+        return [var for var in self._order(descend=self._needsCalculation)
+                if self._needsCalculation(var)]
+
+    @staticmethod
+    def _levels(nodes):
+        level = dict((id(var), 0) for var in nodes)
+        levels = []
+        for var in nodes:
+            n = max([level.get(id(required), -1) + 1
+                     for required in var.requiredVariables] + [0])
+            level[id(var)] = n
+            if n == len(levels):
+                levels.append([])
+            levels[n].append(var)
+        return levels
+
+    @property
+    def levels(self):
+        """The stale variables, grouped so that those in each group depend
+        only on those in earlier groups"""
+        return self._levels(self.staleNodes)
+
+    @contextmanager
+    def _refreshed(self, executor=None):
+        """Bring every stale variable up to date, holding the values of
+        uncached ones until the context exits"""
+        nodes = self.staleNodes
+        held = [var for var in nodes if not var._isCached()]
+        for var in held:
+            var._cacheAlways = True
+
+        depth = _evaluationDepth()
+        _setEvaluationDepth(0)
+        try:
+            if executor is None:
+                for var in nodes:
+                    var._getValue()
+            else:
+                for level in self._levels(nodes):
+                    list(executor.map(lambda var: var._getValue(), level))
+            yield
+        finally:
+            _setEvaluationDepth(depth)
+            for var in held:
+                del var._cacheAlways
+                var._value = None
+
+    @contextmanager
+    def _unitsResolved(self):
+        """Determine the units of every variable, inputs first, holding
+        them until the context exits"""
+        nodes = self.nodes
+        depth = _evaluationDepth()
+        _setEvaluationDepth(0)
+        try:
+            for var in nodes:
+                var._heldUnitAsOne = var._unitAsOne
+            yield
+        finally:
+            _setEvaluationDepth(depth)
+            for var in nodes:
+                var.__dict__.pop("_heldUnitAsOne", None)
+
+    def refresh(self, executor=None):
+        """Evaluate the stale variables in topological order
+
+        Parameters
+        ----------
+        executor : concurrent.futures.Executor, optional
+            If supplied, the independent variables of each of the `levels`
+            are evaluated concurrently.
+
+        Returns
+        -------
+        list
+            The values of the `outputs`.
+        """
+        with self._refreshed(executor=executor):
+            return [var.value for var in self.outputs]
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
@@ -37,6 +37,8 @@ class _FaceGradContributions(FaceVariable):
 
     """
 
+    _evictable = True
+
     def __init__(self, var):
         FaceVariable.__init__(self, mesh=var.mesh, elementshape=(var.mesh.dim,) + var.shape[:-1])
         self.var = self._requires(var)
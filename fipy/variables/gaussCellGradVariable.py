@@ -37,6 +37,8 @@ class _GaussCellGradVariable(CellVariable):
 
     """
 
+    _evictable = True
+
     def __init__(self, var, name=''):
         CellVariable.__init__(self, mesh=var.mesh, name=name, elementshape=(var.mesh.dim,) + var.shape[:-1])
         self.var = self._requires(var)
@@ -68,9 +70,8 @@ class _GaussCellGradVariable(CellVariable):
 
         return self._makeValue(value = val)
 
-    def _calcValueNoInline(self, N, M, ids, orientations, volumes):
-        contributions = numerix.take(self.faceGradientContributions, ids, axis=-1)
-        grad = numerix.array(numerix.sum(orientations * contributions, -2))
+    def _calcValueNoInline(self, volumes):
+        grad = self.mesh._sumOverCellFaces(self.faceGradientContributions.numericValue)
         return grad / volumes
 
     def _calcValue(self):
@@ -81,11 +82,7 @@ class _GaussCellGradVariable(CellVariable):
                                          orientations=self.mesh._cellToFaceOrientations,
                                          volumes=self.mesh.cellVolumes)
         else:
-            return self._calcValueNoInline(N=self.mesh.numberOfCells,
-                                           M=self.mesh._maxFacesPerCell,
-                                           ids=self.mesh.cellFaceIDs,
-                                           orientations=self.mesh._cellToFaceOrientations,
-                                           volumes=self.mesh.cellVolumes)
+            return self._calcValueNoInline(volumes=self.mesh.cellVolumes)
 
 
 def _test():
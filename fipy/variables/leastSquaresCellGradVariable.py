@@ -12,6 +12,9 @@ class _LeastSquaresCellGradVariable(CellVariable):
     """
     Look at `CellVariable.leastSquarseGrad` for documentation
      """
+
+    _evictable = True
+
     def __init__(self, var, name = ''):
         CellVariable.__init__(self, mesh=var.mesh, name=name, rank=var.rank + 1)
         self.var = self._requires(var)
@@ -42,7 +42,7 @@ class _ModCellGradVariable(_GaussCellGradVariable):
 
         return self._makeValue(value = val)
 
-    def _calcValueNoInline(self, N, M, ids, orientations, volumes):
-        value = _GaussCellGradVariable._calcValueNoInline(self, N, M, ids, orientations, volumes)
+    def _calcValueNoInline(self, volumes):
+        value = _GaussCellGradVariable._calcValueNoInline(self, volumes)
         gridSpacing = self.mesh._meshSpacing
         return self.modPy(value * gridSpacing) / gridSpacing
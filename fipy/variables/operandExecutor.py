@@ -0,0 +1,198 @@
+"""Concurrent evaluation of independent `Variable` operands
+
+:term:`NumPy` releases the global interpreter lock for element-wise
+operations on large arrays, so the independent operands of a binary
+operation, such as the two sides of ``a.faceGrad * b.harmonicFaceValue``,
+can be evaluated at the same time on separate threads.  This is off by
+default.  It is enabled by giving the :data:`variableExecutor` a number of
+worker threads, either with the :envvar:`FIPY_EVALUATION_THREADS`
+environment variable or with
+
+>>> variableExecutor.threads = 4 # doctest: +SKIP
+
+Operations on fewer than `minimumSize` elements, taken from
+:envvar:`FIPY_EVALUATION_MINIMUM_SIZE` if set, are always evaluated
+serially, as the cost of handing them to another thread would outweigh
+any gain.
+
+Operands are only handed to separate threads when they are independent:
+evaluating one must not modify anything that the other reads.  This holds
+for the values of :class:`~fipy.variables.variable.Variable` objects, which
+only write their own cached value, as long as the inputs they share are
+brought up to date beforehand, which the executor does.  When expressions
+are inlined, the operands read as leaves of the compiled expression are
+evaluated this way before it runs.
+"""
+from __future__ import unicode_literals
+from builtins import object
+__docformat__ = 'restructuredtext'
+
+import os
+import threading
+
+from fipy.tools import numerix
+
+__all__ = ["OperandExecutor", "variableExecutor"]
+from future.utils import text_to_native_str
+__all__ = [text_to_native_str(n) for n in __all__]
+
+# set in the threads of the pool, which never hand work back to it
+_worker = threading.local()
+
+class OperandExecutor(object):
+    """Shared pool of threads for evaluating `Variable` operands
+
+    >>> from fipy import Grid2D, CellVariable
+    >>> executor = OperandExecutor(threads=2, minimumSize=0)
+    >>> from fipy.variables.variable import Variable
+    >>> Variable._executor, saved = executor, Variable._executor
+
+    >>> mesh = Grid2D(nx=10, ny=10)
+    >>> a = CellVariable(mesh=mesh)
+    >>> b = CellVariable(mesh=mesh)
+    >>> faceA = a.harmonicFaceValue
+    >>> faceB = b.arithmeticFaceValue
+    >>> product = faceA * faceB
+
+    Once both operands are out of date, they are evaluated together
+
+    >>> a.value = mesh.x
+    >>> b.value = mesh.y
+    >>> result = product.value
+    >>> print(numerix.allclose(result, faceA.value * faceB.value))
+    True
+    >>> print(executor.statistics["concurrent"])
+    1
+
+    Small operations stay in the calling thread
+
+    >>> executor.minimumSize = mesh.numberOfFaces + 1
+    >>> a.value = mesh.x + 1
+    >>> b.value = mesh.y + 1
+    >>> result = product.value
+    >>> print(numerix.allclose(result, faceA.value * faceB.value))
+    True
+    >>> print(executor.statistics["concurrent"])
+    1
+
+    >>> executor.threads = 0
+    >>> Variable._executor = saved
+    """
+
+    def __init__(self, threads=0, minimumSize=2**16):
+        """
+        Parameters
+        ----------
+        threads : int
+            Number of worker threads.  Zero evaluates everything serially.
+        minimumSize : int
+            Smallest number of elements in a result for its operands to be
+            evaluated concurrently.
+        """
+        self._pool = None
+        self._threads = 0
+        self.threads = threads
+        self.minimumSize = minimumSize
+        self.statistics = dict(concurrent=0)
+
+    def _getThreads(self):
+        return self._threads
+
+    def _setThreads(self, threads):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        self._threads = threads or 0
+        if self._threads > 0:
+            from concurrent.futures import ThreadPoolExecutor
+            self._pool = ThreadPoolExecutor(max_workers=self._threads)
+
+    threads = property(_getThreads, _setThreads)
+
+    def _isAvailable(self, result):
+        """Whether the operands of `result` may be handed to the pool
+
+        The size of `result` is only computed if there is a pool.
+        """
+        return (self._pool is not None
+                and not getattr(_worker, "active", False)
+                and int(numerix.prod(result.shape)) >= self.minimumSize)
+
+    @staticmethod
+    def _inWorker(fn, *args):
+        _worker.active = True
+        try:
+            return fn(*args)
+        finally:
+            _worker.active = False
+
+    def _values(self, variables, result):
+        """Values of `variables`, evaluated concurrently if worthwhile
+
+        Parameters
+        ----------
+        variables : list of ~fipy.variables.variable.Variable
+            Operands, whose values are required together.
+        result : ~fipy.variables.variable.Variable
+            The result of the operation.
+        """
+        if self._isAvailable(result):
+            from fipy.variables.dependencyGraph import DependencyGraph
+
+            stale = [DependencyGraph([var]).staleNodes for var in variables]
+            if sum([len(nodes) > 0 for nodes in stale]) > 1:
+                # bring inputs that the operands share up to date first,
+                # so that they are not calculated, and stored, twice at once
+                seen = set()
+                shared = set()
+                for nodes in stale:
+                    ids = set(id(var) for var in nodes)
+                    shared |= seen & ids
+                    seen |= ids
+                for var in stale[0]:
+                    if id(var) in shared and var._isCached():
+                        var._getValue()
+
+                futures = [self._pool.submit(self._inWorker, var._getValue)
+                           for var in variables[:-1]]
+                last = variables[-1].value
+                self.statistics["concurrent"] += 1
+                return [future.result() for future in futures] + [last]
+
+        return [var.value for var in variables]
+
+    def map(self, fn, variables):
+        """Apply `fn` to each of the independent `variables`, concurrently
+        for those with at least `minimumSize` elements"""
+        large = []
+        results = {}
+        for i, var in enumerate(variables):
+            if self._isAvailable(var):
+                large.append(i)
+            else:
+                results[i] = fn(var)
+        if len(large) > 1:
+            self.statistics["concurrent"] += 1
+            futures = [(i, self._pool.submit(self._inWorker, fn, variables[i])) for i in large]
+            for i, future in futures:
+                results[i] = future.result()
+        else:
+            for i in large:
+                results[i] = fn(variables[i])
+        return [results[i] for i in range(len(variables))]
+
+def _parseThreads():
+    return int(os.environ.get("FIPY_EVALUATION_THREADS", 0))
+
+def _parseMinimumSize():
+    return int(os.environ.get("FIPY_EVALUATION_MINIMUM_SIZE", 2**16))
+
+variableExecutor = OperandExecutor(threads=_parseThreads(),
+                                   minimumSize=_parseMinimumSize())
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
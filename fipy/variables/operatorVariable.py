@@ -10,10 +10,39 @@ import dis
 import sys
 
 from fipy.variables.variable import Variable
+from fipy.variables.dependencyGraph import _evaluationDepth, _setEvaluationDepth
 from fipy.tools import numerix
+from fipy.tools import inline
+from fipy.tests.doctestPlus import register_skipper
+
+def _checkForNumba():
+    hasNumba = True
+    try:
+        import numba
+    except Exception:
+        hasNumba = False
+    return hasNumba
+
+register_skipper(flag="NUMBA",
+                 test=_checkForNumba,
+                 why="the `numba` package cannot be imported")
+
+def _checkForNumexpr():
+    hasNumexpr = True
+    try:
+        import numexpr
+    except Exception:
+        hasNumexpr = False
+    return hasNumexpr
+
+register_skipper(flag="NUMEXPR",
+                 test=_checkForNumexpr,
+                 why="the `numexpr` package cannot be imported")
 
 def _OperatorVariableClass(baseClass=object):
     class _OperatorVariable(baseClass):
+        _evictable = True
+
         def __init__(self, op, var, opShape=(), canInline=True, unit=None, inlineComment=None, valueMattersForUnit=None, return_scalar=False, *args, **kwargs):
             self.op = op
             self.var = var
@@ -46,12 +75,58 @@ def _OperatorVariableClass(baseClass=object):
             raise TypeError("The value of an `_OperatorVariable` cannot be assigned")
 
         def _calcValue(self):
+            if (self.canInline
+                and (inline.doInline or inline.doNumba or inline.doNumexpr)
+                and self._inlinesDeeperThan(self._maxEvaluationDepth)):
+                # the inlined expression is built recursively, so bring the
+                # inputs up to date iteratively and inline only what is left
+                from fipy.variables.dependencyGraph import DependencyGraph
+                with DependencyGraph(self.requiredVariables)._refreshed():
+                    return self._calcValueInlined()
+            else:
+                return self._calcValueInlined()
+
+        def _inlinesDeeperThan(self, depth):
+            """Whether the uncached operators that would be inlined together
+            with this one are nested more than `depth` deep"""
+            stack = [(self, 1)]
+            while stack:
+                var, level = stack.pop()
+                if level > depth:
+                    return True
+                stack.extend((v, level + 1) for v in var.var
+                             if isinstance(v, Variable)
+                             and getattr(v, "canInline", False)
+                             and not v._isCached())
+            return False
+
+        def _prefetchOperands(self):
+            """Evaluate the cached operands, which the inlined expression
+            reads as leaves, concurrently where worthwhile"""
+            if self._executor._pool is not None:
+                leaves = [v for v in self.var
+                          if isinstance(v, Variable) and v._isCached()]
+                if len(leaves) > 1:
+                    self._executor._values(leaves, result=self)
+
+        def _calcValueInlined(self):
             if not self.canInline:
                 return self._calcValue_()
             else:
-                from fipy.tools import inline
+                if inline.doInline or inline.doNumba or inline.doNumexpr:
+                    self._prefetchOperands()
                 if inline.doInline:
                     return self._execInline(comment=self.comment)
+                elif inline.doNumba or inline.doNumexpr:
+                    try:
+                        if inline.doNumba:
+                            return self._execInline(comment=self.comment)
+                        else:
+                            return self._execNumexpr()
+                    except (inline._NumbaInlineError, inline._NumexprInlineError):
+                        # fall back for good
+                        self.canInline = False
+                        return self._calcValue_()
                 else:
                     return self._calcValue_()
 
@@ -72,17 +147,41 @@ def _OperatorVariableClass(baseClass=object):
 
             return s
 
+        def _getNumexprString(self, argDict={}, id="", freshen=False):
+            if self.canInline:
+                s = self._getRepresentation(style="numexpr", argDict=argDict, id=id, freshen=freshen)
+            else:
+                s = baseClass._getNumexprString(self, argDict=argDict, id=id)
+            if freshen:
+                self._markFresh()
+
+            return s
+
+        def _execNumexpr(self):
+            """Evaluate the whole element-wise tree in one `numexpr` expression
+
+            Subtrees whose value is cached are evaluated separately, as leaves.
+            """
+            argDict = {}
+            expression = self._getNumexprString(argDict=argDict, freshen=True)
+            value = inline._runNumexpr(expression, **argDict)
+            if self.return_scalar or value.shape == ():
+                # NumPy would have produced a scalar
+                value = value[()]
+            return value
+
         def _getRepresentation(self, style="__repr__", argDict={}, id=id, freshen=False):
             """
 
             Parameters
             ----------
-            style : {'__repr__', 'name', 'TeX', 'C'}
+            style : {'__repr__', 'name', 'TeX', 'C', 'numexpr'}
                desired formatting for representation
             """
             if isinstance(self.op, numerix.ufunc):
-                return "%s(%s)" % (self.op.__name__, ", ".join([self.__var(i, style, argDict, id, freshen)
-                                                               for i in range(len(self.var))]))
+                return self._call(style, self.op.__name__,
+                                  [self.__var(i, style, argDict, id, freshen)
+                                   for i in range(len(self.var))])
 
             try:
                 representation = self._py3kInstructions(op=self.op, style=style, argDict=argDict, id=id, freshen=freshen)
@@ -92,6 +191,20 @@ def _OperatorVariableClass(baseClass=object):
 
             return representation
 
+        @staticmethod
+        def _call(style, function, args):
+            """Spell a call of `function` with `args` in the given `style`
+
+            numexpr has no `pow()` and spells `absolute()` as `abs()`.
+            """
+            if style == "numexpr":
+                name = function.replace("numerix.", "")
+                if name in ("pow", "power") and len(args) == 2:
+                    return "(%s)**(%s)" % tuple(args)
+                elif name in ("absolute", "fabs"):
+                    function = "abs"
+            return function + "(" + ", ".join(args) + ")"
+
         def __var(self, i, style, argDict, id, freshen):
             v = self.var[i]
             if style == "__repr__":
@@ -125,6 +238,17 @@ def _OperatorVariableClass(baseClass=object):
                     result = v._variableClass._getCstring(v, argDict,
                                                                id=id + str(i),
                                                                freshen=False)
+            elif style == "numexpr":
+                if not v._isCached():
+                    result = v._getNumexprString(argDict, id=id + str(i), freshen=freshen)
+                    if isinstance(v, Variable):
+                        v._value = None
+                    else:
+                        v.value = None
+                else:
+                    result = v._variableClass._getNumexprString(v, argDict,
+                                                                id=id + str(i),
+                                                                freshen=False)
             else:
                 raise SyntaxError("Unknown style: %s" % style)
 
@@ -157,6 +281,8 @@ def _OperatorVariableClass(baseClass=object):
                     s = stack.pop()
                     if style == 'C':
                         return s.replace('numerix.', '').replace('arc', 'a')
+                    elif style == 'numexpr':
+                        return s.replace('numerix.', '')
                     else:
                         return s
                 elif dis.opname[bytecode] == 'LOAD_CONST':
@@ -178,7 +304,7 @@ def _OperatorVariableClass(baseClass=object):
                     for j in range(bytecodes.pop(0)):
                         # positional parameters
                         args.insert(0, stack.pop())
-                    stack.append(stack.pop() + "(" + ", ".join(args) + ")")
+                    stack.append(self._call(style, stack.pop(), args))
                 elif dis.opname[bytecode] == 'LOAD_DEREF':
                     free = self.op.__code__.co_cellvars + self.op.__code__.co_freevars
                     stack.append(free[_popIndex()])
@@ -208,6 +334,8 @@ def _OperatorVariableClass(baseClass=object):
                     s = stack.pop()
                     if style == 'C':
                         return s.replace('numerix.', '').replace('arc', 'a')
+                    elif style == 'numexpr':
+                        return s.replace('numerix.', '')
                     else:
                         return s
                 elif ins.opname == 'LOAD_CONST':
@@ -226,7 +354,7 @@ def _OperatorVariableClass(baseClass=object):
                     # Removed in Python 3.11
                     # args are last ins.arg items on stack
                     args, stack = stack[-ins.arg:], stack[:-ins.arg]
-                    stack.append(stack.pop() + "(" + ", ".join(args) + ")")
+                    stack.append(self._call(style, stack.pop(), args))
                 elif ins.opname == 'CALL_FUNCTION_KW':
                     # Removed in Python 3.11
                     kws = list(stack.pop())
@@ -235,7 +363,7 @@ def _OperatorVariableClass(baseClass=object):
                     kwargs = []
                     while kws:
                         kwargs.append(kws.pop() + "=" + args.pop())
-                    stack.append(stack.pop() + "(" + ", ".join(args + kwargs) + ")")
+                    stack.append(self._call(style, stack.pop(), args + kwargs))
                 elif ins.opname == 'LOAD_DEREF':
                     # Changed in Python 3.11
                     stack.append(ins.argrepr)
@@ -256,7 +384,7 @@ def _OperatorVariableClass(baseClass=object):
                     if len(stack) > 0:
                         call_self = callable
                         callable = stack.pop()
-                    stack.append(callable + "(" + ", ".join(positionals + kwargs) + ")")
+                    stack.append(self._call(style, callable, positionals + kwargs))
                     kws = []
                 elif ins.opname == 'COPY_FREE_VARS':
                     # New in Python 3.11
@@ -282,7 +410,7 @@ def _OperatorVariableClass(baseClass=object):
                     # New in Python 3.6
                     kwargs = [k + "=" + str(v) for k, v in stack.pop().items()]
                     args = [str(v) for v in stack.pop()]
-                    stack.append(stack.pop() + "(" + ", ".join(args + kwargs) + ")")
+                    stack.append(self._call(style, stack.pop(), args + kwargs))
                 elif ins.opcode in self._unop:
                     stack.append(self._unop[ins.opcode] + '(' + stack.pop() + ')')
                 elif ins.opcode in self._binop:
@@ -296,6 +424,19 @@ def _OperatorVariableClass(baseClass=object):
 
             Used for determining units of result without doing expensive computation"""
 
+            depth = _evaluationDepth()
+            if depth >= self._maxEvaluationDepth:
+                from fipy.variables.dependencyGraph import DependencyGraph
+                with DependencyGraph(self.var)._unitsResolved():
+                    return self._varProxy_()
+            else:
+                _setEvaluationDepth(depth + 1)
+                try:
+                    return self._varProxy_()
+                finally:
+                    _setEvaluationDepth(depth)
+
+        def _varProxy_(self):
             return [v if valueMatters else v._unitAsOne for v, valueMatters in zip(self.var, self.valueMattersForUnit)]
 
         def __repr__(self):
@@ -1266,6 +1407,64 @@ def _testBinOp(self):
     """
     pass
 
+def _testNumbaInline(self):
+    """
+    The C representation of an expression can be evaluated in a single
+    loop compiled with Numba
+
+        >>> from fipy.tools import inline
+        >>> v1 = Variable((1., 2., 3.))
+        >>> argDict = {}
+        >>> code = (numerix.sqrt(v1) * 2)._getCstring(argDict=argDict)
+        >>> result = numerix.empty((3,))
+        >>> inline._runNumbaInline('result[i] = ' + code + ';',
+        ...                        result=result, ni=3, **argDict) # doctest: +NUMBA
+        >>> print(numerix.allclose(result, numerix.sqrt([1., 2., 3.]) * 2)) # doctest: +NUMBA
+        True
+
+    Expressions that Numba can't compile are reported, so that they can be
+    evaluated with NumPy instead
+
+        >>> inline._runNumbaInline('result[i] = var0[i] @@ 2;', result=result,
+        ...                        var0=result, ni=3) # doctest: +NUMBA, +IGNORE_EXCEPTION_DETAIL
+        Traceback (most recent call last):
+            ...
+        _NumbaInlineError: previously failed to compile result[i] = var0[i] @@ 2;
+    """
+    pass
+
+def _testNumexpr(self):
+    """
+    An element-wise expression can be evaluated by `numexpr` as a whole
+
+        >>> from fipy import Grid1D, CellVariable
+        >>> mesh = Grid1D(nx=5)
+        >>> phi = CellVariable(mesh=mesh, value=mesh.x / 5)
+        >>> expr = (1 - phi)**2 * phi * 0.5 + numerix.sqrt(phi)
+        >>> print(expr._getNumexprString(argDict={}))
+        ((((((var00001 - var00000))**(var0001)) * var001) * var01) + sqrt(var10))
+        >>> print((abs(phi - 1))._getNumexprString(argDict={}))
+        abs((var00 - var01))
+        >>> print(numerix.allclose(expr._execNumexpr(),
+        ...                        (1 - phi.value)**2 * phi.value * 0.5
+        ...                        + numerix.sqrt(phi.value))) # doctest: +NUMEXPR
+        True
+
+    A cached subexpression is evaluated separately and enters as a leaf
+
+        >>> square = phi * phi
+        >>> square.cacheMe()
+        >>> print((square + 1)._getNumexprString(argDict={}))
+        (var0 + var1)
+
+    Leaves are re-read on every evaluation, so changes are honored
+
+        >>> phi.setValue(1.)
+        >>> print(numerix.allclose(expr._execNumexpr(), 1.)) # doctest: +NUMEXPR
+        True
+    """
+    pass
+
 def _test():
     import fipy.tests.doctestPlus
     return fipy.tests.doctestPlus.testmod()
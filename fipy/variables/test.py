@@ -11,6 +11,9 @@ def _suite():
     return _LateImportDocTestSuite(
         docTestModuleNames = (
             'fipy.variables.variable',
+            'fipy.variables.cacheManager',
+            'fipy.variables.dependencyGraph',
+            'fipy.variables.operandExecutor',
             'fipy.variables.meshVariable',
             'fipy.variables.cellVariable',
             'fipy.variables.faceVariable',
@@ -5,17 +5,24 @@ from builtins import str
 from future.utils import string_types
 __docformat__ = 'restructuredtext'
 
+import itertools
 import os
 
 from fipy.tools.dimensions import physicalField
 from fipy.tools import numerix
 from fipy.tools import parser
 from fipy.tools import inline
+from fipy.variables.cacheManager import variableCache
+from fipy.variables.operandExecutor import variableExecutor
+from fipy.variables.dependencyGraph import _evaluationDepth, _setEvaluationDepth
 
 __all__ = ["Variable"]
 from future.utils import text_to_native_str
 __all__ = [text_to_native_str(n) for n in __all__]
 
+# source of the `Variable._version` stamps, which only ever increase
+_versions = itertools.count(1)
+
 class Variable(object):
     """
     Lazily evaluated quantity with units.
@@ -48,6 +55,22 @@ class Variable(object):
 
     _cacheNever = False
 
+    # values that are pure functions of other variables can be released
+    # by the `variableCache` and recalculated on demand
+    _evictable = False
+    _evicted = False
+    _cacheManager = variableCache
+
+    # evaluates independent operands concurrently, when enabled
+    _executor = variableExecutor
+
+    # skip stale propagation when `setValue` does not change the value
+    _detectChanges = (os.getenv("FIPY_DETECT_CHANGES") is not None) or False
+    if parser.parse("--detect-changes", action="store_true"):
+        _detectChanges = True
+
+    _version = 0
+
     def __new__(cls, *args, **kwds):
         return object.__new__(cls)
 
@@ -94,6 +117,7 @@ class Variable(object):
         self._cached = cached
 
         self.stale = 1
+        self._stamp()
         self._markFresh()
 
 ##    __array_priority__ and __array_wrap__ are required to override
@@ -204,6 +228,8 @@ class Variable(object):
 
     @property
     def _unitAsOne(self):
+        if "_heldUnitAsOne" in self.__dict__:
+            return self._heldUnitAsOne
         unit = self.unit
         if unit is physicalField._unity:
             return 1.
@@ -241,6 +267,7 @@ class Variable(object):
             self._value.unit = unit
         else:
             self._value = physicalField.PhysicalField(value=self._value, unit=unit)
+        self._stamp()
 
     unit = property(_getUnit, _setUnit)
 
@@ -437,6 +464,33 @@ class Variable(object):
          else:
              return identifier + self._getCIndexString(shape)
 
+    def _getNumexprString(self, argDict={}, id="", freshen=None):
+        """
+        Generate the string and dictionary to be evaluated by `numexpr`
+
+            >>> from future.utils import text_to_native_str as ttns
+
+            >>> argDict = {}
+            >>> ttns((Variable((1, 2, 3, 4)))._getNumexprString(argDict=argDict))
+            'var'
+            >>> print(argDict['var'])
+            [1 2 3 4]
+
+            >>> ttns((Variable(1) * Variable((1, 2, 3)))._getNumexprString(argDict={}))
+            '(var0 * var1)'
+
+        Unlike the C representation, arrays are not indexed, as `numexpr`
+        broadcasts them like NumPy does.
+
+        freshen is ignored
+        """
+
+        identifier = 'var%s' % (id)
+
+        argDict[identifier] = numerix.asarray(self.value)
+
+        return identifier
+
     def tostring(self, max_line_width=75, precision=8, suppress_small=False, separator=' '):
         return numerix.tostring(self.value,
                                 max_line_width=max_line_width,
@@ -447,13 +501,17 @@ class Variable(object):
     def __setitem__(self, index, value):
         if self._value is None:
             self._getValue()
+        if self._isUnchanged(value, lambda: numerix.all(self._value[index] == value)):
+            return
         self._value[index] = value
+        self._stamp()
         self._markFresh()
 
     def put(self, indices, value):
         if self._value is None:
             self._getValue()
         numerix.put(self._value, indices, value)
+        self._stamp()
         self._markFresh()
 
     def __call__(self):
@@ -486,15 +544,23 @@ class Variable(object):
 
         """
 
-        if self.stale or not self._isCached() or self._value is None:
-            value = self._calcValue()
+        if (self.stale or not self._isCached() or self._value is None
+            or self._evicted):
+            if self._evicted and not self.stale:
+                self._cacheManager._miss()
+            value = self._calcValueNested()
             if self._isCached():
                 self._setValueInternal(value=value)
+                self._evicted = False
+                if self._evictable:
+                    self._cacheManager._store(self)
             else:
                 self._setValueInternal(value=None)
             self._markFresh()
         else:
             value = self._value
+            if self._evictable:
+                self._cacheManager._touch(self)
 
         if len(self.constraints) > 0:
             value = value.copy()
@@ -601,6 +667,7 @@ class Variable(object):
         [ 2 10 10 10]
         """
         self.constraints.remove(constraint)
+        self._markStale()
 
     def _isCached(self):
         return self._cacheAlways or (self._cached and not self._cacheNever)
@@ -617,6 +684,18 @@ class Variable(object):
             for var in self.requiredVariables:
                 var.dontCacheMe(recursive=False)
 
+    def _evict(self):
+        """Release the memory of the cached value, to be recalculated on demand
+
+        The value is replaced by a read-only placeholder of the same shape
+        and type, which occupies no memory.
+        """
+        value = self._value
+        if type(value) is type(numerix.array(1)):
+            self._value = numerix.broadcast_to(numerix.zeros((), dtype=value.dtype),
+                                               value.shape)
+            self._evicted = True
+
     def _setValueInternal(self, value, unit=None, array=None):
         self._value = self._makeValue(value=value, unit=unit, array=array)
 
@@ -699,6 +778,7 @@ class Variable(object):
             ValueError: shape mismatch: objects cannot be broadcast to a single shape
 
         """
+        assigned = value
         if where is not None:
             tmp = numerix.empty(numerix.getShape(where), self.dtype)
             tmp[:] = value
@@ -711,10 +791,137 @@ class Variable(object):
 
         value = self._makeValue(value=tmp, unit=unit, array=None)
 
+        if self._isUnchanged(assigned, lambda: self._equals(value)):
+            return
+
         self._value[...] = value
 
+        self._stamp()
         self._markFresh()
 
+    def _getDetectChanges(self):
+        return self._detectChanges
+
+    def _setDetectChanges(self, detect):
+        self._detectChanges = detect
+
+    detectChanges = property(_getDetectChanges, _setDetectChanges,
+                             doc="""Whether setting an identical value leaves
+    subscribers up to date
+
+    By default, any assignment to a `Variable` causes all of the variables
+    that depend on it to be recalculated.
+
+    >>> a = Variable(value=(1., 2., 3.))
+    >>> a.detectChanges = False
+    >>> b = a * 2
+    >>> print(b)
+    [ 2.  4.  6.]
+    >>> a.value = (1., 2., 3.)
+    >>> print(bool(b.stale))
+    True
+
+    With change detection, the new value is first compared with the old
+    one, which costs a pass over the array, and nothing is marked stale if
+    they are equal
+
+    >>> a.detectChanges = True
+    >>> print(b)
+    [ 2.  4.  6.]
+    >>> version = a.version
+    >>> a.value = (1., 2., 3.)
+    >>> a[1] = 2.
+    >>> print(bool(b.stale), a.version == version)
+    False True
+    >>> a[1] = 5.
+    >>> print(bool(b.stale), a.version > version)
+    True True
+    >>> print(b)
+    [  2.  10.   6.]
+
+    Any :envvar:`FIPY_DETECT_CHANGES` environment variable, or the
+    `--detect-changes` flag, enables it for every `Variable`.
+    """)
+
+    def _isUnchanged(self, value, equal):
+        """Whether change detection is on and `equal()` holds for the
+        assigned `value`"""
+        if not self._detectChanges or self.stale or self._value is None:
+            return False
+        try:
+            if numerix.may_share_memory(self._array, getattr(value, "_array", value)):
+                # solvers write into the storage of the variable and then
+                # assign it back, so it always compares equal to itself
+                return False
+            return bool(equal())
+        except Exception:
+            # anything that cannot be compared is assumed to be a change
+            return False
+
+    def _equals(self, value):
+        old = self._value
+        PF = physicalField.PhysicalField
+        if isinstance(old, PF) or isinstance(value, PF):
+            if not (isinstance(old, PF) and isinstance(value, PF)
+                    and old.unit == value.unit):
+                return False
+            old = old.numericValue
+            value = value.numericValue
+        return numerix.all(numerix.asarray(old) == numerix.asarray(value))
+
+    def _stamp(self):
+        """Record that the value of `self` has been changed directly"""
+        self._version = next(_versions)
+
+    @property
+    def version(self):
+        """Stamp that increases whenever the value of `self`, or of any
+        `Variable` it depends on, is changed
+
+        >>> a = Variable(value=1.)
+        >>> b = Variable(value=2.)
+        >>> c = a + b
+        >>> version = c.version
+        >>> print(c.version == version)
+        True
+        >>> b.value = 3.
+        >>> print(c.version > version, c.version == b.version)
+        True True
+
+        Stamps reach the end of long chains of dependencies
+
+        >>> d = c
+        >>> for i in range(200):
+        ...     d = d + 1
+        >>> a.value = 5.
+        >>> print(d.version == a.version)
+        True
+
+        including through variables that are already out of date
+
+        >>> version = d.version
+        >>> b.value = 4.
+        >>> print(d.version > version, d.version == b.version)
+        True True
+        """
+        if not self.stale:
+            # any later change upstream would have marked `self` stale
+            return self._version
+
+        # stamps stop at subscribers that are already stale, so look for
+        # newer ones among the stale inputs
+        version = self._version
+        visited = set([id(self)])
+        stack = [self]
+        while stack:
+            for var in stack.pop().requiredVariables:
+                if id(var) not in visited:
+                    visited.add(id(var))
+                    version = max(version, var._version)
+                    if var.stale:
+                        stack.append(var)
+        return version
+
     def _setNumericValue(self, value):
         if isinstance(self._value, physicalField.PhysicalField):
             self._value.value = value
@@ -781,6 +988,28 @@ class Variable(object):
     def itemsize(self):
         return self.value.itemsize
 
+    # deeper nesting of evaluations is handed to a `DependencyGraph`
+    _maxEvaluationDepth = 100
+
+    def _calcValueNested(self):
+        """Calculate the value within the evaluation of another `Variable`
+
+        Beyond `_maxEvaluationDepth` nested evaluations, the stale inputs
+        are brought up to date iteratively, in topological order, rather
+        than recursively.
+        """
+        depth = _evaluationDepth()
+        if depth >= self._maxEvaluationDepth:
+            from fipy.variables.dependencyGraph import DependencyGraph
+            with DependencyGraph(self.requiredVariables)._refreshed():
+                return self._calcValue()
+        else:
+            _setEvaluationDepth(depth + 1)
+            try:
+                return self._calcValue()
+            finally:
+                _setEvaluationDepth(depth)
+
     def _calcValue(self):
         return self._value
 
@@ -802,21 +1031,31 @@ class Variable(object):
                                    _setSubscribedVariables)
 
     def __markStale(self):
-        for subscriber in self.subscribedVariables:
-            if subscriber() is not None:
+        # walk the subscribers with an explicit stack, rather than recursing,
+        # so that long chains of dependencies cannot exhaust the call stack.
+        # Each subscriber marked stale takes on the current stamp.
+        version = self._version
+        stack = [self]
+        while stack:
+            for subscriber in stack.pop().subscribedVariables:
+                subscriber = subscriber()
                 ## Even though getSubscribedVariables() strips out dead
                 ## references, subscriber() might still be dead due to the
                 ## vagaries of garbage collection and the possibility that
                 ## later subscribedVariables were removed, changing the
                 ## dependencies of this subscriber.
                 ## See <https://github.com/usnistgov/fipy/issues/103> for more explanation.
-                subscriber()._markStale()
+                if subscriber is not None and not subscriber.stale:
+                    subscriber.stale = 1
+                    subscriber._version = max(subscriber._version, version)
+                    stack.append(subscriber)
 
     def _markFresh(self):
         self.stale = 0
         self.__markStale()
 
     def _markStale(self):
+        self._stamp()
         if not self.stale:
             self.stale = 1
             self.__markStale()
@@ -917,10 +1156,11 @@ class Variable(object):
             self.typecode = argDict['result'].dtype
         else:
             if self._value is None:
-                if self.dtype is numerix.dtype(bool):
+                # `self.dtype` would evaluate the expression all over again
+                if self.typecode == numerix.dtype(bool) and not inline.doNumba:
                     argDict['result'] = numerix.empty(dim, numerix.int8)
                 else:
-                    argDict['result'] = numerix.empty(dim, self.dtype)
+                    argDict['result'] = numerix.empty(dim, self.typecode)
             else:
                 argDict['result'] = self._value
 
@@ -929,13 +1169,16 @@ class Variable(object):
             if resultShape == ():
                 argDict['result'] = numerix.reshape(argDict['result'], (1,))
 
-            inline._runInline(string, converters=None, comment=comment, **argDict)
+            if inline.doNumba:
+                inline._runNumbaInline(string, **argDict)
+            else:
+                inline._runInline(string, converters=None, comment=comment, **argDict)
 
             if resultShape == ():
                 argDict['result'] = numerix.reshape(argDict['result'], resultShape)
 
-            if numerix.issubdtype(item.dtype, bool):
-                argDict['result'] = numerix.asarray(argDict['result'], dtype=self.dtype)
+            if numerix.issubdtype(self.typecode, bool):
+                argDict['result'] = numerix.asarray(argDict['result'], dtype=self.typecode)
 
         return argDict['result']
 